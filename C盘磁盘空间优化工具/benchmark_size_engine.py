@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+@Description :  脚本： C盘磁盘空间优化工具 - 目录大小统计性能对比（旧版 os.walk + getsize 与单遍 scandir 引擎）
+
+用法：
+    # 在临时目录生成100万个文件（每个目录1000个）后对比；--keep 保留测试目录以便重复运行
+    python benchmark_size_engine.py --files 1000000
+    # 对已有目录直接对比
+    python benchmark_size_engine.py --path C:\\Windows\\Temp
+
+@Author : sundi
+@Created  : 2026/10/19
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from cleaner_engine import scan_tree_size
+
+
+def legacy_folder_size(folder_path, progress_callback=None, stop_flag=None):
+    """旧版实现：os.walk 后逐个 os.path.getsize，且每个文件都检查停止标志"""
+    total_size = 0
+    file_count = 0
+    for dirpath, dirnames, filenames in os.walk(folder_path):
+        if stop_flag and stop_flag():
+            return None
+        if progress_callback:
+            progress_callback(dirpath, file_count)
+        for filename in filenames:
+            if stop_flag and stop_flag():
+                return None
+            try:
+                total_size += os.path.getsize(os.path.join(dirpath, filename))
+                file_count += 1
+                if progress_callback and file_count % 100 == 0:
+                    progress_callback(dirpath, file_count)
+            except OSError:
+                continue
+    return total_size
+
+
+def build_tree(root, file_count, files_per_dir=1000):
+    """生成测试目录树：两级子目录，每个文件写入少量数据"""
+    for i in range(file_count):
+        dir_index = i // files_per_dir
+        dirpath = os.path.join(root, f"d{dir_index // 100:03d}", f"d{dir_index % 100:02d}")
+        if i % files_per_dir == 0:
+            os.makedirs(dirpath, exist_ok=True)
+        with open(os.path.join(dirpath, f"f{i}.tmp"), "wb") as f:
+            f.write(b"x" * (i % 512))
+
+
+def timed(func, path):
+    calls = [0]
+
+    def progress_callback(dirpath, file_count):
+        calls[0] += 1
+
+    start = time.perf_counter()
+    result = func(path, progress_callback, lambda: False)
+    return result, time.perf_counter() - start, calls[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="目录大小统计性能对比")
+    parser.add_argument("--path", help="对已有目录进行对比")
+    parser.add_argument("--files", type=int, default=1000000, help="生成的测试文件数")
+    parser.add_argument("--keep", action="store_true", help="保留生成的测试目录")
+    args = parser.parse_args(argv)
+
+    path = args.path
+    if not path:
+        path = os.path.join(tempfile.gettempdir(), f"size_bench_{args.files}")
+        if not os.path.isdir(path):
+            print(f"正在生成 {args.files} 个测试文件：{path}", file=sys.stderr)
+            build_tree(path, args.files)
+
+    try:
+        # 先各跑一遍预热目录缓存，避免第一个被测函数吃亏
+        legacy_folder_size(path)
+        scan_tree_size(path)
+
+        legacy_size, legacy_time, legacy_calls = timed(legacy_folder_size, path)
+        stats, engine_time, engine_calls = timed(scan_tree_size, path)
+        print(f"旧版 os.walk + getsize：{legacy_time:.2f} 秒，大小 {legacy_size}，进度回调 {legacy_calls} 次")
+        print(f"单遍 scandir 引擎：    {engine_time:.2f} 秒，大小 {stats['size']}，进度回调 {engine_calls} 次，"
+              f"文件 {stats['files']} 个，占用 {stats['allocated']} 字节")
+        print(f"加速比：{legacy_time / engine_time:.2f}x")
+    finally:
+        if not args.path and not args.keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1416 @@
+# -*- coding: utf-8 -*-
+"""
+@Description :  脚本： C盘磁盘空间优化工具 - 扫描引擎（不依赖界面库，可被GUI和命令行共用）
+@Author : sundi
+@Created  : 2026/10/19
+"""
+
+import os
+import sys
+import glob
+import gzip
+import lzma
+import json
+import hashlib
+import fnmatch
+import stat
+import time
+import heapq
+import sqlite3
+import threading
+from collections import deque
+from array import array
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+# 空间分布统计在有NumPy时向量化分组聚合（可选），否则逐个文件累加，结果相同
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 按用户统计时把uid解析为用户名（仅类Unix系统）
+try:
+    import pwd
+except ImportError:
+    pwd = None
+
+# 就地压缩的zstd格式依赖zstandard（可选），未安装时只能使用gzip/lzma
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# 每处理多少个目录项检查一次停止标志并报告一次进度（取2的幂，用位运算判断）
+STOP_CHECK_INTERVAL = 1024
+
+# 并行扫描的线程数：目录枚举以I/O等待为主，线程数可以多于CPU核数
+DEFAULT_SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# 并行删除的线程数（删除以元数据写入为主，线程太多反而互相争用目录锁）
+DEFAULT_DELETE_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+
+# 就地压缩的进程数（压缩以CPU为主，每个核一个进程）
+DEFAULT_COMPRESS_WORKERS = os.cpu_count() or 1
+
+# 目录大小索引：保存每个目录自身（不含子目录）的文件统计和修改时间，重复扫描时未变化的目录不再枚举
+DEFAULT_SIZE_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".disk_cleaner_size_index.sqlite")
+# 清理目标注册表：随程序提供的默认注册表，以及用户自定义注册表（存在时优先）
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cleanup_targets.json")
+USER_REGISTRY_PATH = os.path.join(os.path.expanduser("~"), ".disk_cleaner_targets.json")
+
+# 最大文件/文件夹分析默认保留的条数
+DEFAULT_TOP_K = 100
+
+# 修改时间距记录时间太近的目录不信任缓存（同一时间刻度内的后续修改无法通过mtime发现）
+MTIME_RACE_WINDOW = 2.0
+
+# 文件年龄分布的分段边界（天）
+AGE_BUCKET_DAYS = (1, 7, 30, 90, 365)
+
+# 就地压缩：格式 → (扩展名, 默认压缩级别)；已经是压缩格式的文件不再压缩
+COMPRESS_METHODS = {'gzip': ('.gz', 6), 'lzma': ('.xz', 6), 'zstd': ('.zst', 10)}
+COMPRESSED_SUFFIXES = ('.gz', '.xz', '.zst', '.bz2', '.zip', '.7z', '.rar', '.cab', '.lz4')
+COMPRESS_CHUNK_SIZE = 1024 * 1024
+# 只压缩冷数据：只处理这些类别的清理项目，且只压缩超过N天未修改的文件（仍在写入的日志不压缩）
+COMPRESS_CATEGORIES = ('日志文件',)
+COMPRESS_MIN_AGE_DAYS = 7
+
+
+def format_file_size(size):
+    """格式化文件大小"""
+    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+        if size < 1024.0:
+            return f"{size:.2f} {unit}"
+        size /= 1024.0
+    return f"{size:.2f} PB"
+
+
+def _is_junction(entry):
+    """Windows目录联接点（Python 3.12+ 才有 DirEntry.is_junction）"""
+    is_junction = getattr(entry, "is_junction", None)
+    return bool(is_junction and is_junction())
+
+
+def scan_tree_size(folder_path, progress_callback=None, stop_flag=None, file_visitor=None):
+    """
+    单遍扫描目录树，统计文件数、逻辑大小和实际占用的磁盘空间
+
+    每个目录项只调用一次 DirEntry.stat(follow_symlinks=False)（Windows上直接取自目录枚举结果，无额外系统调用），
+    不跟随符号链接和目录联接点。停止标志每 STOP_CHECK_INTERVAL 个目录项检查一次。
+    file_visitor(dirpath, name, stat_result) 在遍历中对每个文件调用一次（用于清理策略等，无需再次遍历）。
+    返回 {'size', 'allocated', 'files', 'dirs'}，被中断时返回None
+    """
+    size = 0
+    allocated = 0
+    files = 0
+    dirs = 0
+    entries = 0
+    stack = [folder_path]
+    while stack:
+        dirpath = stack.pop()
+        if progress_callback:
+            progress_callback(dirpath, files)
+        try:
+            it = os.scandir(dirpath)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                entries += 1
+                if not entries & (STOP_CHECK_INTERVAL - 1):
+                    if stop_flag and stop_flag():
+                        return None
+                    if progress_callback:
+                        progress_callback(dirpath, files)
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not _is_junction(entry):
+                            dirs += 1
+                            stack.append(entry.path)
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                files += 1
+                size += st.st_size
+                if file_visitor:
+                    file_visitor(dirpath, entry.name, st)
+                # st_blocks 以512字节为单位；Windows没有该字段，按逻辑大小计
+                blocks = getattr(st, "st_blocks", None)
+                allocated += blocks * 512 if blocks is not None else st.st_size
+    if stop_flag and stop_flag():
+        return None
+    return {'size': size, 'allocated': allocated, 'files': files, 'dirs': dirs}
+
+
+def get_folder_size(folder_path, progress_callback=None, stop_flag=None):
+    """计算文件夹大小（单遍scandir扫描，被中断时返回None）"""
+    stats = scan_tree_size(folder_path, progress_callback, stop_flag)
+    return stats['size'] if stats else None
+
+
+def scan_tree(folder_path, stop_flag=None, max_files_per_dir=None):
+    """
+    单遍扫描目录树，自底向上汇总，返回带大小的目录树
+
+    节点格式：{'path', 'type', 'size', 'files', 'children'}，children 按大小降序。
+    每个目录只枚举一次：先按先序记录所有目录节点，再逆序把子目录大小累加到父目录（等价于后序遍历）。
+    max_files_per_dir 限制每个目录保留的文件节点数（只保留最大的若干个，大小统计不受影响），
+    避免百万级文件的目录占用过多内存。被中断时返回None
+    """
+    root = {'path': folder_path, 'type': '文件夹', 'size': 0, 'files': 0, 'children': []}
+    # 先序记录 (目录节点, 父目录节点)
+    order = []
+    stack = [(root, None)]
+    entries = 0
+    while stack:
+        node, parent = stack.pop()
+        order.append((node, parent))
+        file_nodes = []
+        try:
+            it = os.scandir(node['path'])
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                entries += 1
+                if not entries & (STOP_CHECK_INTERVAL - 1) and stop_flag and stop_flag():
+                    return None
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not _is_junction(entry):
+                            child = {'path': entry.path, 'type': '文件夹', 'size': 0, 'files': 0, 'children': []}
+                            node['children'].append(child)
+                            stack.append((child, node))
+                        continue
+                    size = entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+                node['size'] += size
+                node['files'] += 1
+                file_nodes.append({'path': entry.path, 'type': '文件', 'size': size, 'files': 1, 'children': []})
+        if max_files_per_dir is not None and len(file_nodes) > max_files_per_dir:
+            file_nodes = heapq.nlargest(max_files_per_dir, file_nodes, key=lambda item: item['size'])
+        node['children'].extend(file_nodes)
+
+    for node, parent in reversed(order):
+        node['children'].sort(key=lambda item: item['size'], reverse=True)
+        if parent is not None:
+            parent['size'] += node['size']
+            parent['files'] += node['files']
+    return root
+
+
+def scan_folder_contents(folder_path, max_items=1000, stop_flag=None):
+    """
+    扫描文件夹内容（限制数量以避免内存问题）
+
+    基于 scan_tree 的一次遍历，按层级从大到小展开，最多返回 max_items 项；
+    每项带 'parent'（父目录路径，顶层项为 folder_path），便于按层级显示
+    """
+    tree = scan_tree(folder_path, stop_flag, max_files_per_dir=max_items)
+    if tree is None:
+        return []
+    items = []
+    queue = deque(tree['children'])
+    parents = {id(child): folder_path for child in tree['children']}
+    while queue and len(items) < max_items:
+        node = queue.popleft()
+        items.append({'path': node['path'], 'type': node['type'], 'size': node['size'], 'parent': parents.pop(id(node))})
+        for child in node['children']:
+            parents[id(child)] = node['path']
+            queue.append(child)
+    return items
+
+
+def find_largest(folder_path, top_k=DEFAULT_TOP_K, progress_callback=None, stop_flag=None, dir_visitor=None):
+    """
+    单遍扫描找出最大的 top_k 个文件和文件夹（文件夹按递归总大小）
+
+    深度优先后序遍历：只有当前路径上的目录在栈中累计大小，目录出栈时总大小才确定；
+    文件和文件夹各用一个大小为 top_k 的最小堆保留最大项，内存占用与文件总数无关。
+    dir_visitor(dirpath, size, file_count) 在每个目录（含根目录）的递归总大小和文件数确定时调用，可用于保存快照。
+    progress_callback(dirpath, file_count)；返回 {'files', 'dirs', 'size', 'file_count'}，
+    files/dirs 为按大小降序的 [(size, path), ...]，被中断时返回None
+    """
+    file_heap = []
+    dir_heap = []
+    file_count = 0
+    entries = 0
+
+    def push(heap, size, path):
+        if len(heap) < top_k:
+            heapq.heappush(heap, (size, path))
+        elif size > heap[0][0]:
+            heapq.heapreplace(heap, (size, path))
+
+    def open_dir(dirpath):
+        """枚举一个目录：文件直接入堆，返回栈帧 [路径, 累计大小, 待处理子目录, 累计文件数]"""
+        nonlocal file_count, entries
+        frame = [dirpath, 0, [], 0]
+        try:
+            with os.scandir(dirpath) as it:
+                for entry in it:
+                    entries += 1
+                    if not entries & (STOP_CHECK_INTERVAL - 1):
+                        if stop_flag and stop_flag():
+                            return None
+                        if progress_callback:
+                            progress_callback(dirpath, file_count)
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not _is_junction(entry):
+                                frame[2].append(entry.path)
+                            continue
+                        size = entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+                    file_count += 1
+                    frame[1] += size
+                    frame[3] += 1
+                    push(file_heap, size, entry.path)
+        except OSError:
+            pass
+        return frame
+
+    root = open_dir(folder_path)
+    if root is None:
+        return None
+    stack = [root]
+    while stack:
+        frame = stack[-1]
+        if frame[2]:
+            child = open_dir(frame[2].pop())
+            if child is None:
+                return None
+            stack.append(child)
+            continue
+        stack.pop()
+        if dir_visitor:
+            dir_visitor(frame[0], frame[1], frame[3])
+        if stack:
+            stack[-1][1] += frame[1]
+            stack[-1][3] += frame[3]
+            push(dir_heap, frame[1], frame[0])
+
+    return {
+        'files': sorted(file_heap, reverse=True),
+        'dirs': sorted(dir_heap, reverse=True),
+        'size': root[1],
+        'file_count': file_count
+    }
+
+
+class CleanupPolicy:
+    """
+    按时间和文件名选择性清理的策略（在扫描遍历中逐个文件评估，不需要再次遍历）
+
+    older_than_days：只匹配修改时间早于N天的文件；patterns：文件名通配符（任一匹配即可）；
+    keep_newest：在所有匹配文件中保留最新的N个
+    """
+
+    def __init__(self, older_than_days=None, patterns=None, keep_newest=None, now=None):
+        self.older_than_days = older_than_days
+        self.patterns = [pattern.lower() for pattern in patterns or ()]
+        self.keep_newest = keep_newest
+        now = time.time() if now is None else now
+        self.cutoff = now - older_than_days * 86400 if older_than_days is not None else None
+
+    @classmethod
+    def from_dict(cls, config, now=None):
+        """从注册表中目标的 'policy' 配置创建；配置为空时返回None（整个目录清理）"""
+        if not config:
+            return None
+        return cls(config.get('older_than_days'), config.get('patterns'), config.get('keep_newest'), now)
+
+    def describe(self):
+        """策略的简短说明（显示在描述列）"""
+        parts = []
+        if self.patterns:
+            parts.append("、".join(self.patterns))
+        if self.older_than_days is not None:
+            parts.append(f"超过{self.older_than_days}天")
+        if self.keep_newest:
+            parts.append(f"保留最新{self.keep_newest}个")
+        return "，".join(parts)
+
+    def matches(self, name, st):
+        if self.cutoff is not None and st.st_mtime >= self.cutoff:
+            return False
+        if self.patterns:
+            name = name.lower()
+            return any(fnmatch.fnmatchcase(name, pattern) for pattern in self.patterns)
+        return True
+
+    def new_matches(self):
+        return PolicyMatches(self)
+
+
+class PolicyMatches:
+    """
+    一个目标的策略匹配结果：待删除字节数、文件数，以及按目录分组的删除列表 {dirpath: [(name, size, mtime), ...]}
+
+    删除列表记录扫描时的大小和修改时间，清理时文件已变化（被重写或替换）的不会删除。
+
+    keep_newest 用大小为N的最小堆（按修改时间）保留最新的匹配文件，被挤出堆的文件才进入删除列表，
+    因此一遍扫描即可确定结果；多个并行任务的结果可以合并
+    """
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.size = 0
+        self.files = 0
+        self.deletions = {}
+        self._newest = []
+
+    def _add(self, dirpath, name, size, mtime):
+        self.deletions.setdefault(dirpath, []).append((name, size, mtime))
+        self.size += size
+        self.files += 1
+
+    def _offer(self, mtime, dirpath, name, size):
+        """交给 keep_newest 堆，返回被挤出的最旧项（或None）"""
+        item = (mtime, dirpath, name, size)
+        if len(self._newest) < self.policy.keep_newest:
+            heapq.heappush(self._newest, item)
+            return None
+        return heapq.heappushpop(self._newest, item)
+
+    def visit(self, dirpath, name, st):
+        """file_visitor：评估一个文件"""
+        if not self.policy.matches(name, st):
+            return
+        if self.policy.keep_newest:
+            evicted = self._offer(st.st_mtime, dirpath, name, st.st_size)
+            if evicted:
+                self._add(*evicted[1:], evicted[0])
+        else:
+            self._add(dirpath, name, st.st_size, st.st_mtime)
+
+    def merge(self, other):
+        """合并另一个任务的结果"""
+        for dirpath, names in other.deletions.items():
+            for name, size, mtime in names:
+                self._add(dirpath, name, size, mtime)
+        for item in other._newest:
+            if self.policy.keep_newest:
+                evicted = self._offer(*item)
+                if evicted:
+                    self._add(*evicted[1:], evicted[0])
+        return self
+
+    def finish(self):
+        """扫描结束：keep_newest 堆中的文件保留，不再参与删除"""
+        self._newest = []
+        return self
+
+
+class FileColumns:
+    """
+    扫描时逐个文件记录的列式数据：大小、修改时间、扩展名编号、属主编号
+
+    每列是一块连续的定长数组（array.array），1000万个文件约占240MB，可以零拷贝转换为NumPy数组做分组聚合。
+    扩展名和属主uid按首次出现编号：extensions[编号] 为扩展名，uids[编号] 为uid，分组时直接按编号计数，无需排序去重。
+    作为 measure_paths 的收集器使用，多个任务的结果可以合并
+    """
+
+    def __init__(self):
+        self.sizes = array('q')
+        self.mtimes = array('d')
+        self.ext_ids = array('i')
+        self.owner_ids = array('i')
+        self.extensions = []
+        self.uids = []
+        self._ext_index = {}
+        self._uid_index = {}
+
+    def __len__(self):
+        return len(self.sizes)
+
+    @staticmethod
+    def _intern(index, values, value):
+        value_id = index.get(value)
+        if value_id is None:
+            value_id = index[value] = len(values)
+            values.append(value)
+        return value_id
+
+    def visit(self, dirpath, name, st):
+        """file_visitor：记录一个文件"""
+        self.sizes.append(st.st_size)
+        self.mtimes.append(st.st_mtime)
+        self.ext_ids.append(self._intern(self._ext_index, self.extensions, os.path.splitext(name)[1].lower()))
+        self.owner_ids.append(self._intern(self._uid_index, self.uids, getattr(st, "st_uid", 0)))
+
+    @staticmethod
+    def _extend_remapped(column, other_column, remap):
+        """追加另一个任务的编号列，编号按 remap 映射到本对象的编号"""
+        if remap == list(range(len(remap))):
+            column.extend(other_column)
+        elif np is not None:
+            column.frombytes(np.asarray(remap, dtype=np.int32)[np.frombuffer(other_column, dtype=np.int32)].tobytes())
+        else:
+            column.extend(remap[value_id] for value_id in other_column)
+
+    def merge(self, other):
+        """合并另一个任务的结果"""
+        self.sizes.extend(other.sizes)
+        self.mtimes.extend(other.mtimes)
+        self._extend_remapped(self.ext_ids, other.ext_ids,
+                              [self._intern(self._ext_index, self.extensions, ext) for ext in other.extensions])
+        self._extend_remapped(self.owner_ids, other.owner_ids,
+                              [self._intern(self._uid_index, self.uids, uid) for uid in other.uids])
+        return self
+
+    def finish(self):
+        return self
+
+
+def _owner_name(uid):
+    if pwd is not None:
+        try:
+            return pwd.getpwuid(uid).pw_name
+        except (KeyError, OverflowError):
+            pass
+    return f"uid {uid}"
+
+
+def _age_labels():
+    bounds = (0,) + AGE_BUCKET_DAYS
+    labels = [f"{low}-{high}天" for low, high in zip(bounds, bounds[1:])]
+    return labels + [f"{AGE_BUCKET_DAYS[-1]}天以上"]
+
+
+def _ranked(keys, sizes, counts, top_n):
+    """按字节数从大到小排列 (键, 字节数, 文件数)，只保留有文件的分组"""
+    rows = [(key, int(size), int(count)) for key, size, count in zip(keys, sizes, counts) if count]
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return rows[:top_n] if top_n else rows
+
+
+def file_breakdown(columns, now=None, top_n=None):
+    """
+    按扩展名、文件年龄和属主统计字节数与文件数
+
+    有NumPy时按编号整列做 bincount 分组聚合，不逐个文件循环；否则退回纯Python累加。
+    返回 {'by_extension': [(扩展名, 字节数, 文件数)], 'by_age': [(年龄段, 字节数, 文件数)],
+          'by_owner': [(用户, 字节数, 文件数)], 'total_size', 'total_files'}，
+    扩展名和用户按字节数从大到小排列（top_n 限制条数），年龄段按从新到旧排列
+    """
+    now = time.time() if now is None else now
+    age_edges = [now - days * 86400 for days in AGE_BUCKET_DAYS]
+    ext_count = len(columns.extensions)
+    age_count = len(AGE_BUCKET_DAYS) + 1
+    owner_count = len(columns.uids)
+
+    if np is not None:
+        sizes = np.frombuffer(columns.sizes, dtype=np.int64)
+        mtimes = np.frombuffer(columns.mtimes, dtype=np.float64)
+        ext_ids = np.frombuffer(columns.ext_ids, dtype=np.int32)
+        owner_ids = np.frombuffer(columns.owner_ids, dtype=np.int32)
+        # 字节数以float64累加，2^53字节（8PB）以内精确
+        weights = sizes.astype(np.float64)
+        ext_sizes = np.bincount(ext_ids, weights=weights, minlength=ext_count)
+        ext_counts = np.bincount(ext_ids, minlength=ext_count)
+        # 年龄段号 = 早于多少个分段边界（边界只有几个，逐个整列比较比二分查找快）
+        age_ids = np.zeros(len(mtimes), dtype=np.intp)
+        for edge in age_edges:
+            age_ids += mtimes < edge
+        age_sizes = np.bincount(age_ids, weights=weights, minlength=age_count)
+        age_counts = np.bincount(age_ids, minlength=age_count)
+        owner_sizes = np.bincount(owner_ids, weights=weights, minlength=owner_count)
+        owner_counts = np.bincount(owner_ids, minlength=owner_count)
+        total_size = int(sizes.sum())
+    else:
+        ext_sizes, ext_counts = [0] * ext_count, [0] * ext_count
+        age_sizes, age_counts = [0] * age_count, [0] * age_count
+        owner_sizes, owner_counts = [0] * owner_count, [0] * owner_count
+        for size, mtime, ext_id, owner_id in zip(columns.sizes, columns.mtimes, columns.ext_ids, columns.owner_ids):
+            ext_sizes[ext_id] += size
+            ext_counts[ext_id] += 1
+            age_id = sum(1 for edge in age_edges if mtime < edge)
+            age_sizes[age_id] += size
+            age_counts[age_id] += 1
+            owner_sizes[owner_id] += size
+            owner_counts[owner_id] += 1
+        total_size = sum(columns.sizes)
+
+    extensions = [ext or "（无扩展名）" for ext in columns.extensions]
+    return {
+        'by_extension': _ranked(extensions, ext_sizes, ext_counts, top_n),
+        'by_age': [(label, int(size), int(count)) for label, size, count in zip(_age_labels(), age_sizes, age_counts)],
+        'by_owner': _ranked([_owner_name(uid) for uid in columns.uids], owner_sizes, owner_counts, top_n),
+        'total_size': total_size,
+        'total_files': len(columns)
+    }
+
+
+def _empty_stats():
+    return {'size': 0, 'allocated': 0, 'files': 0, 'dirs': 0}
+
+
+def _list_top_level(folder_path, file_visitor=None):
+    """
+    枚举目录的第一层：直接统计其中的文件，返回 (文件统计, 一级子目录列表)
+    """
+    stats = _empty_stats()
+    subdirs = []
+    try:
+        with os.scandir(folder_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not _is_junction(entry):
+                            subdirs.append(entry.path)
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                stats['files'] += 1
+                stats['size'] += st.st_size
+                if file_visitor:
+                    file_visitor(folder_path, entry.name, st)
+                blocks = getattr(st, "st_blocks", None)
+                stats['allocated'] += blocks * 512 if blocks is not None else st.st_size
+    except OSError:
+        pass
+    return stats, subdirs
+
+
+class DirSizeIndex:
+    """
+    持久化的目录大小索引（SQLite），按目录修改时间失效
+
+    每个目录记录自身直接包含的文件统计、子目录列表和修改时间。重复扫描时只对 mtime 变化的目录重新枚举，
+    其余目录直接复用缓存并沿记录的子目录继续向下（每个目录一次 stat）。
+    注意：原地改写文件内容（如追加日志）不会改变所在目录的 mtime，这类增长要等目录本身变化后才能体现。
+    索引只保存每个目录的汇总，不保存逐个文件的信息，因此只用于整目录清理的目标：带清理策略（按时间/文件名）的目标
+    和需要逐个文件收集的扫描（如空间分布）每次都完整遍历，不受索引加速，临时文件等目标的扫描耗时不会因索引而减少。
+    扫描可在多个工作线程中并发进行（各线程处理不同目录；首次加载由锁保护，只加载一次）
+    """
+
+    def __init__(self, index_path=DEFAULT_SIZE_INDEX_PATH):
+        self.index_path = index_path
+        self._load_lock = threading.Lock()
+        self._entries = None
+        self._dirty = set()
+        self._visited = set()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY,
+                mtime REAL NOT NULL,
+                scanned_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                allocated INTEGER NOT NULL,
+                files INTEGER NOT NULL,
+                subdirs TEXT NOT NULL
+            )
+        """)
+        return conn
+
+    def load(self):
+        """从磁盘加载索引（重复调用不会重新加载；多个线程同时调用时只有一个线程加载，其余线程等待加载完成）"""
+        if self._entries is not None:
+            return
+        with self._load_lock:
+            if self._entries is not None:
+                return
+            entries = {}
+            try:
+                conn = self._connect()
+                try:
+                    for path, mtime, scanned_at, size, allocated, files, subdirs in conn.execute("SELECT * FROM dirs"):
+                        entries[path] = (mtime, scanned_at, size, allocated, files, json.loads(subdirs))
+                finally:
+                    conn.close()
+            except (sqlite3.Error, ValueError):
+                entries = {}
+            self._visited = set()
+            # 加载完整后才对其他线程可见
+            self._entries = entries
+
+    def scan_tree_size(self, folder_path, progress_callback=None, stop_flag=None):
+        """与 scan_tree_size 相同的统计结果，但跳过 mtime 未变化目录的枚举"""
+        self.load()
+        size = 0
+        allocated = 0
+        files = 0
+        dirs = 0
+        entries = 0
+        stack = [folder_path]
+        while stack:
+            dirpath = stack.pop()
+            try:
+                mtime = os.stat(dirpath).st_mtime
+            except OSError:
+                continue
+            self._visited.add(dirpath)
+            cached = self._entries.get(dirpath)
+            if cached and cached[0] == mtime and mtime < cached[1] - MTIME_RACE_WINDOW:
+                dir_size, dir_allocated, dir_files, subdirs = cached[2:]
+            else:
+                if progress_callback:
+                    progress_callback(dirpath, files)
+                dir_size = dir_allocated = dir_files = 0
+                subdirs = []
+                try:
+                    with os.scandir(dirpath) as it:
+                        for entry in it:
+                            entries += 1
+                            if not entries & (STOP_CHECK_INTERVAL - 1):
+                                if stop_flag and stop_flag():
+                                    return None
+                                if progress_callback:
+                                    progress_callback(dirpath, files + dir_files)
+                            try:
+                                if entry.is_dir(follow_symlinks=False):
+                                    if not _is_junction(entry):
+                                        subdirs.append(entry.name)
+                                    continue
+                                st = entry.stat(follow_symlinks=False)
+                            except OSError:
+                                continue
+                            dir_files += 1
+                            dir_size += st.st_size
+                            blocks = getattr(st, "st_blocks", None)
+                            dir_allocated += blocks * 512 if blocks is not None else st.st_size
+                except OSError:
+                    continue
+                self._entries[dirpath] = (mtime, time.time(), dir_size, dir_allocated, dir_files, subdirs)
+                self._dirty.add(dirpath)
+            size += dir_size
+            allocated += dir_allocated
+            files += dir_files
+            dirs += len(subdirs)
+            stack.extend(os.path.join(dirpath, name) for name in subdirs)
+        if stop_flag and stop_flag():
+            return None
+        return {'size': size, 'allocated': allocated, 'files': files, 'dirs': dirs}
+
+    def save(self, roots=()):
+        """
+        写回本次扫描更新的目录；roots 为完整扫描过的根目录，其下本次未访问到的记录（已删除的目录）一并清除
+        """
+        if self._entries is None:
+            return
+        stale = [
+            path for path in self._entries
+            if path not in self._visited and any(_is_under(path, root) for root in roots)
+        ]
+        for path in stale:
+            del self._entries[path]
+        conn = self._connect()
+        try:
+            conn.executemany("DELETE FROM dirs WHERE path = ?", [(path,) for path in stale])
+            conn.executemany(
+                "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (path, *self._entries[path][:5], json.dumps(self._entries[path][5], ensure_ascii=False))
+                    for path in self._dirty if path in self._entries
+                ]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        self._dirty = set()
+        self._visited = set()
+
+    def invalidate(self, paths):
+        """清理后使被删除路径、其所有子目录及父目录的缓存失效，并立即写回磁盘"""
+        self.load()
+        removed = set()
+        for path in paths:
+            path = os.path.abspath(path)
+            removed.add(os.path.dirname(path))
+            removed.update(cached for cached in self._entries if _is_under(cached, path))
+        for path in removed:
+            self._entries.pop(path, None)
+            self._dirty.discard(path)
+        conn = self._connect()
+        try:
+            conn.executemany("DELETE FROM dirs WHERE path = ?", [(path,) for path in removed])
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def _is_under(path, root):
+    """path 是否为 root 本身或其下的路径"""
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def measure_paths(paths, progress_callback=None, stop_flag=None, workers=DEFAULT_SCAN_WORKERS, size_index=None,
+                  collectors=None, dir_visitor=None):
+    """
+    用有界线程池并行统计多个目录的大小
+
+    先并行枚举每个目录的第一层，再把所有一级子目录作为独立任务并行扫描，
+    总耗时取决于最大的子目录，而不是所有目标之和。
+    progress_callback(root_path, dirpath, file_count, done, total) 可能在多个工作线程中被调用。
+    传入 size_index（DirSizeIndex）时子目录通过索引增量统计。
+    collectors 为 {root_path: 工厂函数}，工厂创建带 visit/merge/finish 的收集器（如 PolicyMatches、FileColumns），
+    这些目录在同一遍扫描中逐个文件交给收集器（需要逐个文件，因此不使用目录大小索引），
+    结果放在统计的 'collected' 中。
+    dir_visitor(dirpath, size, files) 在调用线程中对每个一级子目录调用一次（递归大小和文件数，用于保存快照）。
+    返回 {root_path: 统计}（与 scan_tree_size 的结果格式相同），被中断时返回None
+    """
+    collectors = collectors or {}
+    results = {path: _empty_stats() for path in paths}
+    collected = {path: factory() for path, factory in collectors.items() if path in results}
+    executor = ThreadPoolExecutor(max_workers=workers)
+
+    def list_top_level(path):
+        return _list_top_level(path, collected[path].visit if path in collected else None)
+
+    def tree_size(root_path, subdir, progress, stop_flag):
+        if root_path in collected:
+            # 每个任务单独收集，完成后在调用线程中合并，避免多线程争用
+            task_collector = collectors[root_path]()
+            return scan_tree_size(subdir, progress, stop_flag, task_collector.visit), task_collector
+        if size_index:
+            return size_index.scan_tree_size(subdir, progress, stop_flag), None
+        return scan_tree_size(subdir, progress, stop_flag), None
+
+    try:
+        # 第一阶段：枚举各目标的第一层
+        tasks = []
+        for path, (stats, subdirs) in zip(paths, executor.map(list_top_level, paths)):
+            for key in stats:
+                results[path][key] += stats[key]
+            results[path]['dirs'] += len(subdirs)
+            tasks.extend((path, subdir) for subdir in subdirs)
+        if stop_flag and stop_flag():
+            return None
+
+        # 第二阶段：一级子目录并行扫描，完成一个计一个
+        total = len(paths) + len(tasks)
+        done = [len(paths)]
+
+        def make_progress(root_path):
+            if not progress_callback:
+                return None
+            return lambda dirpath, file_count: progress_callback(root_path, dirpath, file_count, done[0], total)
+
+        futures = {
+            executor.submit(tree_size, root_path, subdir, make_progress(root_path), stop_flag): (root_path, subdir)
+            for root_path, subdir in tasks
+        }
+        for future in as_completed(futures):
+            stats, task_collector = future.result()
+            if stats is None:
+                return None
+            root_path, subdir = futures[future]
+            if dir_visitor:
+                dir_visitor(subdir, stats['size'], stats['files'])
+            for key in stats:
+                results[root_path][key] += stats[key]
+            if task_collector:
+                collected[root_path].merge(task_collector)
+            done[0] += 1
+            if progress_callback:
+                progress_callback(root_path, root_path, results[root_path]['files'], done[0], total)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    for path, collector in collected.items():
+        results[path]['collected'] = collector.finish()
+    return results
+
+
+def collect_file_columns(paths, progress_callback=None, stop_flag=None, workers=DEFAULT_SCAN_WORKERS):
+    """
+    并行扫描多个路径，把其中所有文件记录到一个 FileColumns（路径为单个文件时直接记录）
+
+    progress_callback 与 measure_paths 相同。被中断时返回None
+    """
+    columns = FileColumns()
+    folders = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            folders.append(path)
+        elif stat.S_ISREG(st.st_mode):
+            columns.visit(os.path.dirname(path), os.path.basename(path), st)
+    results = measure_paths(folders, progress_callback, stop_flag, workers,
+                            collectors={path: FileColumns for path in folders})
+    if results is None:
+        return None
+    for path in folders:
+        columns.merge(results[path]['collected'])
+    return columns
+
+
+def current_platform():
+    """清理目标注册表中的平台名：windows / linux / darwin"""
+    if sys.platform.startswith("win"):
+        return "windows"
+    if sys.platform == "darwin":
+        return "darwin"
+    return "linux"
+
+
+def load_scan_targets(registry_path=None, platform_name=None):
+    """
+    从JSON注册表加载当前平台的清理目标
+
+    未指定 registry_path 时优先使用用户目录下的 USER_REGISTRY_PATH，否则使用随程序提供的默认注册表。
+    每个目标包含 name / category / description / patterns（支持环境变量、~ 和 glob 通配符），可选 exclude；
+    通配符在扫描时才展开（见 iter_target_paths）
+    """
+    if registry_path is None:
+        registry_path = USER_REGISTRY_PATH if os.path.exists(USER_REGISTRY_PATH) else DEFAULT_REGISTRY_PATH
+    with open(registry_path, "r", encoding="utf-8") as f:
+        registry = json.load(f)
+    return registry.get(platform_name or current_platform(), [])
+
+
+def default_scan_targets():
+    """当前平台的默认可清理目标"""
+    return load_scan_targets()
+
+
+def _expand_pattern(pattern):
+    return os.path.expanduser(os.path.expandvars(pattern))
+
+
+def iter_target_paths(target_group):
+    """
+    逐个生成目标匹配到的路径（惰性展开通配符）
+
+    兼容直接给出 'paths' 列表的旧格式；'exclude' 中的路径（同样支持通配符）会被跳过
+    """
+    excludes = [_expand_pattern(pattern) for pattern in target_group.get('exclude', ())]
+    for temp_path in target_group.get('paths', ()):
+        yield temp_path
+    for pattern in target_group.get('patterns', ()):
+        pattern = _expand_pattern(pattern)
+        matches = glob.iglob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        for temp_path in matches:
+            if not any(fnmatch.fnmatch(temp_path, exclude) for exclude in excludes):
+                yield temp_path
+
+
+def scan_cleanup_targets(progress_callback=None, stop_flag=None, scan_targets=None, workers=DEFAULT_SCAN_WORKERS,
+                         size_index=None, dir_visitor=None):
+    """
+    扫描可清理的目标（所有目标及其一级子目录并行统计；通配符匹配到的单个文件直接统计）
+
+    progress_callback(message, current, total) 与原先的约定相同，current/total 为已完成/全部扫描任务数。
+    传入 size_index（DirSizeIndex）时复用目录大小缓存，扫描结束后写回；
+    带清理策略的目标需要逐个文件评估，每次都完整遍历，不经过索引。
+    dir_visitor(path, size, files) 对每个目标及其一级子目录调用一次（目标的全部大小，不只是可清理部分），用于保存快照
+    """
+    if scan_targets is None:
+        scan_targets = default_scan_targets()
+
+    # 同一路径可能出现在多个目标中（如 TEMP 与 LOCALAPPDATA\Temp），只统计一次，按首次出现归属
+    owners = {}
+    file_stats = {}
+    for target_group in scan_targets:
+        if stop_flag and stop_flag():
+            return []
+        for temp_path in iter_target_paths(target_group):
+            key = os.path.normcase(os.path.abspath(temp_path)) if temp_path else None
+            if not key or key in owners:
+                continue
+            try:
+                st = os.stat(temp_path)
+            except OSError:
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                owners[key] = (temp_path, target_group)
+            elif stat.S_ISREG(st.st_mode):
+                owners[key] = (temp_path, target_group)
+                file_stats[temp_path] = {'size': st.st_size, 'files': 1}
+    paths = [temp_path for temp_path, target_group in owners.values() if temp_path not in file_stats]
+    policies = {}
+    for temp_path, target_group in owners.values():
+        policy = CleanupPolicy.from_dict(target_group.get('policy'))
+        if policy and temp_path not in file_stats:
+            policies[temp_path] = policy
+    names = {temp_path: target_group['name'] for temp_path, target_group in owners.values()}
+
+    def folder_progress_callback(root_path, dirpath, file_count, done, total):
+        detail_msg = f"{names[root_path]}: {root_path}\n📁 {dirpath} ({file_count} 个文件)"
+        progress_callback(detail_msg, done, total)
+
+    if progress_callback:
+        progress_callback(f"开始扫描 {len(paths)} 个目标...", 0, len(paths))
+    if size_index:
+        # 在创建工作线程前加载索引
+        size_index.load()
+    results = measure_paths(paths, folder_progress_callback if progress_callback else None, stop_flag, workers,
+                            size_index, {path: policy.new_matches for path, policy in policies.items()}, dir_visitor)
+    if size_index:
+        # 中断时只写回已更新的目录，不清除未访问的记录；按策略扫描的目标不经过索引
+        indexed_roots = [os.path.abspath(path) for path in paths if path not in policies]
+        size_index.save(roots=indexed_roots if results is not None else ())
+    if results is None:
+        return []
+
+    cleanup_items = []
+    for temp_path, target_group in owners.values():
+        stats = file_stats.get(temp_path) or results[temp_path]
+        if dir_visitor:
+            dir_visitor(temp_path, stats['size'], stats['files'])
+        if temp_path in policies:
+            # 按策略清理：大小为匹配文件的总大小，清理时只删除删除列表中的文件
+            path_matches = stats['collected']
+            if path_matches.size > 0:
+                cleanup_items.append({
+                    'path': temp_path,
+                    'type': '文件夹',
+                    'size': path_matches.size,
+                    'files': path_matches.files,
+                    'category': target_group['category'],
+                    'description': f"{target_group['description']}（{policies[temp_path].describe()}）",
+                    'deletions': path_matches.deletions
+                })
+            continue
+        if stats['size'] > 0:
+            cleanup_items.append({
+                'path': temp_path,
+                'type': '文件' if temp_path in file_stats else '文件夹',
+                'size': stats['size'],
+                'files': stats['files'],
+                'category': target_group['category'],
+                'description': target_group['description']
+            })
+    return cleanup_items
+
+
+def _unlink(path):
+    """删除文件；只读文件（Windows常见）去掉只读属性后重试"""
+    try:
+        os.unlink(path)
+    except PermissionError:
+        os.chmod(path, stat.S_IWRITE)
+        os.unlink(path)
+
+
+def _delete_failure_reason(error):
+    if isinstance(error, PermissionError):
+        return "权限不足"
+    return str(error)
+
+
+def _delete_dir_files(dirpath):
+    """
+    删除一个目录中的所有文件（不递归），返回 (释放字节数, 删除文件数, 失败列表, 子目录列表)
+
+    释放字节数只统计真正删除成功、且没有其他硬链接的文件
+    """
+    freed = 0
+    deleted = 0
+    failures = []
+    subdirs = []
+    try:
+        it = os.scandir(dirpath)
+    except FileNotFoundError:
+        return freed, deleted, failures, subdirs
+    except OSError as e:
+        failures.append((dirpath, _delete_failure_reason(e)))
+        return freed, deleted, failures, subdirs
+    with it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if _is_junction(entry):
+                        # 目录联接点只删除链接本身，不进入目标目录
+                        os.rmdir(entry.path)
+                    else:
+                        subdirs.append(entry.path)
+                    continue
+                st = entry.stat(follow_symlinks=False)
+                _unlink(entry.path)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                failures.append((entry.path, _delete_failure_reason(e)))
+                continue
+            deleted += 1
+            if st.st_nlink <= 1:
+                freed += st.st_size
+    return freed, deleted, failures, subdirs
+
+
+def delete_paths(paths, progress_callback=None, failure_callback=None, stop_flag=None,
+                 workers=DEFAULT_DELETE_WORKERS):
+    """
+    用有界线程池并行删除文件和目录树，按实际删除成功的文件统计释放空间
+
+    每个目录作为一个任务删除其中的文件，发现的子目录继续提交给线程池；所有文件处理完后自底向上删除空目录
+    （目录中仍有删除失败的文件时该目录会保留，失败原因已按文件报告）。
+    已被其他选中项包含的路径会跳过，避免重复删除。
+    progress_callback(deleted_count, freed_size, current_path) 与 failure_callback(path, reason) 都在调用线程中触发。
+    返回 {'deleted', 'freed', 'failed': [(path, reason)], 'freed_by_path': {path: 释放字节数}, 'stopped'}
+    """
+    # 去掉已被其他选中目录包含的路径：祖先目录排序在前，逐级检查每个路径的上级是否已被选中
+    # （不能只和上一个比较，"/a/b c" 会排在 "/a/b" 与 "/a/b/x" 之间）
+    roots = []
+    accepted = set()
+    for path in sorted({os.path.abspath(path) for path in paths}):
+        parent = os.path.dirname(path)
+        while parent not in accepted and parent != os.path.dirname(parent):
+            parent = os.path.dirname(parent)
+        if parent in accepted:
+            continue
+        accepted.add(path)
+        roots.append(path)
+
+    result = {'deleted': 0, 'freed': 0, 'failed': [], 'freed_by_path': {path: 0 for path in roots}, 'stopped': False}
+
+    def fail(path, reason):
+        result['failed'].append((path, reason))
+        if failure_callback:
+            failure_callback(path, reason)
+
+    # 文件直接删除，目录交给线程池
+    dir_roots = []
+    for path in roots:
+        try:
+            st = os.stat(path, follow_symlinks=False)
+        except FileNotFoundError:
+            fail(path, "文件不存在")
+            continue
+        except OSError as e:
+            fail(path, _delete_failure_reason(e))
+            continue
+        if stat.S_ISDIR(st.st_mode) and not os.path.islink(path):
+            dir_roots.append(path)
+            continue
+        try:
+            _unlink(path)
+        except OSError as e:
+            fail(path, _delete_failure_reason(e))
+            continue
+        result['deleted'] += 1
+        freed = st.st_size if st.st_nlink <= 1 else 0
+        result['freed'] += freed
+        result['freed_by_path'][path] = freed
+        if progress_callback:
+            progress_callback(result['deleted'], result['freed'], path)
+
+    all_dirs = []
+
+    def account(future, dirpath, root):
+        """汇总一个目录任务的结果，返回发现的子目录"""
+        freed, deleted, failures, subdirs = future.result()
+        all_dirs.append(dirpath)
+        result['deleted'] += deleted
+        result['freed'] += freed
+        result['freed_by_path'][root] += freed
+        for path, reason in failures:
+            fail(path, reason)
+        return subdirs
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {executor.submit(_delete_dir_files, path): (path, path) for path in dir_roots}
+        while futures and not result['stopped']:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                dirpath, root = futures.pop(future)
+                subdirs = account(future, dirpath, root)
+                if stop_flag and stop_flag():
+                    result['stopped'] = True
+                if not result['stopped']:
+                    for subdir in subdirs:
+                        futures[executor.submit(_delete_dir_files, subdir)] = (subdir, root)
+                if progress_callback:
+                    progress_callback(result['deleted'], result['freed'], dirpath)
+        # 被中断时取消未开始的任务，已在执行的任务仍计入结果，保证释放空间准确
+        for future, (dirpath, root) in futures.items():
+            if not future.cancel():
+                account(future, dirpath, root)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    # 自底向上删除已清空的目录
+    if not result['stopped']:
+        for dirpath in sorted(all_dirs, key=lambda path: path.count(os.sep), reverse=True):
+            try:
+                os.rmdir(dirpath)
+            except OSError:
+                pass
+    return result
+
+
+def _delete_listed_files(dirpath, names):
+    """
+    删除一个目录中列出的文件，返回 (释放字节数, 删除文件数, 失败列表)
+
+    列表项为 (文件名, 大小, 修改时间)（旧版清理计划只有 (文件名, 大小)），
+    当前大小或修改时间与扫描时不同的文件（扫描后被重写或替换）跳过，不删除
+    """
+    freed = 0
+    deleted = 0
+    failures = []
+    for name, size, *mtime in names:
+        path = os.path.join(dirpath, name)
+        try:
+            st = os.stat(path, follow_symlinks=False)
+            if stat.S_ISDIR(st.st_mode):
+                continue
+            if st.st_size != size or (mtime and st.st_mtime != mtime[0]):
+                continue
+            _unlink(path)
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            failures.append((path, _delete_failure_reason(e)))
+            continue
+        deleted += 1
+        if st.st_nlink <= 1:
+            freed += st.st_size
+    return freed, deleted, failures
+
+
+def execute_cleanup(items, progress_callback=None, failure_callback=None, stop_flag=None,
+                    workers=DEFAULT_DELETE_WORKERS):
+    """
+    执行清理：整体清理的项目交给 delete_paths；带删除列表（按策略扫描）的项目只删除列表中的文件，不再遍历目录
+
+    每提交一个目录的删除任务前检查 stop_flag，停止后不再提交新任务，已提交但未开始的任务取消。
+    回调与返回值同 delete_paths
+    """
+    whole_paths = [item['path'] for item in items if item.get('deletions') is None]
+    result = delete_paths(whole_paths, progress_callback, failure_callback, stop_flag, workers)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {}
+        for item in items:
+            if item.get('deletions') is None:
+                continue
+            result['freed_by_path'].setdefault(item['path'], 0)
+            for dirpath, names in item['deletions'].items():
+                if result['stopped'] or (stop_flag and stop_flag()):
+                    result['stopped'] = True
+                    break
+                futures[executor.submit(_delete_listed_files, dirpath, names)] = (dirpath, item['path'])
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            dirpath, root = futures[future]
+            freed, deleted, failures = future.result()
+            result['deleted'] += deleted
+            result['freed'] += freed
+            result['freed_by_path'][root] += freed
+            for path, reason in failures:
+                result['failed'].append((path, reason))
+                if failure_callback:
+                    failure_callback(path, reason)
+            if progress_callback:
+                progress_callback(result['deleted'], result['freed'], dirpath)
+            if stop_flag and stop_flag() and not result['stopped']:
+                result['stopped'] = True
+                for pending in futures:
+                    pending.cancel()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return result
+
+
+def available_compress_methods():
+    """当前环境可用的压缩格式"""
+    return [method for method in COMPRESS_METHODS if method != 'zstd' or zstandard is not None]
+
+
+def _open_archive(path, method, mode, level=None):
+    """以二进制流方式打开压缩文件（mode 为 'wb' 或 'rb'）"""
+    if method == 'gzip':
+        return gzip.open(path, mode, compresslevel=level) if mode == 'wb' else gzip.open(path, mode)
+    if method == 'lzma':
+        return lzma.open(path, mode, preset=level) if mode == 'wb' else lzma.open(path, mode)
+    if method == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd 压缩需要安装 zstandard")
+        if mode == 'wb':
+            return zstandard.ZstdCompressor(level=level).stream_writer(open(path, 'wb'))
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'))
+    raise ValueError(f"不支持的压缩格式：{method}")
+
+
+def _compress_file(path, method, level=None):
+    """
+    就地压缩一个文件（在工作进程中执行）：写出 文件名+扩展名 的压缩文件，解压校验内容摘要一致、
+    且原文件在压缩期间未被修改后才删除原文件；压缩文件保留原文件的权限、属主和修改时间
+    （写入期间临时文件只有当前用户可读写，不会暴露原本受限的内容）。
+    返回 (path, 原大小, 压缩后大小, 失败原因)，压缩后不变小时压缩后大小为None（保留原文件）
+    """
+    suffix, default_level = COMPRESS_METHODS[method]
+    level = default_level if level is None else level
+    archive_path = path + suffix
+    temp_path = archive_path + ".tmp"
+    temp_created = False  # 临时文件由本次创建且还未改名为压缩文件，结束时要删除
+    try:
+        st = os.stat(path, follow_symlinks=False)
+        if not stat.S_ISREG(st.st_mode):
+            return path, 0, None, "不是普通文件"
+        if st.st_nlink > 1:
+            return path, st.st_size, None, "存在硬链接，压缩后无法释放空间"
+        if os.path.lexists(archive_path):
+            return path, st.st_size, None, f"压缩文件已存在：{archive_path}"
+
+        digest = hashlib.md5()
+        try:
+            os.close(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600))
+        except FileExistsError:
+            # 不是本次创建的文件，不覆盖也不删除
+            return path, st.st_size, None, f"临时文件已存在：{temp_path}"
+        temp_created = True
+        with open(path, 'rb') as source, _open_archive(temp_path, method, 'wb', level) as target:
+            while True:
+                chunk = source.read(COMPRESS_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                target.write(chunk)
+
+        # 校验：解压后的内容摘要与原文件一致
+        check = hashlib.md5()
+        with _open_archive(temp_path, method, 'rb') as archive:
+            while True:
+                chunk = archive.read(COMPRESS_CHUNK_SIZE)
+                if not chunk:
+                    break
+                check.update(chunk)
+        if check.digest() != digest.digest():
+            return path, st.st_size, None, "压缩文件校验失败"
+
+        current = os.stat(path, follow_symlinks=False)
+        if (current.st_size, current.st_mtime_ns) != (st.st_size, st.st_mtime_ns):
+            return path, st.st_size, None, "压缩期间文件被修改"
+        archive_size = os.path.getsize(temp_path)
+        if archive_size >= st.st_size:
+            return path, st.st_size, None, None
+
+        if hasattr(os, "chown"):
+            try:
+                os.chown(temp_path, st.st_uid, st.st_gid)
+            except OSError:
+                # 非root用户不能把属主改成别人，保留当前用户为属主
+                pass
+        os.chmod(temp_path, stat.S_IMODE(st.st_mode))
+        os.utime(temp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(temp_path, archive_path)
+        temp_created = False
+        try:
+            _unlink(path)
+        except OSError as e:
+            # 原文件删不掉（如仍被程序占用）时撤销压缩文件，不留下两份
+            os.remove(archive_path)
+            return path, st.st_size, None, _delete_failure_reason(e)
+        return path, st.st_size, archive_size, None
+    except FileNotFoundError:
+        return path, 0, None, "文件不存在"
+    except Exception as e:
+        return path, 0, None, _delete_failure_reason(e)
+    finally:
+        if temp_created:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
+def iter_compress_candidates(items, min_age_days=COMPRESS_MIN_AGE_DAYS, categories=COMPRESS_CATEGORIES, now=None):
+    """
+    列出清理项目中要压缩的文件：带删除列表（按策略扫描）的项目只取列表中的文件，文件夹项目取其中全部文件；
+    只处理 categories 中类别的项目（None 表示不限），只取超过 min_age_days 天未修改的文件，
+    已经是压缩格式的文件跳过
+    """
+    now = time.time() if now is None else now
+    cutoff = now - min_age_days * 86400 if min_age_days else None
+    for item in items:
+        if categories is not None and item.get('category') not in categories:
+            continue
+        if item.get('deletions') is not None:
+            paths = (os.path.join(dirpath, entry[0]) for dirpath, names in item['deletions'].items() for entry in names)
+        elif os.path.isdir(item['path']):
+            paths = (os.path.join(dirpath, name) for dirpath, dirs, files in os.walk(item['path']) for name in files)
+        else:
+            paths = (item['path'],)
+        for path in paths:
+            if path.lower().endswith(COMPRESSED_SUFFIXES):
+                continue
+            if cutoff is not None:
+                try:
+                    if os.stat(path, follow_symlinks=False).st_mtime >= cutoff:
+                        continue
+                except OSError:
+                    continue
+            yield path
+
+
+def compress_paths(paths, method='gzip', level=None, progress_callback=None, failure_callback=None, stop_flag=None,
+                   workers=DEFAULT_COMPRESS_WORKERS):
+    """
+    用进程池并行就地压缩文件（每个文件一个任务，同时在途的任务数有上限，paths 可以是生成器）
+
+    progress_callback(compressed_count, reclaimed_size, current_path) 与 failure_callback(path, reason) 在调用线程中触发。
+    返回 {'compressed', 'skipped'（压缩后不变小而保留的文件数）, 'original', 'archived', 'reclaimed',
+          'failed': [(path, reason)], 'stopped'}，reclaimed = 已压缩文件的原大小 - 压缩后大小
+    """
+    if method not in available_compress_methods():
+        raise ValueError(f"不可用的压缩格式：{method}")
+    result = {'compressed': 0, 'skipped': 0, 'original': 0, 'archived': 0, 'reclaimed': 0, 'failed': [],
+              'stopped': False}
+
+    def account(future):
+        path, original_size, archive_size, reason = future.result()
+        if reason:
+            result['failed'].append((path, reason))
+            if failure_callback:
+                failure_callback(path, reason)
+        elif archive_size is None:
+            result['skipped'] += 1
+        else:
+            result['compressed'] += 1
+            result['original'] += original_size
+            result['archived'] += archive_size
+            result['reclaimed'] += original_size - archive_size
+        if progress_callback:
+            progress_callback(result['compressed'], result['reclaimed'], path)
+
+    max_pending = workers * 4
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = set()
+        for path in paths:
+            if stop_flag and stop_flag():
+                result['stopped'] = True
+                break
+            pending.add(executor.submit(_compress_file, path, method, level))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    account(future)
+        # 被中断时取消未开始的任务，已在执行的任务仍计入结果（它们可能已经删除了原文件）
+        if result['stopped']:
+            pending = {future for future in pending if not future.cancel()}
+        for future in as_completed(pending):
+            if future.cancelled():
+                continue
+            account(future)
+            if stop_flag and stop_flag() and not result['stopped']:
+                result['stopped'] = True
+                for other in pending:
+                    other.cancel()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return result
+
+
+def execute_compression(items, method='gzip', level=None, progress_callback=None, failure_callback=None,
+                        stop_flag=None, workers=DEFAULT_COMPRESS_WORKERS, min_age_days=COMPRESS_MIN_AGE_DAYS):
+    """就地压缩清理项目中的冷日志文件（见 iter_compress_candidates），回调与返回值同 compress_paths"""
+    return compress_paths(iter_compress_candidates(items, min_age_days), method, level, progress_callback,
+                          failure_callback, stop_flag, workers)
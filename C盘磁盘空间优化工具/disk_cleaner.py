@@ -10,193 +10,93 @@ from tkinter import filedialog, messagebox
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import os
+import time
 import threading
-import shutil
-
-
-def format_file_size(size):
-    """格式化文件大小"""
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if size < 1024.0:
-            return f"{size:.2f} {unit}"
-        size /= 1024.0
-    return f"{size:.2f} PB"
-
-
-def get_folder_size(folder_path, progress_callback=None, stop_flag=None):
-    """计算文件夹大小"""
-    total_size = 0
-    file_count = 0
-    try:
-        for dirpath, dirnames, filenames in os.walk(folder_path):
-            # 检查停止标志
-            if stop_flag and stop_flag():
-                return None
-            
-            # 报告当前扫描的目录
-            if progress_callback:
-                progress_callback(dirpath, file_count)
-            
-            for filename in filenames:
-                # 检查停止标志
-                if stop_flag and stop_flag():
-                    return None
-                    
-                file_path = os.path.join(dirpath, filename)
-                try:
-                    total_size += os.path.getsize(file_path)
-                    file_count += 1
-                    # 每扫描100个文件更新一次进度
-                    if progress_callback and file_count % 100 == 0:
-                        progress_callback(dirpath, file_count)
-                except (OSError, FileNotFoundError, PermissionError):
-                    continue
-    except (OSError, PermissionError):
-        pass
-    return total_size
-
-
-def scan_cleanup_targets(progress_callback=None, stop_flag=None):
-    """扫描可清理的目标"""
-    cleanup_items = []
-    
-    # 定义所有要扫描的目标路径
-    scan_targets = [
-        {
-            'paths': [
-                os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Temp'),
-                os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Temp'),
-            ],
-            'category': '临时文件',
-            'description': 'Windows临时文件',
-            'name': '临时文件'
-        },
-        {
-            'paths': [os.path.join(os.environ.get('TEMP', ''))],
-            'category': '临时文件',
-            'description': '用户临时文件',
-            'name': '用户临时文件'
-        },
-        {
-            'paths': [os.path.join(drive, '$Recycle.Bin') for drive in ['C:\\', 'D:\\', 'E:\\'] if os.path.exists(drive)],
-            'category': '回收站',
-            'description': '回收站',
-            'name': '回收站'
-        },
-        {
-            'paths': [os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'SoftwareDistribution', 'Download')],
-            'category': '系统文件',
-            'description': 'Windows更新下载缓存',
-            'name': 'Windows更新缓存'
-        },
-        {
-            'paths': [
-                os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Logs'),
-                os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'System32', 'LogFiles'),
-            ],
-            'category': '日志文件',
-            'description': '系统日志文件',
-            'name': '日志文件'
-        },
-        {
-            'paths': [os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Prefetch')],
-            'category': '系统文件',
-            'description': '系统预读文件',
-            'name': 'Prefetch文件'
-        },
-    ]
-    
-    total_targets = sum(len(target['paths']) for target in scan_targets)
-    current_target = 0
-    
-    for target_group in scan_targets:
-        # 检查停止标志
-        if stop_flag and stop_flag():
-            break
-            
-        for temp_path in target_group['paths']:
-            # 检查停止标志
-            if stop_flag and stop_flag():
-                break
-                
-            if temp_path and os.path.exists(temp_path):
-                current_target += 1
-                try:
-                    # 创建文件夹扫描的内部回调
-                    base_message = f"{target_group['name']}: {temp_path}"
-                    
-                    def folder_progress_callback(dirpath, file_count):
-                        if progress_callback:
-                            # 只更新当前路径，保持总进度不变
-                            detail_msg = f"{base_message}\n📁 {dirpath} ({file_count} 个文件)"
-                            progress_callback(detail_msg, current_target, total_targets)
-                    
-                    if progress_callback:
-                        progress_callback(f"开始扫描 {base_message}", current_target, total_targets)
-                    
-                    size = get_folder_size(temp_path, folder_progress_callback if progress_callback else None, stop_flag)
-                    # 如果返回None，说明被中断了
-                    if size is None:
-                        break
-                    if size > 0:
-                        cleanup_items.append({
-                            'path': temp_path,
-                            'type': '文件夹',
-                            'size': size,
-                            'category': target_group['category'],
-                            'description': target_group['description']
-                        })
-                except Exception:
-                    pass
-    
-    return cleanup_items
+import multiprocessing
+from cleaner_engine import (
+    format_file_size, scan_cleanup_targets, scan_folder_contents, find_largest, execute_cleanup,
+    collect_file_columns, file_breakdown, execute_compression, available_compress_methods, DirSizeIndex,
+    DEFAULT_TOP_K, COMPRESS_CATEGORIES, COMPRESS_MIN_AGE_DAYS
+)
+from scan_snapshot import (
+    list_snapshots, write_snapshot, write_cleanup_snapshot, read_snapshot_header, diff_snapshots, format_size_delta,
+    CLEANUP_SNAPSHOT_ROOT, CLEANUP_KIND
+)
+
+
+# 扫描进度的界面刷新间隔（毫秒）：工作线程只覆盖最新进度，界面按固定频率读取
+PROGRESS_POLL_INTERVAL = 100
+
+# 空间分布窗口中扩展名/用户表格显示的条数，以及占比条的最大长度
+BREAKDOWN_TOP_N = 50
+BREAKDOWN_BAR_WIDTH = 30
+
+
+class CleanupItemModel:
+    """
+    可清理项目的索引模型：按路径和Treeview行号O(1)查找，选中项目及其总大小增量维护
+
+    带 'view_only' 的项目只供查看（如最大文件分析中互相包含的文件夹），不能被选中
+    """
+
+    def __init__(self, items=()):
+        self.reset(items)
+
+    def reset(self, items):
+        """替换全部项目并清空选择"""
+        self.items = list(items)
+        self.by_path = {item['path']: item for item in self.items}
+        self.path_by_row = {}
+        self.row_by_path = {}
+        self.selected = {}  # {path: size}，保持选中顺序
+        self.selected_size = 0
+        self.total_size = sum(item['size'] for item in self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def bind_row(self, row_id, path):
+        self.path_by_row[row_id] = path
+        self.row_by_path[path] = row_id
+
+    def get(self, path):
+        return self.by_path.get(path)
+
+    def is_selected(self, path):
+        return path in self.selected
+
+    def set_selected(self, path, selected):
+        """设置选中状态，返回状态是否发生变化"""
+        if selected == (path in self.selected) or path not in self.by_path:
+            return False
+        if selected and self.by_path[path].get('view_only'):
+            return False
+        if selected:
+            size = self.by_path[path]['size']
+            self.selected[path] = size
+            self.selected_size += size
+        else:
+            self.selected_size -= self.selected.pop(path)
+        return True
 
+    def toggle(self, path):
+        """切换选中状态，返回新状态"""
+        self.set_selected(path, path not in self.selected)
+        return path in self.selected
 
-def scan_folder_contents(folder_path, max_items=1000):
-    """扫描文件夹内容（限制数量以避免内存问题）"""
-    items = []
-    count = 0
-    
-    try:
-        for root, dirs, files in os.walk(folder_path):
-            if count >= max_items:
-                break
-            
-            # 添加文件夹
-            for dir_name in dirs:
-                if count >= max_items:
-                    break
-                dir_path = os.path.join(root, dir_name)
-                try:
-                    size = get_folder_size(dir_path)
-                    items.append({
-                        'path': dir_path,
-                        'type': '文件夹',
-                        'size': size
-                    })
-                    count += 1
-                except Exception:
-                    continue
-            
-            # 添加文件
-            for file_name in files:
-                if count >= max_items:
-                    break
-                file_path = os.path.join(root, file_name)
-                try:
-                    size = os.path.getsize(file_path)
-                    items.append({
-                        'path': file_path,
-                        'type': '文件',
-                        'size': size
-                    })
-                    count += 1
-                except Exception:
-                    continue
-    except Exception:
-        pass
-    
-    return items
+    def select_all(self):
+        for path in self.by_path:
+            self.set_selected(path, True)
+
+    def clear_selection(self):
+        self.selected = {}
+        self.selected_size = 0
+
+    def selected_items(self):
+        return [self.by_path[path] for path in self.selected]
 
 
 class DiskCleaner:
@@ -209,8 +109,8 @@ class DiskCleaner:
         self.root.minsize(1000, 850)
 
         # 存储扫描结果
-        self.cleanup_items = []  # 可清理的项目列表
-        self.selected_items = {}  # 选中的项目 {path: size}
+        self.cleanup_items = CleanupItemModel()  # 可清理的项目（按路径/行号索引，含选中状态）
+        self.largest_mode = False  # 当前结果来自最大文件分析（其中的文件夹只供查看）
         self.folder_contents = {}  # 文件夹内容缓存 {folder_path: [items]}
         
         # 扫描动画相关
@@ -222,6 +122,15 @@ class DiskCleaner:
         # 扫描控制相关
         self.scan_stop_flag = False
         self.scan_thread = None
+        self.last_scan_func = self.scan_cleanup_targets
+
+        # 最新扫描进度 (message, current, total)：工作线程直接覆盖，界面定时读取，不再为每次进度排队回调
+        self.scan_progress = None
+        self.shown_progress = None
+        self.scan_progress_job = None
+
+        # 目录大小索引：重复扫描时只重新枚举修改时间变化的目录（只用于整目录清理的目标，带清理策略的目标每次完整遍历）
+        self.size_index = DirSizeIndex()
         
         # 设置窗口居中
         self.center_window()
@@ -300,6 +209,26 @@ class DiskCleaner:
         )
         self.scan_button.pack(side=tk.LEFT, padx=(0, 10))
 
+        # 最大文件/文件夹分析（整盘或指定目录）
+        self.largest_button = ttk.Button(
+            button_row,
+            text="📊 最大文件分析",
+            command=self.start_largest_scan,
+            bootstyle=(INFO, OUTLINE),
+            width=16
+        )
+        self.largest_button.pack(side=tk.LEFT, padx=(0, 10))
+
+        # 与之前的分析快照对比，查看哪些目录增长了
+        self.growth_button = ttk.Button(
+            button_row,
+            text="📉 增长对比",
+            command=self.view_growth,
+            bootstyle=(INFO, OUTLINE),
+            width=14
+        )
+        self.growth_button.pack(side=tk.LEFT, padx=(0, 10))
+
         # 扫描动画图标（初始隐藏）
         self.scan_icon_label = ttk.Label(
             button_row,
@@ -317,6 +246,16 @@ class DiskCleaner:
         )
         self.stats_label.pack(side=tk.LEFT)
 
+        # 增量扫描开关（复用目录大小索引，只对不带清理策略的目标生效）
+        self.incremental_var = tk.BooleanVar(value=True)
+        incremental_check = ttk.Checkbutton(
+            button_row,
+            text="⚡ 增量扫描",
+            variable=self.incremental_var,
+            bootstyle="round-toggle"
+        )
+        incremental_check.pack(side=tk.RIGHT)
+
         # 第二行：进度条
         progress_frame = ttk.Frame(action_frame)
         progress_frame.pack(fill=tk.X, pady=(0, 8))
@@ -358,7 +297,7 @@ class DiskCleaner:
         )
         list_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 20))
 
-        # 工具栏（全选/取消全选/查看详情）
+        # 工具栏（全选/取消全选/查看详情/空间分布）
         toolbar_frame = ttk.Frame(list_frame)
         toolbar_frame.pack(fill=tk.X, pady=(0, 10))
 
@@ -390,7 +329,17 @@ class DiskCleaner:
             width=12,
             state=tk.DISABLED
         )
-        self.view_details_button.pack(side=tk.LEFT)
+        self.view_details_button.pack(side=tk.LEFT, padx=(0, 10))
+
+        self.breakdown_button = ttk.Button(
+            toolbar_frame,
+            text="📈 空间分布",
+            command=self.view_breakdown,
+            bootstyle=OUTLINE,
+            width=12,
+            state=tk.DISABLED
+        )
+        self.breakdown_button.pack(side=tk.LEFT)
 
         # 创建Treeview和滚动条
         tree_frame = ttk.Frame(list_frame)
@@ -431,8 +380,8 @@ class DiskCleaner:
 
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        # 存储复选框变量
-        self.checkbox_vars = {}
+        # 单个点击处理：按行号在项目模型中查找，不再为每一行绑定事件
+        self.tree.bind("<Button-1>", self.on_tree_click)
 
         # 状态显示区域
         status_frame = ttk.Frame(main_frame)
@@ -457,15 +406,40 @@ class DiskCleaner:
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=tk.X)
 
+        button_row = ttk.Frame(button_frame)
+        button_row.pack()
+
         self.clean_button = ttk.Button(
-            button_frame,
+            button_row,
             text="🗑️ 清理选中项目",
             command=self.start_clean,
             bootstyle=DANGER,
             width=30,
             state=tk.DISABLED
         )
-        self.clean_button.pack(pady=5)
+        self.clean_button.pack(side=tk.LEFT, padx=(0, 10), pady=5)
+
+        # 不允许删除的日志等文件可以就地压缩（压缩格式可选）
+        self.compress_button = ttk.Button(
+            button_row,
+            text="🗜️ 压缩选中项目",
+            command=self.start_compress,
+            bootstyle=(WARNING, OUTLINE),
+            width=20,
+            state=tk.DISABLED
+        )
+        self.compress_button.pack(side=tk.LEFT, padx=(0, 5), pady=5)
+
+        compress_methods = available_compress_methods()
+        self.compress_method_var = tk.StringVar(value=compress_methods[0])
+        compress_method_combo = ttk.Combobox(
+            button_row,
+            textvariable=self.compress_method_var,
+            values=compress_methods,
+            state="readonly",
+            width=6
+        )
+        compress_method_combo.pack(side=tk.LEFT, pady=5)
 
     def show_about(self):
         """显示关于信息"""
@@ -559,6 +533,27 @@ class DiskCleaner:
         self.current_path_label.config(text=f"📂 {display_message}")
         self.root.update_idletasks()
 
+    def poll_scan_progress(self):
+        """定时读取最新扫描进度并刷新界面（只在主线程中运行，无论扫描多少文件，刷新频率都固定）"""
+        # 只读不清空：清空会与工作线程的写入竞争而丢掉最新进度，用对象身份判断是否已显示过
+        progress = self.scan_progress
+        if progress is not None and progress is not self.shown_progress:
+            self.shown_progress = progress
+            self.update_scan_progress(*progress)
+        self.scan_progress_job = self.root.after(PROGRESS_POLL_INTERVAL, self.poll_scan_progress)
+
+    def start_progress_polling(self):
+        """（重新）开始进度轮询"""
+        self.stop_progress_polling()
+        self.poll_scan_progress()
+
+    def stop_progress_polling(self):
+        """停止进度轮询，丢弃尚未显示的进度"""
+        if self.scan_progress_job:
+            self.root.after_cancel(self.scan_progress_job)
+            self.scan_progress_job = None
+        self.scan_progress = None
+
     def scan_cleanup_targets(self):
         """扫描可清理目标（在后台线程中执行）"""
         try:
@@ -567,44 +562,27 @@ class DiskCleaner:
             # 定义进度回调函数
             def progress_callback(message, current=0, total=0):
                 if not self.scan_stop_flag:  # 只有在未停止时才更新
-                    self.root.after(0, lambda: self.update_scan_progress(message, current, total))
+                    self.scan_progress = (message, current, total)
             
             # 定义停止标志检查函数
             def stop_flag():
                 return self.scan_stop_flag
             
-            items = scan_cleanup_targets(progress_callback=progress_callback, stop_flag=stop_flag)
-            
-            # 如果被停止，不更新结果
-            if self.scan_stop_flag:
-                self.root.after(0, lambda: self.update_status("扫描已取消", "red"))
-                self.root.after(0, lambda: self.progress_label.config(text="扫描已取消"))
-                self.root.after(0, lambda: self.current_path_label.config(text=""))
-                self.root.after(0, lambda: self.progress_bar.config(value=0))
-                return
-            
-            self.cleanup_items = items
-            
-            # 在主线程中更新UI
-            self.root.after(0, self.update_treeview)
-            
-            # 停止进度条动画
-            self.root.after(0, lambda: self.progress_bar.config(value=100))
-            self.root.after(0, lambda: self.current_path_label.config(text=""))
-            
-            if items:
-                total_size = sum(item['size'] for item in items)
-                self.root.after(0, lambda: self.update_status(
-                    f"扫描完成！找到 {len(items)} 个可清理项目，可释放 {format_file_size(total_size)}", "green"
-                ))
-                self.root.after(0, lambda: self.select_all_button.config(state=tk.NORMAL))
-                self.root.after(0, lambda: self.deselect_all_button.config(state=tk.NORMAL))
-                self.root.after(0, lambda: self.view_details_button.config(state=tk.NORMAL))
-                self.root.after(0, lambda: self.progress_label.config(text="扫描完成！"))
-            else:
-                self.root.after(0, lambda: self.update_status("扫描完成！未找到可清理项目", "green"))
-                self.root.after(0, lambda: self.progress_label.config(text="未找到可清理项目"))
-                
+            # 扫描时记录每个目标及其一级子目录的大小，完成后保存快照供增长对比
+            dirs = []
+            items = scan_cleanup_targets(
+                progress_callback=progress_callback,
+                stop_flag=stop_flag,
+                size_index=self.size_index if self.incremental_var.get() else None,
+                dir_visitor=lambda path, size, files: dirs.append((path, size, files))
+            )
+            if dirs and not self.scan_stop_flag:
+                try:
+                    write_cleanup_snapshot(dirs)
+                except OSError:
+                    pass
+            self.finish_scan(items)
+
         except Exception as e:
             if not self.scan_stop_flag:  # 只有在未停止时才显示错误
                 self.root.after(0, lambda: self.update_status("扫描失败", "red"))
@@ -614,9 +592,250 @@ class DiskCleaner:
         finally:
             # 停止扫描动画
             self.root.after(0, self.stop_scan_animation)
+            self.root.after(0, self.stop_progress_polling)
             # 恢复按钮状态
             self.root.after(0, self.reset_scan_button)
 
+    def finish_scan(self, items, largest_mode=False):
+        """扫描结束后显示结果（在后台线程中调用）；largest_mode 为True时是最大文件分析的结果"""
+        # 先停止进度轮询，避免之后的最终状态被旧进度覆盖
+        self.root.after(0, self.stop_progress_polling)
+
+        # 如果被停止，不更新结果
+        if self.scan_stop_flag:
+            self.root.after(0, lambda: self.update_status("扫描已取消", "red"))
+            self.root.after(0, lambda: self.progress_label.config(text="扫描已取消"))
+            self.root.after(0, lambda: self.current_path_label.config(text=""))
+            self.root.after(0, lambda: self.progress_bar.config(value=0))
+            return
+
+        # 在主线程中更新项目模型和UI
+        self.largest_mode = largest_mode
+        self.root.after(0, lambda: self.update_treeview(items))
+
+        # 停止进度条动画
+        self.root.after(0, lambda: self.progress_bar.config(value=100))
+        self.root.after(0, lambda: self.current_path_label.config(text=""))
+
+        if items and largest_mode:
+            self.root.after(0, lambda: self.update_status(
+                f"分析完成！列出 {len(items)} 个最大的文件和文件夹（文件可勾选清理，文件夹只供查看）", "green"
+            ))
+            self.root.after(0, lambda: self.select_all_button.config(state=tk.NORMAL))
+            self.root.after(0, lambda: self.deselect_all_button.config(state=tk.NORMAL))
+            self.root.after(0, lambda: self.view_details_button.config(state=tk.NORMAL))
+            self.root.after(0, lambda: self.progress_label.config(text="分析完成！"))
+        elif items:
+            total_size = sum(item['size'] for item in items)
+            self.root.after(0, lambda: self.update_status(
+                f"扫描完成！找到 {len(items)} 个可清理项目，可释放 {format_file_size(total_size)}", "green"
+            ))
+            self.root.after(0, lambda: self.select_all_button.config(state=tk.NORMAL))
+            self.root.after(0, lambda: self.deselect_all_button.config(state=tk.NORMAL))
+            self.root.after(0, lambda: self.view_details_button.config(state=tk.NORMAL))
+            self.root.after(0, lambda: self.breakdown_button.config(state=tk.NORMAL))
+            self.root.after(0, lambda: self.progress_label.config(text="扫描完成！"))
+        else:
+            self.root.after(0, lambda: self.update_status("扫描完成！未找到可清理项目", "green"))
+            self.root.after(0, lambda: self.progress_label.config(text="未找到可清理项目"))
+
+    def start_largest_scan(self):
+        """选择目录后开始最大文件/文件夹分析"""
+        if self.scan_thread and self.scan_thread.is_alive():
+            return
+        initial_dir = os.environ.get('SystemDrive', 'C:') + os.sep if os.name == 'nt' else os.sep
+        folder_path = filedialog.askdirectory(title="选择要分析的磁盘或文件夹", initialdir=initial_dir)
+        if folder_path:
+            self.start_scan(lambda: self.scan_largest(folder_path))
+
+    def scan_largest(self, folder_path):
+        """单遍扫描找出最大的文件和文件夹（在后台线程中执行）"""
+        try:
+            self.update_status(f"正在分析 {folder_path} 中最大的文件和文件夹...", "blue")
+
+            def progress_callback(dirpath, file_count):
+                if not self.scan_stop_flag:
+                    self.scan_progress = (f"{dirpath} (已扫描 {file_count} 个文件)", 0, 0)
+
+            # 扫描时顺便记录每个目录的总大小，完成后保存快照供增长对比
+            dirs = []
+            result = find_largest(folder_path, DEFAULT_TOP_K, progress_callback, lambda: self.scan_stop_flag,
+                                  dir_visitor=lambda dirpath, size, files: dirs.append((dirpath, size, files)))
+            if result:
+                try:
+                    write_snapshot(folder_path, dirs)
+                except OSError:
+                    pass
+
+            items = []
+            if result:
+                for rank, (size, path) in enumerate(result['dirs'], 1):
+                    items.append({
+                        'path': path,
+                        'type': '文件夹',
+                        'size': size,
+                        'category': '最大文件夹',
+                        'description': f"第 {rank} 大文件夹",
+                        # 排行中的文件夹互相包含、也包含排行中的文件，且不是已知可安全删除的目标，只供查看
+                        'view_only': True
+                    })
+                for rank, (size, path) in enumerate(result['files'], 1):
+                    items.append({
+                        'path': path,
+                        'type': '文件',
+                        'size': size,
+                        'category': '最大文件',
+                        'description': f"第 {rank} 大文件"
+                    })
+            self.finish_scan(items, largest_mode=True)
+
+        except Exception as e:
+            if not self.scan_stop_flag:
+                self.root.after(0, lambda: self.update_status("分析失败", "red"))
+                self.root.after(0, lambda: self.progress_label.config(text="分析失败"))
+                self.root.after(0, lambda: self.current_path_label.config(text=""))
+                self.root.after(0, lambda: messagebox.showerror("错误", f"分析失败：\n{str(e)}"))
+        finally:
+            self.root.after(0, self.stop_scan_animation)
+            self.root.after(0, self.stop_progress_polling)
+            self.root.after(0, self.reset_scan_button)
+
+    def view_growth(self):
+        """与之前保存的快照对比（清理目标扫描，或选择目录对比最大文件分析），按增长排序显示目录"""
+        use_cleanup = messagebox.askyesnocancel(
+            "增长对比",
+            "对比清理目标扫描的快照吗？\n\n是：对比最近两次“开始扫描”的清理目标\n否：选择目录，对比“最大文件分析”的快照"
+        )
+        if use_cleanup is None:
+            return
+        if use_cleanup:
+            folder_path = "清理目标"
+            snapshots = list_snapshots(CLEANUP_SNAPSHOT_ROOT, kind=CLEANUP_KIND)
+            if len(snapshots) < 2:
+                messagebox.showinfo("提示", "清理目标扫描的快照不足两份\n\n每次“开始扫描”完成后都会保存一份，下次扫描后即可对比")
+                return
+        else:
+            initial_dir = os.environ.get('SystemDrive', 'C:') + os.sep if os.name == 'nt' else os.sep
+            folder_path = filedialog.askdirectory(title="选择之前分析过的磁盘或文件夹", initialdir=initial_dir)
+            if not folder_path:
+                return
+            snapshots = list_snapshots(folder_path)
+            if len(snapshots) < 2:
+                messagebox.showinfo("提示", "该目录的分析快照不足两份\n\n请先用“最大文件分析”分析该目录，下次分析后即可对比")
+                return
+
+        growth_window = ttk.Toplevel(self.root)
+        growth_window.title(f"增长对比 - {folder_path}")
+        growth_window.geometry("1000x600")
+        growth_window.resizable(True, True)
+
+        # 居中显示
+        growth_window.update_idletasks()
+        x = (growth_window.winfo_screenwidth() // 2) - (1000 // 2)
+        y = (growth_window.winfo_screenheight() // 2) - (600 // 2)
+        growth_window.geometry(f'1000x600+{x}+{y}')
+
+        main_frame = ttk.Frame(growth_window, padding=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        # 对比基准（默认上一次）和排序方式
+        option_row = ttk.Frame(main_frame)
+        option_row.pack(fill=tk.X, pady=(0, 10))
+
+        def snapshot_label(snapshot_path):
+            header = read_snapshot_header(snapshot_path)
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(header["created_at"]))
+            return f"{created}（{format_file_size(header['size'])}，{header['files']} 个文件）"
+
+        baselines = {snapshot_label(path): path for path in reversed(snapshots[:-1])}
+        ttk.Label(option_row, text="对比基准：", font=('微软雅黑', 10)).pack(side=tk.LEFT)
+        baseline_var = tk.StringVar(value=next(iter(baselines)))
+        baseline_combo = ttk.Combobox(option_row, textvariable=baseline_var, values=list(baselines),
+                                      state="readonly", width=45)
+        baseline_combo.pack(side=tk.LEFT, padx=(0, 20))
+        sort_var = tk.StringVar(value="by_size")
+        ttk.Radiobutton(option_row, text="按增长大小", variable=sort_var, value="by_size").pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Radiobutton(option_row, text="按增长文件数", variable=sort_var, value="by_files").pack(side=tk.LEFT)
+
+        summary_label = ttk.Label(
+            main_frame,
+            text=f"最新快照：{snapshot_label(snapshots[-1])}",
+            font=('微软雅黑', 11, 'bold'),
+            bootstyle=PRIMARY
+        )
+        summary_label.pack(anchor=tk.W, pady=(0, 10))
+
+        tree_frame = ttk.Frame(main_frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        scrollbar_y = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL)
+        scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        growth_tree = ttk.Treeview(
+            tree_frame,
+            columns=("size_delta", "files_delta", "old_size", "new_size", "path"),
+            show="headings",
+            yscrollcommand=scrollbar_y.set
+        )
+        scrollbar_y.config(command=growth_tree.yview)
+        growth_tree.heading("size_delta", text="增长大小")
+        growth_tree.heading("files_delta", text="增长文件数")
+        growth_tree.heading("old_size", text="之前")
+        growth_tree.heading("new_size", text="现在")
+        growth_tree.heading("path", text="路径")
+        growth_tree.column("size_delta", width=110, anchor=tk.E)
+        growth_tree.column("files_delta", width=100, anchor=tk.E)
+        growth_tree.column("old_size", width=100, anchor=tk.E)
+        growth_tree.column("new_size", width=100, anchor=tk.E)
+        growth_tree.column("path", width=520, anchor=tk.W)
+        growth_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        close_button = ttk.Button(
+            main_frame,
+            text="关闭",
+            command=growth_window.destroy,
+            bootstyle=PRIMARY,
+            width=15
+        )
+        close_button.pack(pady=(15, 0))
+
+        diff_result = {}
+
+        def show_rows():
+            growth_tree.delete(*growth_tree.get_children())
+            for size_delta, files_delta, path, old_size, new_size in diff_result.get(sort_var.get(), []):
+                growth_tree.insert("", tk.END, values=(
+                    format_size_delta(size_delta), f"{files_delta:+d}",
+                    format_file_size(old_size), format_file_size(new_size), path
+                ))
+
+        def show_diff(diff):
+            if not growth_window.winfo_exists():
+                return
+            diff_result.clear()
+            diff_result.update(diff)
+            summary_label.config(
+                text=f"总大小 {format_size_delta(diff['size_delta'])}，文件 {diff['files_delta']:+d} 个，"
+                     f"新增目录 {diff['added']} 个，消失目录 {diff['removed']} 个"
+            )
+            show_rows()
+
+        # 在新线程中归并比较两份快照
+        def load_diff(*args):
+            old_path = baselines[baseline_var.get()]
+            summary_label.config(text="正在对比...")
+
+            def run():
+                try:
+                    diff = diff_snapshots(old_path, snapshots[-1])
+                    self.root.after(0, lambda: show_diff(diff))
+                except Exception as e:
+                    self.root.after(0, lambda: summary_label.config(text=f"对比失败：{str(e)}", bootstyle=DANGER))
+
+            threading.Thread(target=run, daemon=True).start()
+
+        baseline_combo.bind("<<ComboboxSelected>>", load_diff)
+        sort_var.trace_add("write", lambda *args: show_rows())
+        load_diff()
+
     def start_scan_animation(self):
         """启动扫描动画"""
         self.scan_animation_running = True
@@ -645,20 +864,23 @@ class DiskCleaner:
             self.stop_scan()
         else:
             # 当前未扫描，执行开始扫描
-            self.start_scan()
+            self.start_scan(self.scan_cleanup_targets)
     
-    def start_scan(self):
-        """开始扫描（在新线程中执行）"""
+    def start_scan(self, scan_func=None):
+        """开始扫描（在新线程中执行）；scan_func 为空时重复上次的扫描方式（默认扫描清理目标）"""
+        if scan_func is not None:
+            self.last_scan_func = scan_func
         # 清空之前的结果
         for item in self.tree.get_children():
             self.tree.delete(item)
-        self.checkbox_vars.clear()
-        self.selected_items.clear()
-        self.cleanup_items = []
+        self.cleanup_items.reset([])
+        self.largest_mode = False
         self.clean_button.config(state=tk.DISABLED)
+        self.compress_button.config(state=tk.DISABLED)
         self.select_all_button.config(state=tk.DISABLED)
         self.deselect_all_button.config(state=tk.DISABLED)
         self.view_details_button.config(state=tk.DISABLED)
+        self.breakdown_button.config(state=tk.DISABLED)
         self.stats_label.config(text="")
         
         # 重置进度条
@@ -675,8 +897,11 @@ class DiskCleaner:
         # 启动扫描动画
         self.start_scan_animation()
 
+        # 启动进度轮询
+        self.start_progress_polling()
+
         # 在新线程中执行，避免界面卡顿
-        self.scan_thread = threading.Thread(target=self.scan_cleanup_targets, daemon=True)
+        self.scan_thread = threading.Thread(target=self.last_scan_func, daemon=True)
         self.scan_thread.start()
     
     def stop_scan(self):
@@ -690,104 +915,88 @@ class DiskCleaner:
         self.scan_stop_flag = False
         self.scan_button.config(text="🔍 开始扫描", bootstyle=PRIMARY, state=tk.NORMAL)
 
-    def update_treeview(self):
-        """更新Treeview显示可清理项目"""
+    def update_treeview(self, items=None):
+        """更新Treeview显示可清理项目（传入 items 时先替换项目模型）"""
         # 清空现有内容
         for item in self.tree.get_children():
             self.tree.delete(item)
-        self.checkbox_vars.clear()
-        self.selected_items.clear()
+        if items is not None:
+            self.cleanup_items.reset(items)
+        else:
+            self.cleanup_items.reset(self.cleanup_items.items)
 
         # 填充数据
-        total_size = 0
         for item in self.cleanup_items:
             path = item['path']
-            category = item['category']
-            description = item['description']
-            size = item['size']
-            item_type = item['type']
-            
-            total_size += size
-
-            # 创建复选框变量
-            var = tk.BooleanVar()
-            self.checkbox_vars[path] = var
 
             # 插入节点
             item_id = self.tree.insert(
                 "",
                 tk.END,
-                text="☐",
-                values=(category, description, format_file_size(size), path),
-                tags=(path, item_type)
-            )
-
-            # 绑定复选框点击事件
-            def make_toggle_handler(item_id, path):
-                return lambda e: self.toggle_checkbox(e, item_id, path)
-            
-            self.tree.tag_bind(
-                path,
-                "<Button-1>",
-                make_toggle_handler(item_id, path)
+                text="" if item.get('view_only') else "☐",
+                values=(item['category'], item['description'], format_file_size(item['size']), path),
+                tags=(item['type'],)
             )
+            self.cleanup_items.bind_row(item_id, path)
 
         # 更新统计信息
-        self.stats_label.config(
-            text=f"共找到 {len(self.cleanup_items)} 个可清理项目，总大小：{format_file_size(total_size)}"
-        )
+        self.update_selection_stats()
+
+    def update_selection_stats(self):
+        """更新统计信息和清理按钮状态（选中总大小由项目模型增量维护）"""
+        if self.largest_mode:
+            # 排行中的文件夹互相包含，总大小没有意义
+            text = f"共列出 {len(self.cleanup_items)} 个最大的文件和文件夹"
+        else:
+            text = f"共找到 {len(self.cleanup_items)} 个可清理项目，总大小：{format_file_size(self.cleanup_items.total_size)}"
+        if self.cleanup_items.selected:
+            text += f"；已选 {len(self.cleanup_items.selected)} 项，{format_file_size(self.cleanup_items.selected_size)}"
+        self.stats_label.config(text=text)
+        self.clean_button.config(state=tk.NORMAL if self.cleanup_items.selected else tk.DISABLED)
+        self.compress_button.config(state=tk.NORMAL if self.cleanup_items.selected else tk.DISABLED)
+
+    def on_tree_click(self, event):
+        """点击某一行时切换其复选框（只供查看的行不切换）"""
+        item_id = self.tree.identify_row(event.y)
+        path = self.cleanup_items.path_by_row.get(item_id)
+        if path is not None and not self.cleanup_items.get(path).get('view_only'):
+            self.toggle_checkbox(event, item_id, path)
 
     def toggle_checkbox(self, event, item_id, path):
         """切换复选框状态"""
-        var = self.checkbox_vars.get(path)
-        if var:
-            var.set(not var.get())
-            is_checked = var.get()
-            self.tree.item(item_id, text="☑" if is_checked else "☐")
-            
-            # 更新选中项目字典
-            if is_checked:
-                item = next((item for item in self.cleanup_items if item['path'] == path), None)
-                if item:
-                    self.selected_items[path] = item['size']
-            else:
-                self.selected_items.pop(path, None)
-            
-            # 更新按钮状态
-            self.clean_button.config(state=tk.NORMAL if self.selected_items else tk.DISABLED)
+        is_checked = self.cleanup_items.toggle(path)
+        self.tree.item(item_id, text="☑" if is_checked else "☐")
+        self.update_selection_stats()
 
     def select_all(self):
-        """全选"""
-        for path, var in self.checkbox_vars.items():
-            if not var.get():
-                var.set(True)
-                item = next((item for item in self.cleanup_items if item['path'] == path), None)
-                if item:
-                    self.selected_items[path] = item['size']
-        
+        """全选（只供查看的项目除外）"""
+        self.cleanup_items.select_all()
+
         # 更新树视图
-        for item_id in self.tree.get_children():
-            path = self.tree.item(item_id)["tags"][0]
-            self.tree.item(item_id, text="☑")
-        
-        self.clean_button.config(state=tk.NORMAL)
+        for item_id, path in self.cleanup_items.path_by_row.items():
+            if self.cleanup_items.is_selected(path):
+                self.tree.item(item_id, text="☑")
+
+        self.update_selection_stats()
 
     def deselect_all(self):
         """取消全选"""
-        for var in self.checkbox_vars.values():
-            var.set(False)
-        
-        self.selected_items.clear()
-        
+        self.cleanup_items.clear_selection()
+
         # 更新树视图
-        for item_id in self.tree.get_children():
-            self.tree.item(item_id, text="☐")
-        
-        self.clean_button.config(state=tk.DISABLED)
+        for item_id, path in self.cleanup_items.path_by_row.items():
+            if not self.cleanup_items.get(path).get('view_only'):
+                self.tree.item(item_id, text="☐")
+
+        self.update_selection_stats()
 
     def view_details(self):
-        """查看选中项目的详情（显示文件夹内容）"""
-        selected_paths = [path for path, var in self.checkbox_vars.items() if var.get()]
+        """查看选中项目的详情（显示文件夹内容）；没有勾选项目时查看当前点选的行（如只供查看的文件夹）"""
+        selected_paths = list(self.cleanup_items.selected)
+        if not selected_paths:
+            focused_path = self.cleanup_items.path_by_row.get(self.tree.focus())
+            if focused_path is not None:
+                selected_paths = [focused_path]
         
         if not selected_paths:
             messagebox.showwarning("警告", "请先选择要查看的项目")
@@ -866,7 +1075,7 @@ class DiskCleaner:
 
                 for path in selected_paths:
                     # 添加主项目
-                    item = next((item for item in self.cleanup_items if item['path'] == path), None)
+                    item = self.cleanup_items.get(path)
                     if item:
                         parent_id = detail_tree.insert(
                             "",
@@ -876,13 +1085,31 @@ class DiskCleaner:
                             tags=("main_item",)
                         )
                         
+                        # 按策略清理的项目只列出匹配的文件
+                        if item.get('deletions') is not None:
+                            listed = 0
+                            for dirpath, names in item['deletions'].items():
+                                for name, size, mtime in names:
+                                    if listed >= 500:
+                                        break
+                                    file_path = os.path.join(dirpath, name)
+                                    detail_tree.insert(
+                                        parent_id,
+                                        tk.END,
+                                        text=name,
+                                        values=('文件', format_file_size(size), file_path),
+                                        tags=("content_item",)
+                                    )
+                                    listed += 1
                         # 如果是文件夹，加载内容
-                        if os.path.isdir(path):
+                        elif os.path.isdir(path):
                             try:
+                                # 一次遍历得到带大小的目录树，按层级挂到对应的父节点下（从大到小）
                                 contents = scan_folder_contents(path, max_items=500)
-                                for content in contents[:500]:  # 限制显示数量
-                                    detail_tree.insert(
-                                        parent_id,
+                                node_ids = {path: parent_id}
+                                for content in contents:
+                                    node_ids[content['path']] = detail_tree.insert(
+                                        node_ids.get(content['parent'], parent_id),
                                         tk.END,
                                         text=os.path.basename(content['path']),
                                         values=(content['type'], format_file_size(content['size']), content['path']),
@@ -910,10 +1137,94 @@ class DiskCleaner:
         thread = threading.Thread(target=load_details, daemon=True)
         thread.start()
 
+    def view_breakdown(self):
+        """按扩展名、文件年龄和属主查看选中项目（未选中时为全部项目）的空间分布"""
+        paths = list(self.cleanup_items.selected) or [item['path'] for item in self.cleanup_items]
+        if not paths:
+            messagebox.showwarning("警告", "没有可分析的项目")
+            return
+
+        breakdown_window = ttk.Toplevel(self.root)
+        breakdown_window.title("空间分布")
+        breakdown_window.geometry("800x600")
+        breakdown_window.resizable(True, True)
+
+        # 居中显示
+        breakdown_window.update_idletasks()
+        x = (breakdown_window.winfo_screenwidth() // 2) - (800 // 2)
+        y = (breakdown_window.winfo_screenheight() // 2) - (600 // 2)
+        breakdown_window.geometry(f'800x600+{x}+{y}')
+
+        main_frame = ttk.Frame(breakdown_window, padding=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        summary_label = ttk.Label(
+            main_frame,
+            text=f"正在统计 {len(paths)} 个项目中的文件...",
+            font=('微软雅黑', 12, 'bold'),
+            bootstyle=PRIMARY
+        )
+        summary_label.pack(pady=(0, 15))
+
+        # 每种分组一个标签页：分组、大小、文件数、占比条
+        notebook = ttk.Notebook(main_frame)
+        notebook.pack(fill=tk.BOTH, expand=True)
+        tables = {}
+        for key, title in (("by_extension", "按扩展名"), ("by_age", "按修改时间"), ("by_owner", "按用户")):
+            tab = ttk.Frame(notebook, padding=10)
+            notebook.add(tab, text=title)
+            table = ttk.Treeview(tab, columns=("group", "size", "files", "share"), show="headings")
+            table.heading("group", text=title[1:])
+            table.heading("size", text="大小")
+            table.heading("files", text="文件数")
+            table.heading("share", text="占比")
+            table.column("group", width=160, anchor=tk.W)
+            table.column("size", width=120, anchor=tk.E)
+            table.column("files", width=100, anchor=tk.E)
+            table.column("share", width=320, anchor=tk.W)
+            table.pack(fill=tk.BOTH, expand=True)
+            tables[key] = table
+
+        close_button = ttk.Button(
+            main_frame,
+            text="关闭",
+            command=breakdown_window.destroy,
+            bootstyle=PRIMARY,
+            width=15
+        )
+        close_button.pack(pady=(15, 0))
+
+        def show_breakdown(breakdown):
+            if not breakdown_window.winfo_exists():
+                return
+            total_size = breakdown['total_size']
+            summary_label.config(
+                text=f"共 {breakdown['total_files']} 个文件，{format_file_size(total_size)}"
+            )
+            for key, table in tables.items():
+                for group, size, files in breakdown[key]:
+                    share = size / total_size if total_size else 0
+                    table.insert("", tk.END, values=(
+                        group, format_file_size(size), files,
+                        f"{'█' * round(share * BREAKDOWN_BAR_WIDTH)} {share:.1%}"
+                    ))
+
+        # 在新线程中逐个文件记录列式数据，再整列分组统计
+        def load_breakdown():
+            try:
+                columns = collect_file_columns(paths)
+                breakdown = file_breakdown(columns, top_n=BREAKDOWN_TOP_N)
+                self.root.after(0, lambda: show_breakdown(breakdown))
+            except Exception as e:
+                self.root.after(0, lambda: summary_label.config(text=f"统计失败：{str(e)}", bootstyle=DANGER))
+
+        thread = threading.Thread(target=load_breakdown, daemon=True)
+        thread.start()
+
     def clean_files(self):
         """清理选中的文件（在后台线程中执行）"""
         try:
-            selected_paths = list(self.selected_items.keys())
+            selected_paths = list(self.cleanup_items.selected)
             
             if not selected_paths:
                 messagebox.showwarning("警告", "请先选择要清理的项目")
@@ -921,11 +1232,12 @@ class DiskCleaner:
                 self.clean_button.config(state=tk.NORMAL, text="🗑️ 清理选中项目")
                 return
 
-            # 显示将要删除的路径列表
-            detail_text = "将要删除以下项目：\n\n"
-            total_size = sum(self.selected_items.values())
-            for i, path in enumerate(selected_paths, 1):
-                detail_text += f"{i}. {path}\n"
+            # 显示将要删除的路径列表（项目很多时只列出前20个）
+            total_size = self.cleanup_items.selected_size
+            lines = [f"{i}. {path}" for i, path in enumerate(selected_paths[:20], 1)]
+            if len(selected_paths) > 20:
+                lines.append(f"... 共 {len(selected_paths)} 个项目")
+            detail_text = "将要删除以下项目：\n\n" + "\n".join(lines) + "\n"
             detail_text += f"\n总大小：{format_file_size(total_size)}\n"
             detail_text += "\n此操作不可恢复！确定要继续吗？"
 
@@ -940,51 +1252,49 @@ class DiskCleaner:
                 self.clean_button.config(state=tk.NORMAL, text="🗑️ 清理选中项目")
                 return
 
-            # 执行清理
+            # 执行清理：并行删除，按实际删除成功的文件统计释放空间，进度写入进度槽由界面定时刷新
             self.update_status(f"正在清理 {len(selected_paths)} 个项目...", "blue")
-            deleted_count = 0
-            failed_count = 0
-            freed_size = 0
-            failed_files = []
+            self.root.after(0, self.start_progress_polling)
 
-            for path in selected_paths:
-                try:
-                    if os.path.exists(path):
-                        if os.path.isdir(path):
-                            shutil.rmtree(path, ignore_errors=True)
-                        else:
-                            os.remove(path)
-                        deleted_count += 1
-                        freed_size += self.selected_items[path]
-                    else:
-                        failed_count += 1
-                        failed_files.append(f"{path} (文件不存在)")
-                except PermissionError:
-                    failed_count += 1
-                    failed_files.append(f"{path} (权限不足)")
-                except Exception as e:
-                    failed_count += 1
-                    failed_files.append(f"{path} ({str(e)})")
+            def progress_callback(deleted, freed, current_path):
+                self.scan_progress = (f"已删除 {deleted} 个文件，释放 {format_file_size(freed)}：{current_path}", 0, 0)
+
+            # 按策略扫描的项目只删除扫描时记录的匹配文件，其余项目整体删除
+            selected_items = self.cleanup_items.selected_items()
+            result = execute_cleanup(selected_items, progress_callback=progress_callback)
+            self.root.after(0, self.stop_progress_polling)
+            self.root.after(0, lambda: self.current_path_label.config(text=""))
+
+            deleted_count = result['deleted']
+            freed_size = result['freed']
+            failed_count = len(result['failed'])
+            failed_files = [f"{path} ({reason})" for path, reason in result['failed']]
+
+            # 被清理的目录及其父目录的大小缓存失效，下次扫描重新统计
+            try:
+                self.size_index.invalidate(selected_paths)
+            except Exception:
+                pass
 
             # 在主线程中更新UI
             if failed_count == 0:
                 self.root.after(0, lambda: self.update_status(
-                    f"清理完成！成功清理 {deleted_count} 个项目，释放 {format_file_size(freed_size)}", "green"
+                    f"清理完成！删除 {deleted_count} 个文件，释放 {format_file_size(freed_size)}", "green"
                 ))
                 self.root.after(0, lambda: messagebox.showinfo(
                     "成功",
-                    f"✨ 清理完成！\n\n成功清理 {deleted_count} 个项目\n释放空间：{format_file_size(freed_size)}"
+                    f"✨ 清理完成！\n\n删除 {deleted_count} 个文件\n释放空间：{format_file_size(freed_size)}"
                 ))
             else:
                 self.root.after(0, lambda: self.update_status(
-                    f"清理完成！成功 {deleted_count} 个，失败 {failed_count} 个，释放 {format_file_size(freed_size)}", "red"
+                    f"清理完成！删除 {deleted_count} 个文件，失败 {failed_count} 个，释放 {format_file_size(freed_size)}", "red"
                 ))
                 failed_msg = "\n".join(failed_files[:10])
                 if len(failed_files) > 10:
-                    failed_msg += f"\n... 还有 {len(failed_files) - 10} 个项目清理失败"
+                    failed_msg += f"\n... 还有 {len(failed_files) - 10} 个文件清理失败"
                 self.root.after(0, lambda: messagebox.showwarning(
                     "部分失败",
-                    f"清理完成！\n\n成功清理 {deleted_count} 个项目\n释放空间：{format_file_size(freed_size)}\n失败 {failed_count} 个项目：\n{failed_msg}"
+                    f"清理完成！\n\n删除 {deleted_count} 个文件\n释放空间：{format_file_size(freed_size)}\n失败 {failed_count} 个：\n{failed_msg}"
                 ))
 
             # 重新扫描
@@ -998,7 +1308,7 @@ class DiskCleaner:
 
     def start_clean(self):
         """开始清理（在新线程中执行）"""
-        if not self.selected_items:
+        if not self.cleanup_items.selected:
             messagebox.showwarning("警告", "请先选择要清理的项目")
             return
 
@@ -1009,7 +1319,83 @@ class DiskCleaner:
         thread.start()
 
 
+    def compress_files(self):
+        """就地压缩选中项目中的文件（在后台线程中执行）：校验压缩文件后才删除原文件"""
+        try:
+            # 选中的其他类别项目不压缩
+            items = [item for item in self.cleanup_items.selected_items() if item['category'] in COMPRESS_CATEGORIES]
+            selected_paths = [item['path'] for item in items]
+            method = self.compress_method_var.get()
+            lines = [f"{i}. {path}" for i, path in enumerate(selected_paths[:20], 1)]
+            if len(selected_paths) > 20:
+                lines.append(f"... 共 {len(selected_paths)} 个项目")
+            detail_text = (f"将用 {method} 就地压缩以下项目中超过 {COMPRESS_MIN_AGE_DAYS} 天未修改的文件：\n\n"
+                           + "\n".join(lines) + "\n")
+            detail_text += "\n每个文件压缩并校验通过后才删除原文件，已压缩的文件会跳过。确定要继续吗？"
+            if not messagebox.askyesno("确认压缩", detail_text):
+                self.update_status("已取消压缩", "green")
+                return
+
+            self.update_status(f"正在压缩 {len(selected_paths)} 个项目...", "blue")
+            self.root.after(0, self.start_progress_polling)
+
+            def progress_callback(compressed, reclaimed, current_path):
+                self.scan_progress = (f"已压缩 {compressed} 个文件，节省 {format_file_size(reclaimed)}：{current_path}", 0, 0)
+
+            result = execute_compression(items, method, progress_callback=progress_callback)
+            self.root.after(0, self.stop_progress_polling)
+            self.root.after(0, lambda: self.current_path_label.config(text=""))
+
+            # 被压缩的目录大小已变化，下次扫描重新统计
+            try:
+                self.size_index.invalidate(selected_paths)
+            except Exception:
+                pass
+
+            summary = (f"压缩 {result['compressed']} 个文件（{format_file_size(result['original'])} → "
+                       f"{format_file_size(result['archived'])}），节省 {format_file_size(result['reclaimed'])}")
+            if result['skipped']:
+                summary += f"，{result['skipped']} 个压缩后不变小已保留"
+            if result['failed']:
+                failed_msg = "\n".join(f"{path} ({reason})" for path, reason in result['failed'][:10])
+                if len(result['failed']) > 10:
+                    failed_msg += f"\n... 还有 {len(result['failed']) - 10} 个文件压缩失败"
+                self.root.after(0, lambda: self.update_status(f"{summary}，失败 {len(result['failed'])} 个", "red"))
+                self.root.after(0, lambda: messagebox.showwarning(
+                    "部分失败", f"{summary}\n\n失败 {len(result['failed'])} 个：\n{failed_msg}"
+                ))
+            else:
+                self.root.after(0, lambda: self.update_status(summary, "green"))
+                self.root.after(0, lambda: messagebox.showinfo("成功", f"✨ 压缩完成！\n\n{summary}"))
+
+            # 重新扫描
+            self.root.after(0, self.start_scan)
+
+        except Exception as e:
+            self.root.after(0, lambda: self.update_status("压缩失败", "red"))
+            self.root.after(0, lambda: messagebox.showerror("错误", f"压缩失败：\n{str(e)}"))
+        finally:
+            self.root.after(0, lambda: self.compress_button.config(state=tk.NORMAL, text="🗜️ 压缩选中项目"))
+
+    def start_compress(self):
+        """开始就地压缩（在新线程中执行）"""
+        if not self.cleanup_items.selected:
+            messagebox.showwarning("警告", "请先选择要压缩的项目")
+            return
+        # 只压缩日志等冷数据，缓存、临时文件仍在使用，压缩后程序无法读取
+        if not any(item['category'] in COMPRESS_CATEGORIES for item in self.cleanup_items.selected_items()):
+            messagebox.showwarning("警告", f"只能压缩{'、'.join(COMPRESS_CATEGORIES)}类项目，请选择日志项目")
+            return
+
+        self.compress_button.config(state=tk.DISABLED, text="⏳ 正在压缩...")
+
+        thread = threading.Thread(target=self.compress_files, daemon=True)
+        thread.start()
+
+
 if __name__ == "__main__":
+    # 压缩使用进程池，打包成exe后需要支持子进程启动
+    multiprocessing.freeze_support()
     # 使用 ttkbootstrap 创建窗口，应用现代化主题
     root = ttk.Window(themename="cosmo")  # 可选主题: cosmo, flatly, litera, minty, pulse, sandstone, united, yeti
     app = DiskCleaner(root)
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+@Description :  脚本： C盘磁盘空间优化工具 - 无界面定时清理（命令行版本，不依赖tkinter/ttkbootstrap）
+
+用法：
+    # 按注册表中的目标和清理策略扫描，生成清理计划（只扫描不删除）
+    python disk_cleaner_cli.py plan -o plan.json
+    # 使用自定义注册表或指定平台预设
+    python disk_cleaner_cli.py plan --registry targets.json --platform linux -o plan.json
+    # 执行计划中的清理，最多运行10分钟，结果以JSON输出
+    python disk_cleaner_cli.py run plan.json --time-budget 600 -o result.json
+    # 不允许删除的日志：对计划中日志类项目里超过7天未修改的文件就地压缩（校验后才删除原文件）
+    python disk_cleaner_cli.py compress plan.json --method lzma -o result.json
+
+退出码：0 全部成功；1 有文件清理（压缩）失败；2 超出时间预算被中断
+
+@Author : sundi
+@Created  : 2026/10/19
+"""
+
+import argparse
+import json
+import multiprocessing
+import socket
+import sys
+import time
+from cleaner_engine import (
+    format_file_size, load_scan_targets, scan_cleanup_targets, execute_cleanup, execute_compression,
+    available_compress_methods, DirSizeIndex, DEFAULT_SIZE_INDEX_PATH, DEFAULT_DELETE_WORKERS, DEFAULT_COMPRESS_WORKERS,
+    COMPRESS_MIN_AGE_DAYS
+)
+from scan_snapshot import write_cleanup_snapshot
+
+
+# 清理计划文件格式标识
+PLAN_FORMAT = "sundi-disk-cleaner-plan/1"
+
+
+def open_output(path):
+    return open(path, "w", encoding="utf-8", errors="surrogateescape") if path else sys.stdout
+
+
+def cmd_plan(args):
+    """扫描并写出清理计划（JSON）"""
+    scan_targets = load_scan_targets(args.registry, args.platform)
+    size_index = None if args.no_index else DirSizeIndex(args.index)
+
+    def progress_callback(message, current, total):
+        if args.verbose:
+            print(f"[{current}/{total}] {message.splitlines()[0]}", file=sys.stderr)
+
+    started = time.time()
+    dirs = []
+    items = scan_cleanup_targets(progress_callback=progress_callback, scan_targets=scan_targets, size_index=size_index,
+                                 dir_visitor=lambda path, size, files: dirs.append((path, size, files)))
+    if dirs and not args.no_snapshot:
+        # 每次扫描保存一份目标大小快照，可用 scan_snapshot.py diff --cleanup 查看增长
+        write_cleanup_snapshot(dirs)
+    plan = {
+        "format": PLAN_FORMAT,
+        "host": socket.gethostname(),
+        "created_at": started,
+        "scan_seconds": round(time.time() - started, 3),
+        "total_size": sum(item['size'] for item in items),
+        "total_files": sum(item.get('files', 0) for item in items),
+        "items": [
+            {
+                "path": item['path'],
+                "type": item['type'],
+                "category": item['category'],
+                "description": item['description'],
+                "size": item['size'],
+                "files": item.get('files', 0),
+                # 按策略扫描的项目只删除这些文件：{目录: [[文件名, 大小, 修改时间], ...]}，清理时大小或修改时间已变的文件跳过；null 表示整体删除
+                "deletions": item.get('deletions')
+            }
+            for item in items
+        ]
+    }
+    write_report(plan, args.output)
+    print(f"共 {len(items)} 个可清理项目，可释放 {format_file_size(plan['total_size'])}", file=sys.stderr)
+
+
+def load_plan(path):
+    with open(path, "r", encoding="utf-8", errors="surrogateescape") as f:
+        plan = json.load(f)
+    if plan.get("format") != PLAN_FORMAT:
+        raise SystemExit(f"不支持的计划文件格式：{path}")
+    return plan
+
+
+def write_report(report, path):
+    out = open_output(path)
+    try:
+        json.dump(report, out, ensure_ascii=False, indent=2 if path is None else None)
+        out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def cmd_run(args):
+    """执行清理计划，输出JSON结果"""
+    plan = load_plan(args.plan)
+
+    started = time.monotonic()
+    deadline = started + args.time_budget if args.time_budget else None
+    result = execute_cleanup(
+        plan["items"],
+        stop_flag=(lambda: time.monotonic() > deadline) if deadline else None,
+        workers=args.workers
+    )
+    # 清理过的目录使目录大小索引失效
+    if not args.no_index:
+        DirSizeIndex(args.index).invalidate([item['path'] for item in plan["items"]])
+
+    report = {
+        "host": socket.gethostname(),
+        "plan": args.plan,
+        "planned_size": plan.get("total_size", 0),
+        "deleted_files": result['deleted'],
+        "freed_size": result['freed'],
+        "freed_by_path": result['freed_by_path'],
+        "failed": [{"path": path, "reason": reason} for path, reason in result['failed']],
+        "stopped": result['stopped'],
+        "elapsed_seconds": round(time.monotonic() - started, 3)
+    }
+    write_report(report, args.output)
+    print(f"删除 {result['deleted']} 个文件，释放 {format_file_size(result['freed'])}，失败 {len(result['failed'])} 个"
+          + ("（超出时间预算，已中断）" if result['stopped'] else ""), file=sys.stderr)
+    if result['stopped']:
+        return 2
+    return 1 if result['failed'] else 0
+
+
+def cmd_compress(args):
+    """就地压缩计划中日志类项目的冷文件（不删除任何未压缩的内容），输出JSON结果"""
+    plan = load_plan(args.plan)
+
+    started = time.monotonic()
+    deadline = started + args.time_budget if args.time_budget else None
+    result = execute_compression(
+        plan["items"],
+        args.method,
+        args.level,
+        stop_flag=(lambda: time.monotonic() > deadline) if deadline else None,
+        workers=args.workers,
+        min_age_days=args.min_age_days
+    )
+    if not args.no_index:
+        DirSizeIndex(args.index).invalidate([item['path'] for item in plan["items"]])
+
+    report = {
+        "host": socket.gethostname(),
+        "plan": args.plan,
+        "method": args.method,
+        "min_age_days": args.min_age_days,
+        "compressed_files": result['compressed'],
+        "skipped_files": result['skipped'],
+        "original_size": result['original'],
+        "archived_size": result['archived'],
+        "reclaimed_size": result['reclaimed'],
+        "failed": [{"path": path, "reason": reason} for path, reason in result['failed']],
+        "stopped": result['stopped'],
+        "elapsed_seconds": round(time.monotonic() - started, 3)
+    }
+    write_report(report, args.output)
+    print(f"压缩 {result['compressed']} 个文件，节省 {format_file_size(result['reclaimed'])}，失败 {len(result['failed'])} 个"
+          + ("（超出时间预算，已中断）" if result['stopped'] else ""), file=sys.stderr)
+    if result['stopped']:
+        return 2
+    return 1 if result['failed'] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="C盘磁盘空间优化工具 - 无界面定时清理")
+    parser.add_argument("--index", default=DEFAULT_SIZE_INDEX_PATH, help="目录大小索引路径（只用于不带清理策略的目标）")
+    parser.add_argument("--no-index", action="store_true", help="不使用目录大小索引")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = subparsers.add_parser("plan", help="扫描并生成清理计划（不删除任何文件）")
+    plan_parser.add_argument("-o", "--output", help="计划输出文件（默认标准输出）")
+    plan_parser.add_argument("--registry", help="清理目标注册表（JSON），默认使用内置或用户注册表")
+    plan_parser.add_argument("--platform", choices=["windows", "linux", "darwin"], help="使用指定平台的预设")
+    plan_parser.add_argument("--no-snapshot", action="store_true", help="不保存本次扫描的目标大小快照")
+    plan_parser.add_argument("-v", "--verbose", action="store_true", help="在标准错误输出扫描进度")
+    plan_parser.set_defaults(func=cmd_plan)
+
+    run_parser = subparsers.add_parser("run", help="执行清理计划")
+    run_parser.add_argument("plan", help="plan 命令生成的计划文件")
+    run_parser.add_argument("-o", "--output", help="结果输出文件（默认标准输出）")
+    run_parser.add_argument("--time-budget", type=float, default=0, help="最长运行时间（秒），0表示不限")
+    run_parser.add_argument("--workers", type=int, default=DEFAULT_DELETE_WORKERS, help="并行删除线程数")
+    run_parser.set_defaults(func=cmd_run)
+
+    compress_parser = subparsers.add_parser("compress", help="就地压缩计划中日志类项目的冷文件（校验后才删除原文件）")
+    compress_parser.add_argument("plan", help="plan 命令生成的计划文件")
+    compress_parser.add_argument("-o", "--output", help="结果输出文件（默认标准输出）")
+    compress_parser.add_argument("--method", choices=available_compress_methods(), default="gzip", help="压缩格式")
+    compress_parser.add_argument("--level", type=int, help="压缩级别（默认使用各格式的默认级别）")
+    compress_parser.add_argument("--min-age-days", type=float, default=COMPRESS_MIN_AGE_DAYS,
+                                 help="只压缩超过N天未修改的文件（0表示不限）")
+    compress_parser.add_argument("--time-budget", type=float, default=0, help="最长运行时间（秒），0表示不限")
+    compress_parser.add_argument("--workers", type=int, default=DEFAULT_COMPRESS_WORKERS, help="并行压缩进程数")
+    compress_parser.set_defaults(func=cmd_compress)
+
+    args = parser.parse_args(argv)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
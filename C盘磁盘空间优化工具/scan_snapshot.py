@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+@Description :  脚本： C盘磁盘空间优化工具 - 目录大小快照与增长对比（不依赖tkinter/ttkbootstrap）
+
+每次分析一个磁盘或文件夹时保存一份按目录的大小快照（每个目录的递归总大小和文件数）；
+常规的清理目标扫描也保存一份（种类为 cleanup，记录每个清理目标及其一级子目录，与最大文件分析的快照分开保存和对比）。
+两份快照按路径有序归并比较，找出两次扫描之间增长最多的目录：
+    # 扫描并保存快照
+    python scan_snapshot.py take D:\\data
+    # 列出某个目录已有的快照
+    python scan_snapshot.py list D:\\data
+    # 对比最新两次快照（或用 --old/--new 指定快照文件），按增长字节数和文件数排序
+    python scan_snapshot.py diff D:\\data --top 30
+    # 对比最新两次清理目标扫描
+    python scan_snapshot.py diff --cleanup
+
+快照文件为 gzip 压缩的文本：第一行是 "#" 加JSON头，之后每行 "相对路径\t大小\t文件数"，按相对路径排序，
+比较时两份快照各顺序读一遍，内存占用只与排行条数有关。
+
+@Author : sundi
+@Created  : 2026/10/19
+"""
+
+import os
+import sys
+import gzip
+import json
+import heapq
+import socket
+import hashlib
+import argparse
+import time
+from cleaner_engine import format_file_size, find_largest
+
+
+SNAPSHOT_FORMAT = "sundi-disk-snapshot/1"
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.expanduser("~"), ".disk_cleaner_snapshots")
+# 每个目录保留的快照份数（超出时删除最旧的）
+SNAPSHOT_KEEP = 30
+# 增长排行默认保留的条数
+DEFAULT_DIFF_TOP = 100
+# 清理目标扫描的快照：种类和根目录（路径不在该根目录下的目标不保存，如Windows上其他盘符的目标）
+CLEANUP_KIND = "cleanup"
+CLEANUP_SNAPSHOT_ROOT = os.path.abspath(os.sep)
+
+
+def _root_key(root, kind=None):
+    """快照文件名中标识扫描根目录（及快照种类）的短哈希"""
+    key = os.path.normcase(os.path.abspath(root)) + (f"|{kind}" if kind else "")
+    return hashlib.md5(key.encode("utf-8", "surrogateescape")).hexdigest()[:12]
+
+
+def list_snapshots(root, snapshot_dir=DEFAULT_SNAPSHOT_DIR, kind=None):
+    """某个根目录（某种快照）的全部快照文件，按时间从旧到新排列"""
+    prefix = _root_key(root, kind) + "_"
+    try:
+        names = [name for name in os.listdir(snapshot_dir) if name.startswith(prefix) and name.endswith(".snap.gz")]
+    except OSError:
+        return []
+    return [os.path.join(snapshot_dir, name) for name in sorted(names)]
+
+
+def write_snapshot(root, dirs, snapshot_dir=DEFAULT_SNAPSHOT_DIR, created_at=None, keep=SNAPSHOT_KEEP, kind=None):
+    """
+    保存快照：dirs 为 [(目录路径, 递归大小, 递归文件数), ...]，顺序不限。返回快照文件路径
+
+    路径以相对根目录的形式保存（根目录为 "."），名称中含换行的目录无法按行保存，只计入上级目录。
+    dirs 中的路径应以 root 开头（与 find_largest 的结果一致），直接截掉前缀，不逐个调用 relpath；不在 root 下的路径跳过。
+    没有根目录本身的记录时（如清理目标快照），总大小为最上层各目录之和
+    """
+    prefix = os.path.join(root, "")
+    prefix_len = len(prefix)
+    root = os.path.abspath(root)
+    created_at = time.time() if created_at is None else created_at
+    rows = []
+    total = None
+    for path, size, files in dirs:
+        if path != prefix[:-1] and not path.startswith(prefix):
+            continue
+        rel_path = path[prefix_len:] or "."
+        if rel_path == ".":
+            total = (size, files)
+        if "\n" not in rel_path:
+            rows.append((rel_path, size, files))
+    rows.sort()
+    if total is None:
+        # 按路径排序后上级目录在前，只累加上级目录都不在快照中的目录
+        total = [0, 0]
+        tops = set()
+        for rel_path, size, files in rows:
+            parent = os.path.dirname(rel_path)
+            while parent and parent not in tops:
+                parent = os.path.dirname(parent)
+            if parent in tops:
+                continue
+            tops.add(rel_path)
+            total[0] += size
+            total[1] += files
+    total_size, total_files = total
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(created_at)) + f"-{int(created_at * 1000) % 1000:03d}"
+    snapshot_path = os.path.join(snapshot_dir, f"{_root_key(root, kind)}_{stamp}.snap.gz")
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "kind": kind,
+        "root": root,
+        "host": socket.gethostname(),
+        "created_at": created_at,
+        "dirs": len(rows),
+        "size": total_size,
+        "files": total_files
+    }
+    temp_path = snapshot_path + ".tmp"
+    with gzip.open(temp_path, "wt", encoding="utf-8", errors="surrogateescape", compresslevel=6) as f:
+        f.write("#" + json.dumps(header, ensure_ascii=False) + "\n")
+        f.writelines(f"{rel_path}\t{size}\t{files}\n" for rel_path, size, files in rows)
+    os.replace(temp_path, snapshot_path)
+
+    # 只保留最近 keep 份
+    for old_path in list_snapshots(root, snapshot_dir, kind)[:-keep] if keep else ():
+        try:
+            os.remove(old_path)
+        except OSError:
+            pass
+    return snapshot_path
+
+
+def take_snapshot(root, snapshot_dir=DEFAULT_SNAPSHOT_DIR, progress_callback=None, stop_flag=None):
+    """扫描目录并保存快照，返回 (快照文件路径, find_largest 的结果)；被中断时返回 (None, None)"""
+    dirs = []
+    result = find_largest(root, progress_callback=progress_callback, stop_flag=stop_flag,
+                          dir_visitor=lambda dirpath, size, files: dirs.append((dirpath, size, files)))
+    if result is None:
+        return None, None
+    return write_snapshot(root, dirs, snapshot_dir), result
+
+
+def write_cleanup_snapshot(dirs, snapshot_dir=DEFAULT_SNAPSHOT_DIR, created_at=None):
+    """保存一次清理目标扫描的快照：dirs 为 scan_cleanup_targets 的 dir_visitor 收到的 [(路径, 大小, 文件数), ...]"""
+    return write_snapshot(CLEANUP_SNAPSHOT_ROOT, dirs, snapshot_dir, created_at, kind=CLEANUP_KIND)
+
+
+def read_snapshot_header(snapshot_path):
+    with gzip.open(snapshot_path, "rt", encoding="utf-8", errors="surrogateescape") as f:
+        line = f.readline()
+    if not line.startswith("#"):
+        raise ValueError(f"不是快照文件：{snapshot_path}")
+    header = json.loads(line[1:])
+    if header.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"不支持的快照格式：{snapshot_path}")
+    return header
+
+
+def iter_snapshot(snapshot_path):
+    """按相对路径顺序逐行读出 (相对路径, 大小, 文件数)"""
+    with gzip.open(snapshot_path, "rt", encoding="utf-8", errors="surrogateescape") as f:
+        f.readline()
+        for line in f:
+            rel_path, size, files = line[:-1].rsplit("\t", 2)
+            yield rel_path, int(size), int(files)
+
+
+def diff_snapshots(old_path, new_path, top=DEFAULT_DIFF_TOP):
+    """
+    归并比较两份快照（都按相对路径排序，各顺序读一遍），按增长字节数和增长文件数排行
+
+    新出现的目录按旧大小0计算，消失的目录按新大小0计算。返回
+    {'old', 'new'（快照头）, 'by_size', 'by_files'（[(增长字节数, 增长文件数, 路径, 旧大小, 新大小)]，降序）,
+     'size_delta', 'files_delta', 'added', 'removed'}
+    """
+    old_header = read_snapshot_header(old_path)
+    new_header = read_snapshot_header(new_path)
+    root = new_header["root"]
+    by_size = []
+    by_files = []
+    added = removed = 0
+    done = object()
+
+    def push(heap, key, row):
+        if len(heap) < top:
+            heapq.heappush(heap, (key, row))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, row))
+
+    old_rows = iter_snapshot(old_path)
+    new_rows = iter_snapshot(new_path)
+    old_row = next(old_rows, done)
+    new_row = next(new_rows, done)
+    while old_row is not done or new_row is not done:
+        if new_row is done or (old_row is not done and old_row[0] < new_row[0]):
+            rel_path, old_size, old_files = old_row
+            new_size = new_files = 0
+            removed += 1
+            old_row = next(old_rows, done)
+        elif old_row is done or new_row[0] < old_row[0]:
+            rel_path, new_size, new_files = new_row
+            old_size = old_files = 0
+            added += 1
+            new_row = next(new_rows, done)
+        else:
+            rel_path, old_size, old_files = old_row
+            new_size, new_files = new_row[1], new_row[2]
+            old_row = next(old_rows, done)
+            new_row = next(new_rows, done)
+        size_delta = new_size - old_size
+        files_delta = new_files - old_files
+        if size_delta <= 0 and files_delta <= 0:
+            continue
+        row = (size_delta, files_delta, rel_path, old_size, new_size)
+        if size_delta > 0:
+            push(by_size, size_delta, row)
+        if files_delta > 0:
+            push(by_files, files_delta, row)
+
+    def ranked(heap):
+        return [
+            (size_delta, files_delta, os.path.normpath(os.path.join(root, rel_path)), old_size, new_size)
+            for key, (size_delta, files_delta, rel_path, old_size, new_size) in sorted(heap, reverse=True)
+        ]
+
+    return {
+        'old': old_header,
+        'new': new_header,
+        'by_size': ranked(by_size),
+        'by_files': ranked(by_files),
+        'size_delta': new_header["size"] - old_header["size"],
+        'files_delta': new_header["files"] - old_header["files"],
+        'added': added,
+        'removed': removed
+    }
+
+
+def format_size_delta(size_delta):
+    return ("+" if size_delta >= 0 else "-") + format_file_size(abs(size_delta))
+
+
+def cmd_take(args):
+    """扫描目录并保存快照"""
+    for root in args.roots:
+        started = time.time()
+        snapshot_path, result = take_snapshot(root, args.snapshot_dir)
+        print(f"{root}：{result['file_count']} 个文件，{format_file_size(result['size'])}，"
+              f"耗时 {time.time() - started:.1f} 秒 → {snapshot_path}", file=sys.stderr)
+
+
+def _listed_snapshots(args):
+    """命令行参数对应的快照列表：--cleanup 时为清理目标扫描的快照"""
+    if args.cleanup:
+        return list_snapshots(CLEANUP_SNAPSHOT_ROOT, args.snapshot_dir, CLEANUP_KIND)
+    return list_snapshots(args.root, args.snapshot_dir)
+
+
+def cmd_list(args):
+    """列出某个目录的快照"""
+    for snapshot_path in _listed_snapshots(args):
+        header = read_snapshot_header(snapshot_path)
+        created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(header["created_at"]))
+        print(f"{created}  {format_file_size(header['size']):>10}  {header['files']:>10} 个文件  {snapshot_path}")
+
+
+def cmd_diff(args):
+    """对比两份快照"""
+    if args.old and args.new:
+        old_path, new_path = args.old, args.new
+    else:
+        snapshots = _listed_snapshots(args)
+        if len(snapshots) < 2:
+            raise SystemExit("清理目标扫描的快照不足两份" if args.cleanup else f"{args.root} 的快照不足两份，请先运行 take")
+        old_path, new_path = args.old or snapshots[-2], args.new or snapshots[-1]
+
+    started = time.time()
+    diff = diff_snapshots(old_path, new_path, args.top)
+    if args.json:
+        print(json.dumps(diff, ensure_ascii=False, indent=2))
+        return
+    print(f"{diff['new']['root']}：总大小 {format_size_delta(diff['size_delta'])}，"
+          f"文件 {diff['files_delta']:+d} 个，新增目录 {diff['added']} 个，消失目录 {diff['removed']} 个"
+          f"（对比耗时 {time.time() - started:.2f} 秒）")
+    rows = diff['by_files'] if args.by_files else diff['by_size']
+    for size_delta, files_delta, path, old_size, new_size in rows:
+        print(f"{format_size_delta(size_delta):>12}  {files_delta:>+10d}  {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="C盘磁盘空间优化工具 - 目录大小快照与增长对比")
+    parser.add_argument("--snapshot-dir", default=DEFAULT_SNAPSHOT_DIR, help="快照保存目录")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    take_parser = subparsers.add_parser("take", help="扫描目录并保存快照")
+    take_parser.add_argument("roots", nargs="+", help="要扫描的磁盘或目录")
+    take_parser.set_defaults(func=cmd_take)
+
+    list_parser = subparsers.add_parser("list", help="列出某个目录的快照")
+    list_parser.add_argument("root", nargs="?", help="扫描时的根目录")
+    list_parser.add_argument("--cleanup", action="store_true", help="列出清理目标扫描的快照")
+    list_parser.set_defaults(func=cmd_list)
+
+    diff_parser = subparsers.add_parser("diff", help="对比两份快照，按增长排序")
+    diff_parser.add_argument("root", nargs="?", help="扫描时的根目录（对比最新两份快照）")
+    diff_parser.add_argument("--cleanup", action="store_true", help="对比最新两次清理目标扫描的快照")
+    diff_parser.add_argument("--old", help="旧快照文件（默认倒数第二份）")
+    diff_parser.add_argument("--new", help="新快照文件（默认最新一份）")
+    diff_parser.add_argument("--top", type=int, default=DEFAULT_DIFF_TOP, help="排行条数")
+    diff_parser.add_argument("--by-files", action="store_true", help="按增长文件数排序（默认按增长字节数）")
+    diff_parser.add_argument("--json", action="store_true", help="以JSON输出")
+    diff_parser.set_defaults(func=cmd_diff)
+
+    args = parser.parse_args(argv)
+    if args.command == "list" and not args.root and not args.cleanup:
+        parser.error("list 需要根目录，或指定 --cleanup")
+    if args.command == "diff" and not args.root and not args.cleanup and not (args.old and args.new):
+        parser.error("diff 需要根目录、--cleanup，或同时指定 --old 和 --new")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+@Description :  脚本： 文件去重工具 - 全局内容地址索引（摘要 → 文件位置）
+
+入库前查询"这个内容是否已在扫描过的目录中存在"：
+    # 建立/增量更新索引（未变化的文件直接复用上次的MD5）
+    python content_index.py index D:\\share E:\\backup
+    # 按MD5或按 (大小, 部分哈希) 查询
+    python content_index.py lookup --md5 d41d8cd98f00b204e9800998ecf8427e
+    python content_index.py lookup --file new_upload.zip
+    # 启动本地HTTP查询服务：GET /lookup?md5=... 或 /lookup?size=...&partial=...
+    python content_index.py serve --port 8765
+
+@Author : sundi
+@Created  : 2026/10/19
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from dedup_engine import calculate_md5
+
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".dedup_content_index.sqlite")
+# 部分哈希只读取文件开头的数据，调用方无需读完整个文件即可粗查
+PARTIAL_HASH_SIZE = 64 * 1024
+# 批量提交的记录数
+COMMIT_BATCH_SIZE = 5000
+
+
+def calculate_partial_hash(file_path, throttle=None):
+    """计算文件开头PARTIAL_HASH_SIZE字节的MD5（与 (size, partial) 一起作为粗查键，传入throttle时计入限速）"""
+    try:
+        with open(file_path, "rb") as f:
+            data = f.read(PARTIAL_HASH_SIZE)
+        if throttle:
+            throttle.consume(len(data))
+        return hashlib.md5(data).hexdigest()
+    except Exception:
+        return None
+
+
+class ContentIndex:
+    """
+    持久化的摘要 → 位置索引（SQLite），按MD5或 (大小, 部分哈希) 走索引查询
+
+    每个线程使用独立连接，可直接被HTTP服务的多个请求线程共享。
+    查询时会核对文件是否仍然存在、大小和修改时间是否未变，已删除或已变化的记录从结果中去掉并从索引中删除
+    """
+
+    def __init__(self, index_path=DEFAULT_INDEX_PATH):
+        self.index_path = index_path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                root TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                md5 TEXT NOT NULL,
+                partial TEXT,
+                scanned_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_files_md5 ON files (md5);
+            CREATE INDEX IF NOT EXISTS idx_files_size_partial ON files (size, partial);
+            CREATE INDEX IF NOT EXISTS idx_files_root ON files (root, scanned_at);
+        """)
+        conn.commit()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def index_directory(self, directory, throttle=None, progress_callback=None):
+        """
+        增量索引一个目录：大小和修改时间未变的文件复用已有MD5，只对新增或变化的文件计算；
+        扫描完成后删除该目录下本次未再出现的旧记录。返回 (文件数, 新计算的文件数)
+        """
+        conn = self._connect()
+        root = os.path.abspath(directory)
+        scanned_at = time.time()
+        known = {path: (size, mtime) for path, size, mtime in
+                 conn.execute("SELECT path, size, mtime FROM files WHERE root = ?", (root,))}
+
+        file_count = 0
+        hashed_count = 0
+        pending = []
+        for dirpath, dirs, files in os.walk(root):
+            for file in files:
+                file_path = os.path.join(dirpath, file)
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    continue
+                file_count += 1
+                if known.get(file_path) == (st.st_size, st.st_mtime):
+                    pending.append(("touch", file_path))
+                else:
+                    md5_hash = calculate_md5(file_path, throttle)
+                    if not md5_hash:
+                        continue
+                    hashed_count += 1
+                    pending.append(("upsert", (file_path, root, st.st_size, st.st_mtime, md5_hash,
+                                               calculate_partial_hash(file_path, throttle), scanned_at)))
+                    if progress_callback:
+                        progress_callback(file_path, file_count)
+                if len(pending) >= COMMIT_BATCH_SIZE:
+                    self._flush(conn, pending, scanned_at)
+                    pending = []
+        self._flush(conn, pending, scanned_at)
+
+        conn.execute("DELETE FROM files WHERE root = ? AND scanned_at < ?", (root, scanned_at))
+        conn.commit()
+        return file_count, hashed_count
+
+    @staticmethod
+    def _flush(conn, pending, scanned_at):
+        """批量写入本次扫描的记录"""
+        conn.executemany(
+            "UPDATE files SET scanned_at = ? WHERE path = ?",
+            [(scanned_at, item) for action, item in pending if action == "touch"]
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO files (path, root, size, mtime, md5, partial, scanned_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [item for action, item in pending if action == "upsert"]
+        )
+        conn.commit()
+
+    def add_scan_results(self, directory, duplicates, throttle=None):
+        """
+        把扫描中计算出摘要的文件（{md5: [路径, ...]}，如 scan_files 的 hash_callback 收集到的全部文件）增量写入索引
+
+        只接收真正的内容MD5：相似图片、抽样指纹和目录Merkle组的键不是文件内容摘要，会被跳过。
+        注意：扫描时大小唯一的文件不计算MD5，不会写入索引；要回答任意文件"是否已存在"，请用 index 命令完整索引目录。
+        计算部分哈希时读取的数据同样计入throttle限速
+        """
+        conn = self._connect()
+        root = os.path.abspath(directory)
+        scanned_at = time.time()
+        rows = []
+        for md5_hash, paths in duplicates.items():
+            if ":" in md5_hash:
+                continue
+            for path in paths:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if os.path.isdir(path):
+                    continue
+                rows.append((os.path.abspath(path), root, st.st_size, st.st_mtime, md5_hash,
+                             calculate_partial_hash(path, throttle), scanned_at))
+        conn.executemany(
+            "INSERT OR REPLACE INTO files (path, root, size, mtime, md5, partial, scanned_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        conn.commit()
+        return len(rows)
+
+    def remove_paths(self, paths):
+        """删除已删除或已移走的文件（或目录下全部文件）的记录，返回删除的记录数"""
+        conn = self._connect()
+        removed = 0
+        for path in paths:
+            path = os.path.abspath(path)
+            prefix = os.path.join(path, "")
+            removed += conn.execute(
+                "DELETE FROM files WHERE path = ? OR substr(path, 1, ?) = ?", (path, len(prefix), prefix)
+            ).rowcount
+        conn.commit()
+        return removed
+
+    def lookup_md5(self, md5_hash):
+        """按MD5查询所有位置"""
+        return self._rows("SELECT path, size, md5, mtime FROM files WHERE md5 = ?", (md5_hash.lower(),))
+
+    def lookup_partial(self, size, partial):
+        """按 (大小, 部分哈希) 粗查候选位置（需要再用MD5确认）"""
+        return self._rows("SELECT path, size, md5, mtime FROM files WHERE size = ? AND partial = ?",
+                          (int(size), partial.lower()))
+
+    def lookup_file(self, file_path):
+        """查询某个本地文件的内容是否已存在：先按 (大小, 部分哈希) 粗查，有候选时才计算完整MD5；文件无法读取时抛出ValueError"""
+        try:
+            size = os.path.getsize(file_path)
+        except OSError as e:
+            raise ValueError(f"无法读取文件：{file_path}（{e.strerror or e}）")
+        candidates = self.lookup_partial(size, calculate_partial_hash(file_path) or "")
+        if not candidates:
+            return []
+        md5_hash = calculate_md5(file_path)
+        return [row for row in candidates if row["md5"] == md5_hash]
+
+    def _rows(self, sql, params):
+        """执行查询，只返回仍与磁盘一致的记录，不一致的记录顺带删除"""
+        conn = self._connect()
+        rows = []
+        stale = []
+        for path, size, md5_hash, mtime in conn.execute(sql, params).fetchall():
+            try:
+                st = os.stat(path)
+            except OSError:
+                stale.append((path,))
+                continue
+            if (st.st_size, st.st_mtime) != (size, mtime):
+                stale.append((path,))
+                continue
+            rows.append({"path": path, "size": size, "md5": md5_hash, "mtime": mtime})
+        if stale:
+            conn.executemany("DELETE FROM files WHERE path = ?", stale)
+            conn.commit()
+        return rows
+
+
+def make_request_handler(index):
+    """创建绑定到指定索引的HTTP请求处理类"""
+
+    class LookupHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            if url.path != "/lookup":
+                return self._reply(404, {"error": "not found"})
+            try:
+                if "md5" in params:
+                    locations = index.lookup_md5(params["md5"])
+                elif "size" in params and "partial" in params:
+                    locations = index.lookup_partial(params["size"], params["partial"])
+                else:
+                    return self._reply(400, {"error": "需要参数 md5，或 size 和 partial"})
+            except ValueError as e:
+                return self._reply(400, {"error": str(e)})
+            self._reply(200, {"exists": bool(locations), "locations": locations})
+
+        def _reply(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return LookupHandler
+
+
+def serve(index, host="127.0.0.1", port=8765):
+    """启动本地HTTP查询服务（默认只监听本机）"""
+    server = ThreadingHTTPServer((host, port), make_request_handler(index))
+    print(f"内容索引查询服务已启动：http://{host}:{port}/lookup", file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def cmd_index(args):
+    """建立或增量更新目录索引"""
+    index = ContentIndex(args.index)
+    for directory in args.directories:
+        file_count, hashed_count = index.index_directory(directory)
+        print(f"{directory}：共 {file_count} 个文件，新计算 {hashed_count} 个", file=sys.stderr)
+
+
+def cmd_lookup(args):
+    """查询内容是否已存在"""
+    index = ContentIndex(args.index)
+    try:
+        locations = index.lookup_md5(args.md5) if args.md5 else index.lookup_file(args.file)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print(json.dumps({"exists": bool(locations), "locations": locations}, ensure_ascii=False, indent=2))
+
+
+def cmd_serve(args):
+    """启动本地HTTP查询服务"""
+    serve(ContentIndex(args.index), args.host, args.port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="文件去重工具 - 全局内容地址索引")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, help="索引文件路径")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = subparsers.add_parser("index", help="建立或增量更新目录索引")
+    index_parser.add_argument("directories", nargs="+", help="要索引的目录")
+    index_parser.set_defaults(func=cmd_index)
+
+    lookup_parser = subparsers.add_parser("lookup", help="查询内容是否已存在")
+    lookup_group = lookup_parser.add_mutually_exclusive_group(required=True)
+    lookup_group.add_argument("--md5", help="按MD5查询")
+    lookup_group.add_argument("--file", help="按本地文件内容查询")
+    lookup_parser.set_defaults(func=cmd_lookup)
+
+    serve_parser = subparsers.add_parser("serve", help="启动本地HTTP查询服务")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    serve_parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    serve_parser.set_defaults(func=cmd_serve)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1258 @@
+# -*- coding: utf-8 -*-
+"""
+@Description :  脚本： 文件去重工具 - 扫描引擎（不依赖界面库，可被GUI和命令行共用）
+@Author : sundi
+@Created  : 2026/10/19
+"""
+
+import os
+import sys
+import json
+import heapq
+import socket
+import shutil
+import time
+import uuid
+import ctypes
+import platform
+import threading
+import hashlib
+import itertools
+import struct
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# 块级分析的滚动哈希、相似图片的近邻查找在有NumPy时向量化计算（可选），否则退回纯Python实现，结果完全相同
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 相似图片检测依赖Pillow（可选），未安装时该功能不可用
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+# 限速模式下每次读取的块大小：块太小会让IOPS上限变成吞吐瓶颈
+THROTTLED_CHUNK_SIZE = 1024 * 1024
+
+# 索引分片文件格式标识（首行为JSON头，其后每行一条 [size, md5, host, path] 记录，按记录整体排序）
+SHARD_FORMAT = "sundi-dedup-shard/1"
+
+# 隔离区：每个文件系统根目录下的隔离目录名，以及记录所有隔离批次的追加式日志
+QUARANTINE_DIR_NAME = ".dedup_quarantine"
+DEFAULT_JOURNAL_PATH = os.path.join(os.path.expanduser("~"), ".dedup_quarantine_journal.jsonl")
+QUARANTINE_RETENTION_DAYS = 7
+
+# 相似图片检测：支持的图片扩展名和默认汉明距离阈值（64位dHash）
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tif', '.tiff', '.webp'}
+DEFAULT_SIMILAR_DISTANCE = 6
+# 多索引哈希把64位哈希切成的段数（每段16位）
+MIH_BLOCKS = 4
+
+# 内容定义分块（Gear滚动哈希）：最小/最大块大小，以及取哈希高13位判断切点（平均块约8KB）
+CDC_MIN_CHUNK = 2 * 1024
+CDC_MAX_CHUNK = 64 * 1024
+CDC_MASK = ((1 << 13) - 1) << 51
+CDC_READ_SIZE = 4 * 1024 * 1024
+CDC_MIN_FILE_SIZE = 1024 * 1024
+GEAR_TABLE = [int.from_bytes(hashlib.md5(bytes([i])).digest()[:8], "little") for i in range(256)]
+# 分块索引落盘记录：块摘要(16字节) + 文件编号 + 块大小
+CHUNK_RECORD = struct.Struct("<16sII")
+# 文件对共享字节落盘记录：文件A编号 + 文件B编号 + 共享字节数
+PAIR_RECORD = struct.Struct("<IIQ")
+
+# 外部排序：默认内存上限（字节）、单条记录的估算固定开销，以及一次归并同时打开的分段文件数上限
+DEFAULT_SORT_MEMORY_LIMIT = 256 * 1024 * 1024
+SORT_RECORD_OVERHEAD = 120
+SORT_MERGE_FANIN = 256
+
+# 抽样指纹：在文件头、1/4、中间、3/4、尾部各读取一块（文件不大于抽样总量时等同于完整比对）
+SAMPLE_BLOCK_SIZE = 4096
+SAMPLE_POSITIONS = (0.0, 0.25, 0.5, 0.75, 1.0)
+CONFIDENCE_EXACT = "exact"
+CONFIDENCE_SAMPLED = "sampled"
+
+# Linux ioprio_set 系统调用号（按CPU架构）
+IOPRIO_SET_SYSCALLS = {'x86_64': 251, 'amd64': 251, 'i386': 289, 'i686': 289, 'aarch64': 30, 'arm64': 30}
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_WHO_PROCESS = 1
+
+# Windows 线程后台模式（同时降低CPU和I/O优先级）
+THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+
+# 低优先级扫描线程的nice值（Linux），以及macOS线程后台QoS类别
+LOW_PRIORITY_NICE = 10
+QOS_CLASS_BACKGROUND = 0x09
+
+
+class IOThrottle:
+    """
+    令牌桶I/O限速器，同时限制吞吐（MB/s）和IOPS，限速值为0表示不限制
+
+    允许令牌透支：单次读取超过桶容量时先读取，再按欠额休眠，平均速率仍然不超过上限。
+    set_limits 可在扫描过程中随时调用，新限速立即对后续读取生效。
+    """
+
+    def __init__(self, mb_per_sec=0, iops=0):
+        self._lock = threading.Lock()
+        self._last_time = time.monotonic()
+        self.bytes_per_sec = 0
+        self.iops = 0
+        self._byte_tokens = 0.0
+        self._op_tokens = 0.0
+        self.set_limits(mb_per_sec, iops)
+
+    def set_limits(self, mb_per_sec=None, iops=None):
+        """调整限速值（None表示保持不变）"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if mb_per_sec is not None:
+                self.bytes_per_sec = max(0.0, float(mb_per_sec)) * 1024 * 1024
+                self._byte_tokens = min(self._byte_tokens, self.bytes_per_sec)
+            if iops is not None:
+                self.iops = max(0.0, float(iops))
+                self._op_tokens = min(self._op_tokens, self.iops)
+
+    def _refill(self, now):
+        """按流逝时间补充令牌（桶容量为1秒的额度）"""
+        elapsed = now - self._last_time
+        self._last_time = now
+        if self.bytes_per_sec > 0:
+            self._byte_tokens = min(self.bytes_per_sec, self._byte_tokens + elapsed * self.bytes_per_sec)
+        if self.iops > 0:
+            self._op_tokens = min(self.iops, self._op_tokens + elapsed * self.iops)
+
+    def consume(self, nbytes):
+        """记录一次读取操作，超出限速时阻塞到令牌足够"""
+        wait = 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.bytes_per_sec > 0:
+                self._byte_tokens -= nbytes
+                if self._byte_tokens < 0:
+                    wait = -self._byte_tokens / self.bytes_per_sec
+            if self.iops > 0:
+                self._op_tokens -= 1
+                if self._op_tokens < 0:
+                    wait = max(wait, -self._op_tokens / self.iops)
+        if wait > 0:
+            time.sleep(wait)
+
+
+def lower_io_priority():
+    """
+    降低当前线程的CPU和I/O优先级（尽力而为，不支持的平台静默跳过）
+
+    只影响调用线程（Linux按线程号设置nice值，macOS设置线程QoS），不会降低界面线程；
+    nice值设为LOW_PRIORITY_NICE而不是在当前值上累加，同一线程重复调用不会越调越低。
+    返回实际生效的调整项列表，便于界面提示
+    """
+    applied = []
+    if sys.platform == "win32":
+        try:
+            kernel32 = ctypes.windll.kernel32
+            if kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN):
+                applied.append("background")
+        except Exception:
+            pass
+        return applied
+
+    if sys.platform == "darwin":
+        # macOS的nice值作用于整个进程，改用线程级的后台QoS（同时降低CPU和I/O优先级）
+        try:
+            libc = ctypes.CDLL(None)
+            if libc.pthread_set_qos_class_self_np(QOS_CLASS_BACKGROUND, 0) == 0:
+                applied.append("qos")
+        except Exception:
+            pass
+        return applied
+
+    if sys.platform.startswith("linux") and hasattr(os, "setpriority"):
+        # Linux的nice值按线程生效：PRIO_PROCESS 配合线程号只调整调用线程
+        try:
+            thread_id = threading.get_native_id()
+            current = os.getpriority(os.PRIO_PROCESS, thread_id)
+            if current < LOW_PRIORITY_NICE:
+                os.setpriority(os.PRIO_PROCESS, thread_id, LOW_PRIORITY_NICE)
+            applied.append("nice")
+        except OSError:
+            pass
+
+    syscall_nr = IOPRIO_SET_SYSCALLS.get(platform.machine().lower())
+    if sys.platform.startswith("linux") and syscall_nr:
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            # who=0 表示调用线程本身
+            if libc.syscall(syscall_nr, IOPRIO_WHO_PROCESS, 0, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) == 0:
+                applied.append("ioprio")
+        except Exception:
+            pass
+    return applied
+
+
+def calculate_md5(file_path, throttle=None):
+    """计算文件的MD5值（传入throttle时按限速读取）"""
+    hash_md5 = hashlib.md5()
+    chunk_size = THROTTLED_CHUNK_SIZE if throttle else 4096
+    try:
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                if throttle:
+                    throttle.consume(len(chunk))
+                hash_md5.update(chunk)
+        return hash_md5.hexdigest()
+    except Exception as e:
+        return None
+
+
+def get_tree_size(path):
+    """计算文件或整个目录树的大小"""
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    total_size = 0
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            try:
+                total_size += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                continue
+    return total_size
+
+
+def build_merkle_tree(directory, file_hashes):
+    """
+    自底向上遍历目录，由已计算的文件MD5得到每个目录的Merkle哈希
+
+    目录哈希由子项的名称、类型和哈希按名称排序后计算得到，两个目录哈希相同即整棵目录树完全相同。
+    任何子项没有哈希（大小唯一而未计算、时间预算用完未计算、读取失败、符号链接等）时，
+    该目录及其所有上级目录的哈希为None，不参与目录合并。大小唯一的文件不可能在另一棵相同的目录树中出现，
+    因此跳过它们不会漏掉重复目录。
+
+    file_hashes: {文件路径: md5}
+    返回 dir_info: {目录路径: (merkle哈希或None, 子树文件数, 子树高度)}
+    """
+    dir_info = {}
+
+    for root, dirs, files in os.walk(directory, topdown=False):
+        entries = []
+        hashable = True
+        file_count = 0
+        height = 0
+
+        for file in files:
+            file_path = os.path.join(root, file)
+            md5_hash = file_hashes.get(file_path)
+            if not md5_hash or os.path.islink(file_path):
+                hashable = False
+                continue
+            entries.append((file, "F", md5_hash))
+            file_count += 1
+
+        for dir_name in dirs:
+            child_hash, child_count, child_height = dir_info.get(
+                os.path.join(root, dir_name), (None, 0, 0)
+            )
+            if child_hash is None:
+                hashable = False
+                continue
+            entries.append((dir_name, "D", child_hash))
+            file_count += child_count
+            height = max(height, child_height + 1)
+
+        merkle_hash = None
+        if hashable:
+            hash_md5 = hashlib.md5()
+            for name, kind, digest in sorted(entries):
+                hash_md5.update(f"{kind}{name}\0{digest}\n".encode("utf-8", "surrogateescape"))
+            merkle_hash = hash_md5.hexdigest()
+        dir_info[root] = (merkle_hash, file_count, height)
+
+    return dir_info
+
+
+def _is_under(path, roots):
+    """判断路径是否位于roots中某个目录之下"""
+    parent = os.path.dirname(path)
+    while parent and parent != path:
+        if parent in roots:
+            return True
+        path, parent = parent, os.path.dirname(parent)
+    return False
+
+
+def collapse_duplicate_dirs(file_hashes, dir_info, directory):
+    """
+    把完全相同的目录树合并为一个重复组，并从文件重复组中剔除被合并目录覆盖的文件
+
+    每个目录组按与界面相同的规则（路径最短）选出保留目录，其余目录整体作为可删除项；
+    保留目录下的文件仍参与文件级比对，以便发现它们与树外文件的重复。
+    目录组的键为 "dir:<Merkle哈希>"，与文件组的MD5键区分开
+    """
+    dir_groups = defaultdict(list)
+    for dir_path, (merkle_hash, file_count, height) in dir_info.items():
+        # 扫描根目录本身和空目录不参与合并
+        if merkle_hash and file_count > 0 and dir_path != directory:
+            dir_groups[merkle_hash].append(dir_path)
+
+    # 相同目录树高度相同，按高度从高到低处理可保证上级目录组总是先于其子目录组被决定
+    removed_dirs = set()
+    duplicates = {}
+    candidates = [(dir_info[paths[0]][2], merkle_hash, paths)
+                  for merkle_hash, paths in dir_groups.items() if len(paths) > 1]
+    for height, merkle_hash, paths in sorted(candidates, reverse=True):
+        live_paths = sorted((p for p in paths if not _is_under(p, removed_dirs)), key=lambda x: (len(x), x))
+        if len(live_paths) > 1:
+            duplicates[f"dir:{merkle_hash}"] = live_paths
+            removed_dirs.update(live_paths[1:])
+
+    file_dict = defaultdict(list)
+    for file_path, md5_hash in file_hashes.items():
+        if not _is_under(file_path, removed_dirs):
+            file_dict[md5_hash].append(file_path)
+    for md5_hash, paths in file_dict.items():
+        if len(paths) > 1:
+            duplicates[md5_hash] = paths
+
+    return duplicates
+
+
+def iter_waste_first(size_groups):
+    """
+    按潜在可释放空间 size × (count − 1) 从大到小依次产出 (size, paths)
+
+    使用堆作为候选队列，大文件组先被确认；0字节文件可释放空间为0，排在最后
+    """
+    heap = [(-size * (len(paths) - 1), size) for size, paths in size_groups.items() if len(paths) > 1]
+    heapq.heapify(heap)
+    while heap:
+        neg_waste, size = heapq.heappop(heap)
+        yield size, size_groups[size]
+
+
+class ExternalSorter:
+    """
+    外部归并排序：记录在内存中累积到上限后排序写入临时分段文件，最后对所有分段k路归并
+
+    记录为由数字和字符串组成的元组，分段文件每行一条JSON。分段过多时先分批归并成更大的分段，
+    保证同时打开的文件数不超过SORT_MERGE_FANIN。内存占用只与memory_limit有关，与记录总数无关。
+    """
+
+    def __init__(self, memory_limit=DEFAULT_SORT_MEMORY_LIMIT, temp_dir=None):
+        self.memory_limit = memory_limit
+        self._temp_dir = tempfile.mkdtemp(prefix="dedup_sort_", dir=temp_dir)
+        self._buffer = []
+        self._buffer_size = 0
+        self._runs = []
+        self._run_counter = 0
+        self.count = 0
+
+    def add(self, record):
+        """添加一条记录"""
+        self._buffer.append(record)
+        self._buffer_size += SORT_RECORD_OVERHEAD + sum(len(v) for v in record if isinstance(v, str))
+        self.count += 1
+        if self._buffer_size >= self.memory_limit:
+            self._spill()
+
+    def _spill(self):
+        """把内存中的记录排序后写成一个分段"""
+        self._buffer.sort()
+        self._runs.append(self._write_run(self._buffer))
+        self._buffer = []
+        self._buffer_size = 0
+
+    def _write_run(self, records):
+        self._run_counter += 1
+        run_path = os.path.join(self._temp_dir, f"run{self._run_counter}.jsonl")
+        with open(run_path, "w", encoding="utf-8", errors="surrogateescape") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return run_path
+
+    @staticmethod
+    def _read_run(run_path):
+        with open(run_path, "r", encoding="utf-8", errors="surrogateescape") as f:
+            for line in f:
+                yield tuple(json.loads(line))
+
+    def __iter__(self):
+        """按顺序产出全部记录（流式）"""
+        if not self._runs:
+            self._buffer.sort()
+            yield from self._buffer
+            return
+        if self._buffer:
+            self._spill()
+        runs = self._runs
+        while len(runs) > SORT_MERGE_FANIN:
+            merged_runs = []
+            for i in range(0, len(runs), SORT_MERGE_FANIN):
+                batch = runs[i:i + SORT_MERGE_FANIN]
+                merged_runs.append(self._write_run(heapq.merge(*(self._read_run(r) for r in batch))))
+                for run_path in batch:
+                    os.remove(run_path)
+            runs = merged_runs
+        self._runs = runs
+        yield from heapq.merge(*(self._read_run(r) for r in runs))
+
+    def close(self):
+        """删除临时分段文件"""
+        shutil.rmtree(self._temp_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def iter_duplicates_external(directory, memory_limit=DEFAULT_SORT_MEMORY_LIMIT, throttle=None):
+    """
+    外部排序模式查找重复文件，适用于上亿文件的目录树，内存占用不超过memory_limit（不含输出的单个重复组）
+
+    1. 遍历时把 (size, dev, inode, path) 写入外部排序器，不在内存中保存路径表；
+    2. 流式读取按大小排序的记录，同一大小出现第二个不同inode时才开始计算MD5；
+       同一inode（硬链接）只计算并输出一次，删除硬链接不会释放空间；
+    3. 把 (size, md5, path) 再做一次外部排序，流式合并相邻的相同记录得到重复组。
+    逐组产出 (md5, paths, size)，最后返回总文件数（可通过 StopIteration.value 获取）
+    """
+    total_files = 0
+    with ExternalSorter(memory_limit) as size_sorter, ExternalSorter(memory_limit) as hash_sorter:
+        for root, dirs, files in os.walk(directory):
+            for file in files:
+                total_files += 1
+                file_path = os.path.join(root, file)
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    continue
+                size_sorter.add((st.st_size, st.st_dev, st.st_ino, file_path))
+
+        current_size = None
+        pending = None  # 当前大小的第一条记录，出现第二个不同inode时才需要计算
+        last_inode = None
+        for size, dev, ino, file_path in size_sorter:
+            if size != current_size:
+                current_size, pending, last_inode = size, (dev, ino, file_path), (dev, ino)
+                continue
+            if (dev, ino) == last_inode:
+                continue
+            last_inode = (dev, ino)
+            if pending:
+                md5_hash = calculate_md5(pending[2], throttle)
+                if md5_hash:
+                    hash_sorter.add((size, md5_hash, pending[2]))
+                pending = None
+            md5_hash = calculate_md5(file_path, throttle)
+            if md5_hash:
+                hash_sorter.add((size, md5_hash, file_path))
+
+        current_key = None
+        paths = []
+        for size, md5_hash, file_path in hash_sorter:
+            if (size, md5_hash) != current_key:
+                if len(paths) > 1:
+                    yield current_key[1], paths, current_key[0]
+                current_key = (size, md5_hash)
+                paths = []
+            paths.append(file_path)
+        if len(paths) > 1:
+            yield current_key[1], paths, current_key[0]
+
+    return total_files
+
+
+def scan_files(directory, collapse_dirs=False, throttle=None, low_priority=False,
+               time_budget=None, group_callback=None, memory_limit=None, hash_callback=None):
+    """
+    扫描目录下所有文件并计算MD5
+
+    collapse_dirs为True时计算目录Merkle哈希，完全相同的目录树作为一个重复组返回（组内路径为目录）
+    throttle为IOThrottle实例时按其限速读取；low_priority为True时先降低扫描线程的CPU和I/O优先级
+
+    先按大小分组（大小唯一的文件不可能重复，无需计算MD5），再按可释放空间从大到小计算MD5，
+    返回的重复组也按此顺序排列。time_budget（秒）用完后停止计算，返回已确认的部分结果；
+    每确认一组重复文件即调用 group_callback(md5, paths, wasted_size)；
+    每计算出一个文件的MD5即调用 hash_callback(path, md5)（包括未重复的文件，外部排序模式不调用），用于写入内容索引
+    memory_limit（字节）不为None时使用外部排序模式，扫描过程的内存占用不随文件数增长：
+    重复组只逐组交给 group_callback（必须提供），不在内存中汇总，返回的重复组字典为空。
+    目录合并需要在内存中保存全部文件摘要，不能与外部排序模式同时使用
+    """
+    if low_priority:
+        lower_io_priority()
+
+    if memory_limit and collapse_dirs:
+        raise ValueError("外部排序模式（memory_limit）不支持目录合并（collapse_dirs），请关闭其中一项")
+    if memory_limit:
+        if group_callback is None:
+            raise ValueError("外部排序模式需要 group_callback 逐组接收重复文件")
+        groups = iter_duplicates_external(directory, memory_limit, throttle)
+        try:
+            while True:
+                md5_hash, paths, size = next(groups)
+                group_callback(md5_hash, paths, size * (len(paths) - 1))
+        except StopIteration as stop:
+            total_files = stop.value
+        return {}, total_files, total_files
+
+    deadline = time.monotonic() + time_budget if time_budget else None
+    size_groups = defaultdict(list)
+    total_files = 0
+
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            total_files += 1
+            file_path = os.path.join(root, file)
+            try:
+                size_groups[os.path.getsize(file_path)].append(file_path)
+            except OSError:
+                continue
+
+    # 大小唯一的文件直接视为已处理
+    processed_files = sum(len(paths) for paths in size_groups.values() if len(paths) == 1)
+    duplicates = {}
+    file_hashes = {}
+
+    for size, paths in iter_waste_first(size_groups):
+        if deadline and time.monotonic() > deadline:
+            break
+        file_dict = defaultdict(list)
+        for file_path in paths:
+            md5_hash = calculate_md5(file_path, throttle)
+            if md5_hash:
+                file_dict[md5_hash].append(file_path)
+                file_hashes[file_path] = md5_hash
+                if hash_callback:
+                    hash_callback(file_path, md5_hash)
+            processed_files += 1
+
+        # 找出重复的文件（MD5相同的文件组，且数量大于1）
+        for md5_hash, md5_paths in file_dict.items():
+            if len(md5_paths) > 1:
+                duplicates[md5_hash] = md5_paths
+                if group_callback:
+                    group_callback(md5_hash, md5_paths, size * (len(md5_paths) - 1))
+
+    # 目录合并模式：用已计算的文件摘要（同样经过大小预筛选、按可释放空间排序和时间预算）计算目录Merkle哈希，
+    # 完全相同的目录树取代其中的文件组；group_callback 报告的是合并前确认的文件组
+    if collapse_dirs:
+        duplicates = collapse_duplicate_dirs(file_hashes, build_merkle_tree(directory, file_hashes), directory)
+
+    return duplicates, total_files, processed_files
+
+
+def scan_against_reference(reference_dir, target_dir, throttle=None, low_priority=False):
+    """
+    参照比对模式：找出目标目录中内容已存在于参照目录的文件（可安全删除）
+
+    先只读取参照目录的文件大小建立索引，再遍历目标目录；只有大小在参照目录中出现过的目标文件才计算MD5，
+    参照目录一侧也只计算这些大小的文件，且某个大小下的目标摘要全部找到后即停止。
+    返回 (matches, total_files, hashed_files)，matches为 {md5: [参照文件, 目标文件, ...]}，每组第一项为参照文件
+    """
+    if low_priority:
+        lower_io_priority()
+
+    # 两个目录互相包含时，遍历一方要跳过另一方的子树，否则文件会和自己匹配（唯一的副本被当作重复删除）
+    reference_real = os.path.realpath(reference_dir)
+    target_real = os.path.realpath(target_dir)
+    if reference_real == target_real:
+        raise ValueError("参照目录与扫描目录不能相同")
+
+    reference_sizes = defaultdict(list)
+    for root, dirs, files in os.walk(reference_dir):
+        dirs[:] = [d for d in dirs if os.path.realpath(os.path.join(root, d)) != target_real]
+        for file in files:
+            file_path = os.path.join(root, file)
+            try:
+                reference_sizes[os.path.getsize(file_path)].append(file_path)
+            except OSError:
+                continue
+
+    candidates = defaultdict(list)
+    total_files = 0
+    for root, dirs, files in os.walk(target_dir):
+        dirs[:] = [d for d in dirs if os.path.realpath(os.path.join(root, d)) != reference_real]
+        for file in files:
+            total_files += 1
+            file_path = os.path.join(root, file)
+            try:
+                size = os.path.getsize(file_path)
+            except OSError:
+                continue
+            if size in reference_sizes:
+                candidates[size].append(file_path)
+
+    matches = {}
+    hashed_files = 0
+    for size, target_paths in candidates.items():
+        # 经符号链接等途径指向参照文件本身的目标路径不能作为可删除项
+        reference_files = {os.path.realpath(path) for path in reference_sizes[size]}
+        target_paths = [path for path in target_paths if os.path.realpath(path) not in reference_files]
+        target_hashes = defaultdict(list)
+        for file_path in target_paths:
+            md5_hash = calculate_md5(file_path, throttle)
+            hashed_files += 1
+            if md5_hash:
+                target_hashes[md5_hash].append(file_path)
+
+        for reference_path in sorted(reference_sizes[size], key=lambda x: (len(x), x)):
+            md5_hash = calculate_md5(reference_path, throttle)
+            hashed_files += 1
+            if md5_hash in target_hashes and md5_hash not in matches:
+                matches[md5_hash] = [reference_path] + target_hashes[md5_hash]
+                if all(h in matches for h in target_hashes):
+                    break
+
+    return matches, total_files, hashed_files
+
+
+def write_index_shard(directory, shard_path, host=None, throttle=None, low_priority=False,
+                      memory_limit=DEFAULT_SORT_MEMORY_LIMIT):
+    """
+    扫描本机目录，输出按 (size, md5, host, path) 排序的索引分片，供多台机器的结果归并去重
+
+    记录经外部排序器排序，内存占用不超过memory_limit。返回写入的记录数
+    """
+    if low_priority:
+        lower_io_priority()
+    host = host or socket.gethostname()
+
+    with ExternalSorter(memory_limit) as sorter:
+        for root, dirs, files in os.walk(directory):
+            for file in files:
+                file_path = os.path.join(root, file)
+                try:
+                    size = os.path.getsize(file_path)
+                except OSError:
+                    continue
+                md5_hash = calculate_md5(file_path, throttle)
+                if md5_hash:
+                    sorter.add((size, md5_hash, host, file_path))
+
+        # 先写临时文件再替换，避免归并时读到写了一半的分片
+        temp_path = shard_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8", errors="surrogateescape") as f:
+            f.write(json.dumps({"format": SHARD_FORMAT, "host": host, "root": directory}, ensure_ascii=False) + "\n")
+            for record in sorter:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(temp_path, shard_path)
+        return sorter.count
+
+
+def read_index_shard(shard_path):
+    """按顺序逐条读取索引分片记录（流式，不整体加载）"""
+    with open(shard_path, "r", encoding="utf-8", errors="surrogateescape") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != SHARD_FORMAT:
+            raise ValueError(f"不是有效的索引分片文件：{shard_path}")
+        for line in f:
+            size, md5_hash, host, file_path = json.loads(line)
+            yield size, md5_hash, host, file_path
+
+
+def merge_index_shards(shard_paths, cross_node_only=False):
+    """
+    k路归并多个已排序的索引分片，逐组产出重复文件
+
+    内存占用只与分片数量和当前重复组大小有关，与总文件数无关。
+    产出 (size, md5, [(host, path), ...])；cross_node_only为True时只产出跨多台机器的重复组
+    """
+    current_key = None
+    locations = []
+    for size, md5_hash, host, file_path in heapq.merge(*(read_index_shard(p) for p in shard_paths)):
+        if (size, md5_hash) != current_key:
+            if len(locations) > 1 and (not cross_node_only or len({h for h, _ in locations}) > 1):
+                yield current_key[0], current_key[1], locations
+            current_key = (size, md5_hash)
+            locations = []
+        locations.append((host, file_path))
+    if len(locations) > 1 and (not cross_node_only or len({h for h, _ in locations}) > 1):
+        yield current_key[0], current_key[1], locations
+
+
+def _mount_point(path):
+    mount_point = os.path.abspath(path)
+    while not os.path.ismount(mount_point):
+        parent = os.path.dirname(mount_point)
+        if parent == mount_point:
+            break
+        mount_point = parent
+    return mount_point
+
+
+def _usable_quarantine_dir(parent, device):
+    """parent 与文件在同一设备上、且可以在其中创建隔离目录时返回隔离目录路径"""
+    quarantine_dir = os.path.join(parent, QUARANTINE_DIR_NAME)
+    try:
+        if os.stat(parent).st_dev != device:
+            return None
+        os.makedirs(quarantine_dir, exist_ok=True)
+    except OSError:
+        return None
+    return quarantine_dir if os.access(quarantine_dir, os.W_OK | os.X_OK) else None
+
+
+def get_quarantine_dir(path):
+    """
+    返回path所在文件系统上可写的隔离目录（与文件在同一设备上，保证os.rename不跨设备）
+
+    依次尝试挂载点/盘符根目录、用户主目录，以及从上到下的各级上级目录（普通用户通常不能写 / 这样的根目录），
+    都不可用时返回None
+    """
+    path = os.path.abspath(path)
+    try:
+        device = os.lstat(path).st_dev
+    except OSError:
+        return None
+    mount_point = _mount_point(path)
+    candidates = [mount_point, os.path.expanduser("~")]
+    ancestors = []
+    parent = os.path.dirname(path)
+    while parent != mount_point and os.path.dirname(parent) != parent:
+        ancestors.append(parent)
+        parent = os.path.dirname(parent)
+    candidates.extend(reversed(ancestors))
+    for candidate in candidates:
+        quarantine_dir = _usable_quarantine_dir(candidate, device)
+        if quarantine_dir:
+            return quarantine_dir
+    return None
+
+
+def _append_journal(journal_path, record):
+    """向隔离日志追加一条记录并落盘"""
+    with open(journal_path, "a", encoding="utf-8", errors="surrogateescape") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def quarantine_files(paths, journal_path=DEFAULT_JOURNAL_PATH):
+    """
+    把文件（或重复文件夹）改名移入所在文件系统的隔离目录，代替永久删除
+
+    只做os.rename，不复制数据，耗时与文件大小无关。整批移动计划先写入日志再执行，
+    中途中断也能按日志恢复。返回 (batch_id, moved, failed)，failed为 [(path, 错误信息), ...]
+    某个文件所在的文件系统上找不到可写的隔离目录时抛出PermissionError，不移动任何文件
+    """
+    batch_id = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:8]
+    moves = []
+    quarantine_dirs = {}
+    for index, path in enumerate(paths):
+        path = os.path.abspath(path)
+        # 同一目录下的文件共用一次查找结果
+        parent = os.path.dirname(path)
+        if parent not in quarantine_dirs:
+            quarantine_dirs[parent] = get_quarantine_dir(path)
+        if quarantine_dirs[parent] is None:
+            if not os.path.lexists(path):
+                continue
+            raise PermissionError(f"无法在 {path} 所在的磁盘上创建隔离目录（没有写权限）")
+        batch_dir = os.path.join(quarantine_dirs[parent], batch_id)
+        moves.append((path, os.path.join(batch_dir, f"{index}_{os.path.basename(path)}")))
+
+    _append_journal(journal_path, {"action": "quarantine", "batch": batch_id, "time": time.time(), "moves": moves})
+
+    moved = []
+    failed = []
+    for path, dest in moves:
+        try:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.rename(path, dest)
+            moved.append(path)
+        except OSError as e:
+            failed.append((path, str(e)))
+    return batch_id, moved, failed
+
+
+def load_quarantine_batches(journal_path=DEFAULT_JOURNAL_PATH):
+    """重放隔离日志，返回尚未恢复或清除的批次列表（按时间先后）"""
+    batches = {}
+    if not os.path.exists(journal_path):
+        return []
+    with open(journal_path, "r", encoding="utf-8", errors="surrogateescape") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # 忽略写了一半的末行
+            if record.get("action") == "quarantine":
+                batches[record["batch"]] = record
+            else:
+                batches.pop(record.get("batch"), None)
+    return list(batches.values())
+
+
+def restore_batch(batch_id, journal_path=DEFAULT_JOURNAL_PATH):
+    """把一个隔离批次整体恢复到原位置，返回 (restored, failed)"""
+    batch = next((b for b in load_quarantine_batches(journal_path) if b["batch"] == batch_id), None)
+    if batch is None:
+        raise ValueError(f"隔离批次不存在或已处理：{batch_id}")
+
+    restored = []
+    failed = []
+    for path, dest in batch["moves"]:
+        if not os.path.lexists(dest):
+            continue  # 隔离时就未能移动成功
+        if os.path.lexists(path):
+            failed.append((path, "原位置已存在同名文件"))
+            continue
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.rename(dest, path)
+            restored.append(path)
+        except OSError as e:
+            failed.append((path, str(e)))
+
+    # 有失败项时保留批次，便于处理冲突后再次恢复
+    if not failed:
+        _remove_batch_dirs(batch)
+        _append_journal(journal_path, {"action": "restore", "batch": batch_id, "time": time.time()})
+    return restored, failed
+
+
+def _remove_batch_dirs(batch):
+    """删除批次在各文件系统上的隔离目录"""
+    for batch_dir in {os.path.dirname(dest) for path, dest in batch["moves"]}:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+
+
+def purge_quarantine(older_than_days=QUARANTINE_RETENTION_DAYS, journal_path=DEFAULT_JOURNAL_PATH):
+    """永久删除超过保留期的隔离批次，返回 (清除的批次数, 释放的字节数)"""
+    cutoff = time.time() - older_than_days * 86400
+    purged_batches = 0
+    freed_size = 0
+    for batch in load_quarantine_batches(journal_path):
+        if batch["time"] > cutoff:
+            continue
+        for path, dest in batch["moves"]:
+            try:
+                freed_size += get_tree_size(dest)
+            except OSError:
+                continue
+        _remove_batch_dirs(batch)
+        _append_journal(journal_path, {"action": "purge", "batch": batch["batch"], "time": time.time()})
+        purged_batches += 1
+    return purged_batches, freed_size
+
+
+def calculate_dhash(file_path, hash_size=8, throttle=None):
+    """计算图片的差值感知哈希（dHash，hash_size×hash_size位），缩放、重新编码后哈希基本不变；传入throttle时按文件大小计入限速"""
+    try:
+        if throttle:
+            throttle.consume(os.path.getsize(file_path))
+        with Image.open(file_path) as img:
+            # JPEG可在解码阶段直接降采样，大图解码速度提升数十倍
+            img.draft("L", (hash_size * 4, hash_size * 4))
+            pixels = list(img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR).getdata())
+    except Exception:
+        return None
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a, b):
+    """两个整数哈希的汉明距离"""
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """
+    按汉明距离组织的BK树，用于在大量感知哈希中查找距离不超过阈值的邻居
+
+    每次查询只需访问与目标距离满足三角不等式的子树，避免全量两两比较
+    """
+
+    def __init__(self):
+        self.root = None  # 节点结构：[hash, [items], {distance: child}]
+
+    def add(self, value, item):
+        """插入一个哈希及其对应的条目（哈希相同的条目放在同一节点）"""
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """返回与value距离不超过max_distance的所有条目"""
+        results = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= max_distance:
+                results.extend(node[1])
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return results
+
+
+class MultiIndexHash:
+    """
+    64位哈希的多索引（multi-index hashing）近邻查找，需要NumPy
+
+    把哈希切成 MIH_BLOCKS 段16位：两个哈希距离不超过d时，至少有一段的距离不超过 d // MIH_BLOCKS（鸽巢原理），
+    因此只需在每段的桶里查找该段翻转不超过 d // MIH_BLOCKS 位的键，候选再整批异或、popcount 校验。
+    每段按键排序后用桶边界数组定位，查询时所有段、所有翻转键的桶一次拼接，不逐个候选循环
+    """
+
+    def __init__(self, hashes, max_distance):
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+        self.max_distance = max_distance
+        count = len(self.hashes)
+        block_radius = max_distance // MIH_BLOCKS
+        # 每段要查找的翻转掩码：16位中翻转不超过block_radius位
+        masks = [0]
+        for flips in range(1, block_radius + 1):
+            masks.extend(sum(1 << bit for bit in bits) for bits in itertools.combinations(range(16), flips))
+        self.masks = np.array(masks, dtype=np.int64)
+        # 各段按段值排序后拼接成一个数组，starts[段][键] 为该键的桶在拼接数组中的起点
+        self.orders = np.empty(MIH_BLOCKS * count, dtype=np.int64)
+        self.starts = np.empty((MIH_BLOCKS, 65537), dtype=np.int64)
+        for block in range(MIH_BLOCKS):
+            keys = self._block_keys(self.hashes, block)
+            order = np.argsort(keys, kind="stable")
+            self.orders[block * count:(block + 1) * count] = order
+            self.starts[block] = np.searchsorted(keys[order], np.arange(65537)) + block * count
+
+    @staticmethod
+    def _block_keys(values, block):
+        return ((values >> np.uint64(16 * block)) & np.uint64(0xFFFF)).astype(np.int64)
+
+    def search(self, index, exclude=None):
+        """返回与第index个哈希距离不超过max_distance的全部编号（含自身），exclude为布尔数组时跳过其中为True的编号"""
+        value = self.hashes[index]
+        keys = (self._block_keys(value, np.arange(MIH_BLOCKS))[:, None] ^ self.masks).ravel()
+        blocks = np.repeat(np.arange(MIH_BLOCKS), len(self.masks))
+        lo = self.starts[blocks, keys]
+        lengths = self.starts[blocks, keys + 1] - lo
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        # 把所有桶区间拼成一个下标数组
+        offsets = np.repeat(lo - (np.cumsum(lengths) - lengths), lengths)
+        candidates = self.orders[np.arange(total) + offsets]
+        if exclude is not None:
+            candidates = candidates[~exclude[candidates]]
+        distances = np.bitwise_count(self.hashes[candidates] ^ value)
+        return np.unique(candidates[distances <= self.max_distance])
+
+
+def _hash_image(file_path, throttle, low_priority):
+    """线程池任务：计算一张图片的dHash；low_priority为True时先降低该工作线程的优先级（同一线程重复调用无副作用）"""
+    if low_priority:
+        lower_io_priority()
+    return calculate_dhash(file_path, throttle=throttle)
+
+
+def find_similar_images(directory, max_distance=DEFAULT_SIMILAR_DISTANCE, workers=None, throttle=None,
+                        low_priority=False):
+    """
+    查找目录下的相似图片（缩放、重新压缩后的同一张照片）
+
+    多线程计算dHash（Pillow解码时释放GIL），再查找阈值内的邻居分组：有NumPy时用多索引哈希整批校验候选
+    （百万张图片的查找在分钟级完成），否则退回BK树。
+    throttle为IOThrottle实例时读取图片计入限速；low_priority为True时降低扫描线程和各工作线程的CPU和I/O优先级。
+    返回 (groups, total_images, processed_images)，groups为 {"similar:<哈希>": [路径, ...]}，
+    组内按文件大小从大到小排列，第一项为保留的图片（通常是画质最好的原图），其余每一项与它的距离都不超过max_distance
+    """
+    if Image is None:
+        raise RuntimeError("相似图片检测需要安装Pillow：pip install Pillow")
+    if low_priority:
+        lower_io_priority()
+
+    image_paths = []
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            if os.path.splitext(file)[1].lower() in IMAGE_EXTENSIONS:
+                image_paths.append(os.path.join(root, file))
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        hashes = list(executor.map(_hash_image, image_paths, itertools.repeat(throttle),
+                                   itertools.repeat(low_priority)))
+
+    # 以保留的图片为中心分组：按文件大小从大到小，尚未分组的图片成为代表（即保留项），
+    # 只把与代表本身距离不超过阈值的图片归入该组。不做传递闭包，避免 A~B、B~C 但 A与C不相似时连成一组
+    sizes = []
+    for path in image_paths:
+        try:
+            sizes.append(os.path.getsize(path))
+        except OSError:
+            sizes.append(0)
+
+    hashed = [i for i, value in enumerate(hashes) if value is not None]
+    values = [hashes[i] for i in hashed]
+    if np is not None and hasattr(np, "bitwise_count"):
+        index = MultiIndexHash(values, max_distance)
+        assigned = np.zeros(len(values), dtype=bool)
+
+        def search(position):
+            return index.search(position, assigned).tolist()
+    else:
+        tree = BKTree()
+        for position, value in enumerate(values):
+            tree.add(value, position)
+        assigned = [False] * len(values)
+
+        def search(position):
+            return [i for i in tree.search(values[position], max_distance) if not assigned[i]]
+
+    groups = {}
+    for position in sorted(range(len(values)), key=lambda position: -sizes[hashed[position]]):
+        if assigned[position]:
+            continue
+        assigned[position] = True
+        members = [i for i in search(position) if i != position]
+        if not members:
+            continue
+        for i in members:
+            assigned[i] = True
+        members.sort(key=lambda i: -sizes[hashed[i]])
+        groups[f"similar:{values[position]:016x}"] = [image_paths[hashed[position]]] + [image_paths[hashed[i]] for i in members]
+
+    return groups, len(image_paths), len(values)
+
+
+def _gear_cut_candidates(data, history):
+    """
+    计算data中每个字节位置的Gear哈希，返回满足切点条件的位置列表（位置为该字节之后的偏移）
+
+    Gear哈希 h = (h << 1) + G[b] 只取决于最近64个字节，history为上一段末尾最多63个字节，
+    因此分段计算与整文件逐字节计算得到的切点完全一致
+    """
+    if np is not None:
+        table = np.array(GEAR_TABLE, dtype=np.uint64)
+        gear = np.concatenate((
+            np.zeros(63 - len(history), dtype=np.uint64),
+            table[np.frombuffer(history + data, dtype=np.uint8)]
+        ))
+        # 倍增求和：第m轮后每个位置包含最近2m个字节的贡献，6轮即覆盖64字节窗口
+        h = gear
+        for m in (1, 2, 4, 8, 16, 32):
+            shifted = np.zeros_like(h)
+            shifted[m:] = h[:-m] << np.uint64(m)
+            h = h + shifted
+        return (np.flatnonzero(h[63:] & np.uint64(CDC_MASK) == 0) + 1).tolist()
+
+    h = 0
+    for b in history:
+        h = ((h << 1) + GEAR_TABLE[b]) & 0xFFFFFFFFFFFFFFFF
+    candidates = []
+    for i, b in enumerate(data):
+        h = ((h << 1) + GEAR_TABLE[b]) & 0xFFFFFFFFFFFFFFFF
+        if not h & CDC_MASK:
+            candidates.append(i + 1)
+    return candidates
+
+
+def iter_chunks(file_path, throttle=None):
+    """按内容定义分块读取文件，逐块产出 (md5摘要bytes, 块大小)"""
+    with open(file_path, "rb") as f:
+        pending = b""
+        history = b""
+        while True:
+            data = f.read(CDC_READ_SIZE)
+            if throttle and data:
+                throttle.consume(len(data))
+            if not data:
+                break
+            base = len(pending)
+            buffer = pending + data
+            start = 0
+            for position in _gear_cut_candidates(data, history):
+                cut = base + position
+                # 跳过距离上个切点不足最小块大小的候选，超过最大块大小时强制切分
+                while cut - start > CDC_MAX_CHUNK:
+                    yield hashlib.md5(buffer[start:start + CDC_MAX_CHUNK]).digest(), CDC_MAX_CHUNK
+                    start += CDC_MAX_CHUNK
+                if cut - start >= CDC_MIN_CHUNK:
+                    yield hashlib.md5(buffer[start:cut]).digest(), cut - start
+                    start = cut
+            while len(buffer) - start > CDC_MAX_CHUNK:
+                yield hashlib.md5(buffer[start:start + CDC_MAX_CHUNK]).digest(), CDC_MAX_CHUNK
+                start += CDC_MAX_CHUNK
+            pending = buffer[start:]
+            history = (history + data)[-63:]
+        if pending:
+            yield hashlib.md5(pending).digest(), len(pending)
+
+
+def analyze_chunk_dedup(directory, min_file_size=CDC_MIN_FILE_SIZE, partitions=256, max_pair_fanout=32,
+                        top_n=100, throttle=None, progress_callback=None):
+    """
+    块级去重分析：估算启用文件系统块级去重后可节省的空间
+
+    对大于min_file_size的文件做内容定义分块，块记录按摘要首字节分区写入临时文件，
+    再逐个分区在内存中统计，内存占用约为 总块数/partitions，与数据总量无关。
+    同一内容块的第一次出现计为唯一数据，其余出现计为可节省空间，并记到所在目录；
+    同一块出现在不超过max_pair_fanout个文件中时，计入这些文件两两之间的共享字节数；
+    文件对记录同样按文件对分区落盘，逐个分区汇总后只在大小为top_n的堆中保留共享最多的文件对。
+
+    返回 {'total_size', 'unique_size', 'saved_size', 'file_count', 'by_directory': [(目录, 可节省字节)],
+          'top_pairs': [(文件A, 文件B, 共享字节)]}
+    """
+    file_paths = []
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            file_path = os.path.join(root, file)
+            try:
+                if os.path.getsize(file_path) >= min_file_size and not os.path.islink(file_path):
+                    file_paths.append(file_path)
+            except OSError:
+                continue
+
+    total_size = 0
+    with tempfile.TemporaryDirectory(prefix="dedup_chunks_") as temp_dir:
+        partition_files = [open(os.path.join(temp_dir, f"{i}.bin"), "wb") for i in range(partitions)]
+        try:
+            for file_id, file_path in enumerate(file_paths):
+                if progress_callback:
+                    progress_callback(file_path, file_id + 1, len(file_paths))
+                try:
+                    for digest, size in iter_chunks(file_path, throttle):
+                        partition_files[digest[0] % partitions].write(CHUNK_RECORD.pack(digest, file_id, size))
+                        total_size += size
+                except OSError:
+                    continue
+        finally:
+            for f in partition_files:
+                f.close()
+
+        unique_size = 0
+        dir_saved = defaultdict(int)
+        pair_files = [open(os.path.join(temp_dir, f"pair_{i}.bin"), "wb") for i in range(partitions)]
+        try:
+            for i in range(partitions):
+                chunk_files = defaultdict(list)
+                with open(os.path.join(temp_dir, f"{i}.bin"), "rb") as f:
+                    for digest, file_id, size in CHUNK_RECORD.iter_unpack(f.read()):
+                        chunk_files[(digest, size)].append(file_id)
+
+                for (digest, size), file_ids in chunk_files.items():
+                    unique_size += size
+                    for file_id in file_ids[1:]:
+                        dir_saved[os.path.dirname(file_paths[file_id])] += size
+                    distinct = sorted(set(file_ids))
+                    if 1 < len(distinct) <= max_pair_fanout:
+                        for a in range(len(distinct)):
+                            for b in range(a + 1, len(distinct)):
+                                pair_files[(distinct[a] * 31 + distinct[b]) % partitions].write(
+                                    PAIR_RECORD.pack(distinct[a], distinct[b], size))
+        finally:
+            for f in pair_files:
+                f.close()
+
+        # 同一文件对的记录都在同一分区，逐个分区汇总，堆中只保留top_n个
+        top_pairs = []
+        for i in range(partitions):
+            pair_shared = defaultdict(int)
+            with open(os.path.join(temp_dir, f"pair_{i}.bin"), "rb") as f:
+                for a, b, size in PAIR_RECORD.iter_unpack(f.read()):
+                    pair_shared[(a, b)] += size
+            for pair, shared in pair_shared.items():
+                if len(top_pairs) < top_n:
+                    heapq.heappush(top_pairs, (shared, pair))
+                elif top_pairs and shared > top_pairs[0][0]:
+                    heapq.heapreplace(top_pairs, (shared, pair))
+        top_pairs = [(pair, shared) for shared, pair in sorted(top_pairs, reverse=True)]
+    return {
+        'total_size': total_size,
+        'unique_size': unique_size,
+        'saved_size': total_size - unique_size,
+        'file_count': len(file_paths),
+        'by_directory': sorted(dir_saved.items(), key=lambda item: -item[1])[:top_n],
+        'top_pairs': [(file_paths[a], file_paths[b], shared) for (a, b), shared in top_pairs],
+    }
+
+
+def calculate_sampled_fingerprint(file_path, size, throttle=None):
+    """读取固定位置的少量数据块计算抽样指纹（含文件大小），只需几次随机读取"""
+    hash_md5 = hashlib.md5(str(size).encode())
+    try:
+        with open(file_path, "rb") as f:
+            if size <= SAMPLE_BLOCK_SIZE * len(SAMPLE_POSITIONS):
+                data = f.read()
+                if throttle:
+                    throttle.consume(len(data))
+                hash_md5.update(data)
+            else:
+                for position in SAMPLE_POSITIONS:
+                    f.seek(int((size - SAMPLE_BLOCK_SIZE) * position))
+                    data = f.read(SAMPLE_BLOCK_SIZE)
+                    if throttle:
+                        throttle.consume(len(data))
+                    hash_md5.update(data)
+        return hash_md5.hexdigest()
+    except Exception:
+        return None
+
+
+def scan_files_sampled(directory, throttle=None):
+    """
+    快速抽样模式：同大小文件只比较抽样指纹，几秒内给出疑似重复组
+
+    返回 (groups, confidence, total_files, processed_files)，groups为 {"sampled:<指纹>": [路径, ...]}，
+    confidence为 {组键: CONFIDENCE_EXACT 或 CONFIDENCE_SAMPLED}——小文件被完整读取，结果是确定的；
+    大文件只是抽样匹配，删除前必须用 verify_duplicate_group 做完整校验
+    """
+    size_groups = defaultdict(list)
+    total_files = 0
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            total_files += 1
+            file_path = os.path.join(root, file)
+            try:
+                size_groups[os.path.getsize(file_path)].append(file_path)
+            except OSError:
+                continue
+
+    groups = {}
+    confidence = {}
+    processed_files = 0
+    for size, paths in iter_waste_first(size_groups):
+        fingerprint_dict = defaultdict(list)
+        for file_path in paths:
+            fingerprint = calculate_sampled_fingerprint(file_path, size, throttle)
+            processed_files += 1
+            if fingerprint:
+                fingerprint_dict[fingerprint].append(file_path)
+        for fingerprint, fingerprint_paths in fingerprint_dict.items():
+            if len(fingerprint_paths) > 1:
+                key = f"sampled:{fingerprint}"
+                groups[key] = fingerprint_paths
+                confidence[key] = (CONFIDENCE_EXACT if size <= SAMPLE_BLOCK_SIZE * len(SAMPLE_POSITIONS)
+                                   else CONFIDENCE_SAMPLED)
+
+    return groups, confidence, total_files, processed_files
+
+
+def verify_duplicate_group(keep_file, paths, throttle=None):
+    """
+    完整校验：计算保留文件和候选文件的完整MD5，返回与保留文件内容确实相同的候选路径列表
+
+    用于抽样模式下删除前的确认，保留文件无法读取时返回空列表
+    """
+    keep_hash = calculate_md5(keep_file, throttle)
+    if not keep_hash:
+        return []
+    return [path for path in paths if calculate_md5(path, throttle) == keep_hash]
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+@Description :  脚本： 文件去重工具 - 多机分片扫描与归并、超大目录外部排序查重（命令行版本）
+
+用法：
+    # 在每台文件服务器上扫描本地目录，生成索引分片
+    python dedup_shard.py scan D:\\share -o node1.shard
+    # 在汇总机器上归并所有分片，输出跨机器重复组（每行一个JSON）
+    python dedup_shard.py merge node1.shard node2.shard node3.shard -o duplicates.jsonl --cross-node-only
+
+本地测试时可以启动多个进程模拟多台机器（用 --host 指定节点名）：
+    python dedup_shard.py scan dirA --host node1 -o node1.shard & python dedup_shard.py scan dirB --host node2 -o node2.shard
+
+单机上亿文件时使用外部排序模式查重，内存占用不超过 --memory-limit（MB）：
+    python dedup_shard.py find D:\\share -o duplicates.jsonl --memory-limit 512
+
+@Author : sundi
+@Created  : 2026/10/19
+"""
+
+import argparse
+import json
+import sys
+from dedup_engine import write_index_shard, merge_index_shards, iter_duplicates_external, IOThrottle
+
+
+def cmd_scan(args):
+    """扫描本地目录并写出索引分片"""
+    throttle = None
+    if args.max_mbps or args.max_iops:
+        throttle = IOThrottle(mb_per_sec=args.max_mbps, iops=args.max_iops)
+    count = write_index_shard(
+        args.directory,
+        args.output,
+        host=args.host,
+        throttle=throttle,
+        low_priority=args.low_priority,
+        memory_limit=args.memory_limit * 1024 * 1024
+    )
+    print(f"已写入 {count} 条记录到 {args.output}", file=sys.stderr)
+
+
+def cmd_merge(args):
+    """归并多个索引分片并输出重复组"""
+    out = open(args.output, "w", encoding="utf-8", errors="surrogateescape") if args.output else sys.stdout
+    group_count = 0
+    wasted_size = 0
+    try:
+        for size, md5_hash, locations in merge_index_shards(args.shards, cross_node_only=args.cross_node_only):
+            out.write(json.dumps({
+                "size": size,
+                "md5": md5_hash,
+                "locations": [{"host": host, "path": path} for host, path in locations]
+            }, ensure_ascii=False) + "\n")
+            group_count += 1
+            wasted_size += size * (len(locations) - 1)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"共找到 {group_count} 组重复文件，可释放 {wasted_size} 字节", file=sys.stderr)
+
+
+def cmd_find(args):
+    """外部排序模式查找单机目录中的重复文件"""
+    throttle = None
+    if args.max_mbps or args.max_iops:
+        throttle = IOThrottle(mb_per_sec=args.max_mbps, iops=args.max_iops)
+    out = open(args.output, "w", encoding="utf-8", errors="surrogateescape") if args.output else sys.stdout
+    group_count = 0
+    wasted_size = 0
+    try:
+        for md5_hash, paths, size in iter_duplicates_external(args.directory, args.memory_limit * 1024 * 1024, throttle):
+            out.write(json.dumps({"size": size, "md5": md5_hash, "paths": paths}, ensure_ascii=False) + "\n")
+            group_count += 1
+            wasted_size += size * (len(paths) - 1)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"共找到 {group_count} 组重复文件，可释放 {wasted_size} 字节", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="文件去重工具 - 多机分片扫描与归并")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    scan_parser = subparsers.add_parser("scan", help="扫描本地目录，生成排序后的索引分片")
+    scan_parser.add_argument("directory", help="要扫描的目录")
+    scan_parser.add_argument("-o", "--output", required=True, help="分片输出路径")
+    scan_parser.add_argument("--host", help="节点名（默认使用本机主机名）")
+    scan_parser.add_argument("--max-mbps", type=float, default=0, help="读取吞吐上限（MB/s），0表示不限")
+    scan_parser.add_argument("--max-iops", type=float, default=0, help="读取IOPS上限，0表示不限")
+    scan_parser.add_argument("--low-priority", action="store_true", help="降低扫描进程的CPU和I/O优先级")
+    scan_parser.add_argument("--memory-limit", type=int, default=256, help="排序内存上限（MB）")
+    scan_parser.set_defaults(func=cmd_scan)
+
+    merge_parser = subparsers.add_parser("merge", help="k路归并多个分片，输出重复组")
+    merge_parser.add_argument("shards", nargs="+", help="索引分片文件")
+    merge_parser.add_argument("-o", "--output", help="输出文件（默认标准输出）")
+    merge_parser.add_argument("--cross-node-only", action="store_true", help="只输出跨多台机器的重复组")
+    merge_parser.set_defaults(func=cmd_merge)
+
+    find_parser = subparsers.add_parser("find", help="外部排序模式查找单机重复文件（内存占用有上限）")
+    find_parser.add_argument("directory", help="要扫描的目录")
+    find_parser.add_argument("-o", "--output", help="输出文件（默认标准输出）")
+    find_parser.add_argument("--memory-limit", type=int, default=256, help="排序内存上限（MB）")
+    find_parser.add_argument("--max-mbps", type=float, default=0, help="读取吞吐上限（MB/s），0表示不限")
+    find_parser.add_argument("--max-iops", type=float, default=0, help="读取IOPS上限，0表示不限")
+    find_parser.set_defaults(func=cmd_find)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
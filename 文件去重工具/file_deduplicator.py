@@ -11,44 +11,14 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import os
 import threading
-import hashlib
-from collections import defaultdict
-
-
-def calculate_md5(file_path):
-    """计算文件的MD5值"""
-    hash_md5 = hashlib.md5()
-    try:
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
-    except Exception as e:
-        return None
-
-
-def scan_files(directory):
-    """扫描目录下所有文件并计算MD5"""
-    file_dict = defaultdict(list)
-    total_files = 0
-    processed_files = 0
-    
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            total_files += 1
-            file_path = os.path.join(root, file)
-            try:
-                md5_hash = calculate_md5(file_path)
-                if md5_hash:
-                    file_dict[md5_hash].append(file_path)
-                processed_files += 1
-            except Exception as e:
-                continue
-    
-    # 找出重复的文件（MD5相同的文件组，且数量大于1）
-    duplicates = {md5: paths for md5, paths in file_dict.items() if len(paths) > 1}
-    
-    return duplicates, total_files, processed_files
+import shutil
+from dedup_engine import (
+    scan_files, scan_against_reference, find_similar_images, analyze_chunk_dedup, get_tree_size, IOThrottle,
+    scan_files_sampled, verify_duplicate_group, CONFIDENCE_EXACT,
+    quarantine_files, load_quarantine_batches, restore_batch, purge_quarantine,
+    QUARANTINE_RETENTION_DAYS, DEFAULT_SIMILAR_DISTANCE
+)
+from content_index import ContentIndex
 
 
 class FileDeduplicator:
@@ -62,6 +32,13 @@ class FileDeduplicator:
         self.duplicates = {}  # {md5: [file_paths]}
         self.duplicate_items = []  # 存储所有重复文件项 [(md5, file_path, group_index), ...]
         self.keep_files = {}  # {md5: keep_file_path} 每个重复组保留的文件
+        self.reference_mode = False  # 参照比对模式：每组第一项为参照文件，固定保留
+        self.similar_mode = False  # 相似图片模式：每组第一项为最大的图片，固定保留
+        self.sampled_mode = False  # 快速抽样模式：结果为近似值，删除前需完整校验
+        self.group_confidence = {}  # {组键: 置信度} 抽样模式下每组的可信程度
+
+        # I/O限速器（扫描过程中调整限速值会立即生效）
+        self.throttle = IOThrottle()
         
         # 设置窗口居中
         self.center_window()
@@ -69,6 +46,9 @@ class FileDeduplicator:
         # 创建界面
         self.create_widgets()
 
+        # 后台清除超过保留期的隔离文件
+        threading.Thread(target=self.purge_expired_quarantine, daemon=True).start()
+
     def center_window(self):
         """窗口居中显示"""
         self.root.update_idletasks()
@@ -143,6 +123,127 @@ class FileDeduplicator:
         )
         browse_button.grid(row=0, column=1, sticky=tk.W)
 
+        # 参照文件夹（可选）：填写后只查找扫描文件夹中已存在于参照文件夹的文件
+        reference_input_frame = ttk.Frame(folder_frame)
+        reference_input_frame.pack(fill=tk.X, pady=(10, 0))
+        reference_input_frame.grid_columnconfigure(1, weight=1)
+
+        ttk.Label(
+            reference_input_frame,
+            text="参照文件夹（可选）：",
+            font=('微软雅黑', 10)
+        ).grid(row=0, column=0, sticky=tk.W)
+
+        self.reference_entry = ttk.Entry(reference_input_frame, font=('微软雅黑', 10))
+        self.reference_entry.grid(row=0, column=1, sticky=tk.W + tk.E, padx=(0, 10))
+
+        reference_browse_button = ttk.Button(
+            reference_input_frame,
+            text="📂 浏览",
+            command=self.select_reference_folder,
+            bootstyle=OUTLINE,
+            width=14
+        )
+        reference_browse_button.grid(row=0, column=2, sticky=tk.W)
+
+        # 扫描选项
+        option_frame = ttk.Frame(folder_frame)
+        option_frame.pack(fill=tk.X, pady=(10, 0))
+
+        self.collapse_dirs_var = tk.BooleanVar(value=True)
+        collapse_dirs_check = ttk.Checkbutton(
+            option_frame,
+            text="合并完全相同的文件夹（整个文件夹作为一组显示和删除）",
+            variable=self.collapse_dirs_var,
+            bootstyle="round-toggle"
+        )
+        collapse_dirs_check.pack(side=tk.LEFT)
+
+        # 时间预算：优先确认可释放空间最大的重复组，时间用完后返回已确认的结果
+        self.time_budget_var = tk.StringVar(value="0")
+        ttk.Spinbox(
+            option_frame,
+            from_=0,
+            to=86400,
+            textvariable=self.time_budget_var,
+            width=8
+        ).pack(side=tk.RIGHT)
+        ttk.Label(option_frame, text="时间预算(秒，0为不限)：", font=('微软雅黑', 10)).pack(side=tk.RIGHT)
+
+        # 快速抽样模式（慢速网络盘上快速给出疑似重复组）
+        sampled_frame = ttk.Frame(folder_frame)
+        sampled_frame.pack(fill=tk.X, pady=(10, 0))
+
+        self.sampled_var = tk.BooleanVar(value=False)
+        sampled_check = ttk.Checkbutton(
+            sampled_frame,
+            text="快速抽样模式（只读取文件头/中/尾少量数据，结果为近似值，删除前自动完整校验）",
+            variable=self.sampled_var,
+            bootstyle="round-toggle"
+        )
+        sampled_check.pack(side=tk.LEFT)
+
+        # 相似图片模式（感知哈希，可找出缩放、重新压缩后的照片）
+        similar_frame = ttk.Frame(folder_frame)
+        similar_frame.pack(fill=tk.X, pady=(10, 0))
+
+        self.similar_var = tk.BooleanVar(value=False)
+        similar_check = ttk.Checkbutton(
+            similar_frame,
+            text="查找相似图片（感知哈希，需要Pillow）",
+            variable=self.similar_var,
+            bootstyle="round-toggle"
+        )
+        similar_check.pack(side=tk.LEFT)
+
+        self.similar_distance_var = tk.StringVar(value=str(DEFAULT_SIMILAR_DISTANCE))
+        ttk.Spinbox(
+            similar_frame,
+            from_=0,
+            to=20,
+            textvariable=self.similar_distance_var,
+            width=8
+        ).pack(side=tk.RIGHT)
+        ttk.Label(similar_frame, text="相似阈值(越小越严格)：", font=('微软雅黑', 10)).pack(side=tk.RIGHT)
+
+        # 低优先级限速扫描（适用于繁忙的生产服务器）
+        throttle_frame = ttk.Frame(folder_frame)
+        throttle_frame.pack(fill=tk.X, pady=(10, 0))
+
+        self.throttle_enabled_var = tk.BooleanVar(value=False)
+        self.throttle_mbps_var = tk.StringVar(value="50")
+        self.throttle_iops_var = tk.StringVar(value="200")
+
+        throttle_check = ttk.Checkbutton(
+            throttle_frame,
+            text="低优先级限速扫描",
+            variable=self.throttle_enabled_var,
+            bootstyle="round-toggle"
+        )
+        throttle_check.pack(side=tk.LEFT, padx=(0, 15))
+
+        ttk.Label(throttle_frame, text="吞吐上限(MB/s)：", font=('微软雅黑', 10)).pack(side=tk.LEFT)
+        ttk.Spinbox(
+            throttle_frame,
+            from_=1,
+            to=10000,
+            textvariable=self.throttle_mbps_var,
+            width=8
+        ).pack(side=tk.LEFT, padx=(0, 15))
+
+        ttk.Label(throttle_frame, text="IOPS上限：", font=('微软雅黑', 10)).pack(side=tk.LEFT)
+        ttk.Spinbox(
+            throttle_frame,
+            from_=1,
+            to=100000,
+            textvariable=self.throttle_iops_var,
+            width=8
+        ).pack(side=tk.LEFT)
+
+        # 限速值修改后立即应用到正在进行的扫描
+        for var in (self.throttle_enabled_var, self.throttle_mbps_var, self.throttle_iops_var):
+            var.trace_add("write", lambda *args: self.apply_throttle_limits())
+
         scan_button = ttk.Button(
             folder_frame,
             text="🔍 开始扫描",
@@ -181,7 +282,16 @@ class FileDeduplicator:
             bootstyle=OUTLINE,
             width=12
         )
-        self.deselect_all_button.pack(side=tk.LEFT)
+        self.deselect_all_button.pack(side=tk.LEFT, padx=(0, 10))
+
+        self.chunk_analysis_button = ttk.Button(
+            toolbar_frame,
+            text="📊 块级去重分析",
+            command=self.start_chunk_analysis,
+            bootstyle=OUTLINE,
+            width=16
+        )
+        self.chunk_analysis_button.pack(side=tk.LEFT)
 
         # 统计信息
         self.stats_label = ttk.Label(
@@ -265,6 +375,28 @@ class FileDeduplicator:
         )
         self.delete_button.pack(pady=5)
 
+        # 隔离选项：移入隔离区（改名，不复制数据）代替永久删除，可撤销
+        quarantine_frame = ttk.Frame(button_frame)
+        quarantine_frame.pack()
+
+        self.quarantine_var = tk.BooleanVar(value=True)
+        quarantine_check = ttk.Checkbutton(
+            quarantine_frame,
+            text="移入隔离区（可撤销）",
+            variable=self.quarantine_var,
+            bootstyle="round-toggle"
+        )
+        quarantine_check.pack(side=tk.LEFT, padx=(0, 15))
+
+        self.restore_button = ttk.Button(
+            quarantine_frame,
+            text="↩️ 撤销上次隔离",
+            command=self.restore_last_quarantine,
+            bootstyle=OUTLINE,
+            width=16
+        )
+        self.restore_button.pack(side=tk.LEFT)
+
     def show_about(self):
         """显示关于信息"""
         about_window = ttk.Toplevel(self.root)
@@ -322,6 +454,97 @@ class FileDeduplicator:
         about_window.focus_set()
         about_window.grab_set()  # 模态窗口
 
+    def start_chunk_analysis(self):
+        """开始块级去重分析（在新线程中执行）"""
+        folder_path = self.folder_entry.get().strip()
+        if not folder_path or not os.path.isdir(folder_path):
+            messagebox.showerror("错误", "请选择要分析的文件夹")
+            return
+
+        self.chunk_analysis_button.config(state=tk.DISABLED)
+        thread = threading.Thread(target=self.run_chunk_analysis, args=(folder_path,), daemon=True)
+        thread.start()
+
+    def run_chunk_analysis(self, folder_path):
+        """对大文件做内容定义分块，估算块级去重可节省的空间（在后台线程中执行）"""
+        def progress_callback(file_path, current, total):
+            message = f"正在分块分析 ({current}/{total})：{file_path}"
+            self.root.after(0, lambda: self.update_status(message, "blue"))
+
+        try:
+            report = analyze_chunk_dedup(folder_path, throttle=self.throttle, progress_callback=progress_callback)
+            self.root.after(0, lambda: self.update_status(
+                f"分析完成！块级去重可节省 {self.format_file_size(report['saved_size'])}", "green"
+            ))
+            self.root.after(0, lambda: self.show_chunk_report(report))
+        except Exception as e:
+            self.root.after(0, lambda: self.update_status("分析失败", "red"))
+            self.root.after(0, lambda: messagebox.showerror("错误", f"分析失败：\n{str(e)}"))
+        finally:
+            self.root.after(0, lambda: self.chunk_analysis_button.config(state=tk.NORMAL))
+
+    def show_chunk_report(self, report):
+        """显示块级去重分析报告（按目录、按文件对）"""
+        report_window = ttk.Toplevel(self.root)
+        report_window.title("块级去重分析报告")
+        report_window.geometry("900x600")
+
+        # 居中显示
+        report_window.update_idletasks()
+        x = (report_window.winfo_screenwidth() // 2) - (900 // 2)
+        y = (report_window.winfo_screenheight() // 2) - (600 // 2)
+        report_window.geometry(f'900x600+{x}+{y}')
+
+        main_frame = ttk.Frame(report_window, padding=20)
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        total_size = report['total_size']
+        saved_ratio = report['saved_size'] / total_size * 100 if total_size else 0
+        summary_label = ttk.Label(
+            main_frame,
+            text=f"分析 {report['file_count']} 个大文件，共 {self.format_file_size(total_size)}，"
+                 f"唯一数据 {self.format_file_size(report['unique_size'])}，"
+                 f"块级去重可节省 {self.format_file_size(report['saved_size'])}（{saved_ratio:.1f}%）",
+            font=('微软雅黑', 11, 'bold'),
+            bootstyle=PRIMARY
+        )
+        summary_label.pack(anchor=tk.W, pady=(0, 15))
+
+        # 按目录统计
+        dir_frame = ttk.Labelframe(main_frame, text="📁 按目录（可节省空间）", padding=10, bootstyle=INFO)
+        dir_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        dir_tree = ttk.Treeview(dir_frame, columns=("path", "saved"), show="headings", height=8)
+        dir_tree.heading("path", text="目录")
+        dir_tree.heading("saved", text="可节省")
+        dir_tree.column("path", width=650, anchor=tk.W)
+        dir_tree.column("saved", width=150, anchor=tk.E)
+        dir_tree.pack(fill=tk.BOTH, expand=True)
+        for dir_path, saved_size in report['by_directory']:
+            dir_tree.insert("", tk.END, values=(dir_path, self.format_file_size(saved_size)))
+
+        # 按文件对统计
+        pair_frame = ttk.Labelframe(main_frame, text="🔗 按文件对（共享数据块）", padding=10, bootstyle=INFO)
+        pair_frame.pack(fill=tk.BOTH, expand=True)
+        pair_tree = ttk.Treeview(pair_frame, columns=("file_a", "file_b", "shared"), show="headings", height=8)
+        pair_tree.heading("file_a", text="文件A")
+        pair_tree.heading("file_b", text="文件B")
+        pair_tree.heading("shared", text="共享")
+        pair_tree.column("file_a", width=325, anchor=tk.W)
+        pair_tree.column("file_b", width=325, anchor=tk.W)
+        pair_tree.column("shared", width=150, anchor=tk.E)
+        pair_tree.pack(fill=tk.BOTH, expand=True)
+        for file_a, file_b, shared_size in report['top_pairs']:
+            pair_tree.insert("", tk.END, values=(file_a, file_b, self.format_file_size(shared_size)))
+
+        close_button = ttk.Button(
+            main_frame,
+            text="关闭",
+            command=report_window.destroy,
+            bootstyle=PRIMARY,
+            width=15
+        )
+        close_button.pack(pady=(15, 0))
+
     def select_folder(self):
         """选择文件夹"""
         folder = filedialog.askdirectory(title="选择要扫描的文件夹")
@@ -329,6 +552,25 @@ class FileDeduplicator:
             self.folder_entry.delete(0, tk.END)
             self.folder_entry.insert(0, folder)
 
+    def apply_throttle_limits(self):
+        """把界面上的限速设置应用到限速器（输入不合法时保持原值）"""
+        if not self.throttle_enabled_var.get():
+            self.throttle.set_limits(mb_per_sec=0, iops=0)
+            return
+        try:
+            mb_per_sec = float(self.throttle_mbps_var.get())
+            iops = float(self.throttle_iops_var.get())
+        except (ValueError, tk.TclError):
+            return
+        self.throttle.set_limits(mb_per_sec=mb_per_sec, iops=iops)
+
+    def select_reference_folder(self):
+        """选择参照文件夹"""
+        folder = filedialog.askdirectory(title="选择参照文件夹（如备份目录）")
+        if folder:
+            self.reference_entry.delete(0, tk.END)
+            self.reference_entry.insert(0, folder)
+
     def format_file_size(self, size):
         """格式化文件大小"""
         for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
@@ -349,34 +591,47 @@ class FileDeduplicator:
         # 填充数据
         group_index = 1
         for md5_hash, file_paths in self.duplicates.items():
-            # 为每个重复组选择保留文件（按路径排序，选择最短的）
-            sorted_paths = sorted(file_paths, key=lambda x: (len(x), x))
-            keep_file = sorted_paths[0]
+            if self.reference_mode or self.similar_mode:
+                # 参照比对模式：保留参照文件，扫描文件夹中的文件均可删除
+                # 相似图片模式：保留最大的图片（通常画质最好）
+                keep_file = file_paths[0]
+                duplicate_files = file_paths[1:]
+            else:
+                # 为每个重复组选择保留文件（按路径排序，选择最短的）
+                sorted_paths = sorted(file_paths, key=lambda x: (len(x), x))
+                keep_file = sorted_paths[0]
+
+                # 其他重复文件
+                duplicate_files = [p for p in sorted_paths if p != keep_file]
             self.keep_files[md5_hash] = keep_file
             
-            # 其他重复文件
-            duplicate_files = [p for p in sorted_paths if p != keep_file]
-            
+            # 重复文件夹组（Merkle哈希相同），组内各目录大小一致，只计算一次
+            is_dir_group = md5_hash.startswith("dir:")
+
             # 获取保留文件信息
             try:
-                keep_file_size = os.path.getsize(keep_file)
+                keep_file_size = get_tree_size(keep_file) if is_dir_group else os.path.getsize(keep_file)
                 keep_file_size_str = self.format_file_size(keep_file_size)
             except:
                 keep_file_size_str = "未知"
-            
+
             # 创建父节点（保留文件，不可勾选）
             parent_id = self.tree.insert(
                 "",
                 tk.END,
                 text="📁",  # 使用文件夹图标表示父节点
-                values=(f"🔒 {keep_file}", keep_file_size_str, f"组{group_index} [保留]"),
+                values=(f"🔒 {keep_file}", keep_file_size_str,
+                        f"组{group_index} [参照]" if self.reference_mode
+                        else f"组{group_index} [相似·保留]" if self.similar_mode
+                        else f"组{group_index} [保留·抽样]" if self.group_confidence.get(md5_hash, CONFIDENCE_EXACT) != CONFIDENCE_EXACT
+                        else f"组{group_index} [保留文件夹]" if is_dir_group else f"组{group_index} [保留]"),
                 tags=("keep_file", md5_hash)
             )
-            
+
             # 创建子节点（其他重复文件，可勾选）
             for file_path in duplicate_files:
                 try:
-                    file_size = os.path.getsize(file_path)
+                    file_size = keep_file_size if is_dir_group else os.path.getsize(file_path)
                     file_size_str = self.format_file_size(file_size)
                 except:
                     file_size_str = "未知"
@@ -503,9 +758,126 @@ class FileDeduplicator:
                 self.update_status("就绪", "green")
                 return
 
+            reference_path = self.reference_entry.get().strip()
+            if reference_path and not os.path.isdir(reference_path):
+                messagebox.showerror("错误", "参照文件夹路径不存在")
+                self.update_status("就绪", "green")
+                return
+            if reference_path and os.path.realpath(reference_path) == os.path.realpath(folder_path):
+                messagebox.showerror("错误", "参照文件夹不能与扫描文件夹相同")
+                self.update_status("就绪", "green")
+                return
+
+            if reference_path:
+                self.update_status("正在与参照文件夹比对...", "blue")
+                matches, total_files, processed_files = scan_against_reference(
+                    reference_path,
+                    folder_path,
+                    throttle=self.throttle,
+                    low_priority=self.throttle_enabled_var.get()
+                )
+                self.reference_mode = True
+                self.similar_mode = False
+                self.sampled_mode = False
+                self.group_confidence = {}
+                self.duplicates = matches
+                self.root.after(0, self.update_treeview)
+
+                if matches:
+                    target_count = sum(len(paths) - 1 for paths in matches.values())
+                    self.root.after(0, lambda: self.update_status(
+                        f"比对完成！扫描文件夹中有 {target_count} 个文件已存在于参照文件夹，可安全删除", "green"
+                    ))
+                    self.root.after(0, lambda: self.delete_button.config(state=tk.NORMAL))
+                else:
+                    self.root.after(0, lambda: self.update_status("比对完成！参照文件夹中没有相同文件", "green"))
+                    self.root.after(0, lambda: self.delete_button.config(state=tk.DISABLED))
+                return
+
+            if self.similar_var.get():
+                try:
+                    max_distance = int(self.similar_distance_var.get())
+                except ValueError:
+                    max_distance = DEFAULT_SIMILAR_DISTANCE
+                self.update_status("正在计算图片感知哈希...", "blue")
+                groups, total_images, processed_images = find_similar_images(
+                    folder_path, max_distance, throttle=self.throttle, low_priority=self.throttle_enabled_var.get()
+                )
+                self.reference_mode = False
+                self.similar_mode = True
+                self.sampled_mode = False
+                self.group_confidence = {}
+                self.duplicates = groups
+                self.root.after(0, self.update_treeview)
+
+                if groups:
+                    image_count = sum(len(paths) for paths in groups.values())
+                    self.root.after(0, lambda: self.update_status(
+                        f"扫描完成！在 {total_images} 张图片中找到 {len(groups)} 组相似图片，共 {image_count} 张", "green"
+                    ))
+                    self.root.after(0, lambda: self.delete_button.config(state=tk.NORMAL))
+                else:
+                    self.root.after(0, lambda: self.update_status("扫描完成！未找到相似图片", "green"))
+                    self.root.after(0, lambda: self.delete_button.config(state=tk.DISABLED))
+                return
+
+            if self.sampled_var.get():
+                self.update_status("正在计算抽样指纹...", "blue")
+                groups, confidence, total_files, processed_files = scan_files_sampled(folder_path, throttle=self.throttle)
+                self.reference_mode = False
+                self.similar_mode = False
+                self.sampled_mode = True
+                self.group_confidence = confidence
+                self.duplicates = groups
+                self.root.after(0, self.update_treeview)
+
+                if groups:
+                    sampled_count = sum(1 for level in confidence.values() if level != CONFIDENCE_EXACT)
+                    self.root.after(0, lambda: self.update_status(
+                        f"抽样完成！找到 {len(groups)} 组疑似重复文件，其中 {sampled_count} 组为抽样匹配（删除前将完整校验）", "green"
+                    ))
+                    self.root.after(0, lambda: self.delete_button.config(state=tk.NORMAL))
+                else:
+                    self.root.after(0, lambda: self.update_status("抽样完成！未找到疑似重复文件", "green"))
+                    self.root.after(0, lambda: self.delete_button.config(state=tk.DISABLED))
+                return
+
             self.update_status("正在扫描文件并计算MD5...", "blue")
-            duplicates, total_files, processed_files = scan_files(folder_path)
+            try:
+                time_budget = float(self.time_budget_var.get()) or None
+            except ValueError:
+                time_budget = None
+
+            # 每确认一组重复文件就更新状态（大文件组最先确认）
+            confirmed = {'groups': 0, 'wasted_size': 0}
+
+            def group_callback(md5_hash, paths, wasted_size):
+                confirmed['groups'] += 1
+                confirmed['wasted_size'] += wasted_size
+                message = f"正在计算MD5...已确认 {confirmed['groups']} 组重复文件，可释放 {self.format_file_size(confirmed['wasted_size'])}"
+                self.root.after(0, lambda: self.update_status(message, "blue"))
+
+            # 收集所有算出MD5的文件（含未重复的），扫描后写入全局内容索引
+            hashed_files = {}
+
+            def hash_callback(file_path, md5_hash):
+                hashed_files.setdefault(md5_hash, []).append(file_path)
+
+            # 始终传入限速器，扫描中途开启/关闭限速也能生效（未开启时不限速）
+            duplicates, total_files, processed_files = scan_files(
+                folder_path,
+                collapse_dirs=self.collapse_dirs_var.get(),
+                throttle=self.throttle,
+                low_priority=self.throttle_enabled_var.get(),
+                time_budget=time_budget,
+                group_callback=group_callback,
+                hash_callback=hash_callback
+            )
 
+            self.reference_mode = False
+            self.similar_mode = False
+            self.sampled_mode = False
+            self.group_confidence = {}
             self.duplicates = duplicates
 
             # 在主线程中更新UI
@@ -521,10 +893,27 @@ class FileDeduplicator:
                 self.root.after(0, lambda: self.update_status("扫描完成！未找到重复文件", "green"))
                 self.root.after(0, lambda: self.delete_button.config(state=tk.DISABLED))
 
+            # 扫描完成后把确认的内容摘要写入全局内容索引
+            self.record_scan_results(folder_path, hashed_files)
+
         except Exception as e:
             self.root.after(0, lambda: self.update_status("扫描失败", "red"))
             self.root.after(0, lambda: messagebox.showerror("错误", f"扫描失败：\n{str(e)}"))
 
+    def record_scan_results(self, folder_path, hashed_files):
+        """把本次扫描算出的MD5（{md5: [路径, ...]}）增量写入全局内容索引（索引失败不影响扫描结果）"""
+        try:
+            ContentIndex().add_scan_results(folder_path, hashed_files, throttle=self.throttle)
+        except Exception:
+            pass
+
+    def forget_removed_files(self, paths):
+        """从全局内容索引中删除已删除或已移入隔离区的文件（索引失败不影响删除结果）"""
+        try:
+            ContentIndex().remove_paths(paths)
+        except Exception:
+            pass
+
     def start_scan(self):
         """开始扫描（在新线程中执行）"""
         folder_path = self.folder_entry.get().strip()
@@ -580,6 +969,27 @@ class FileDeduplicator:
                 self.delete_button.config(state=tk.NORMAL, text="🗑️ 删除选中文件")
                 return
 
+            # 抽样模式：删除前对抽样匹配的组做完整MD5校验，不一致的文件不删除
+            if self.sampled_mode:
+                self.update_status(f"正在对选中的 {len(selected_files)} 个文件做完整校验...", "blue")
+                selected_files, unverified_files = self.verify_selected_files(selected_files)
+                if unverified_files:
+                    unverified_msg = "\n".join(unverified_files[:10])
+                    if len(unverified_files) > 10:
+                        unverified_msg += f"\n... 还有 {len(unverified_files) - 10} 个文件"
+                    messagebox.showwarning(
+                        "完整校验未通过",
+                        f"以下 {len(unverified_files)} 个文件与保留文件内容不一致，已跳过：\n{unverified_msg}"
+                    )
+                if not selected_files:
+                    self.update_status("没有通过完整校验的文件", "red")
+                    self.delete_button.config(state=tk.NORMAL, text="🗑️ 删除选中文件")
+                    return
+
+            if self.quarantine_var.get():
+                self.quarantine_selected(selected_files)
+                return
+
             # 确认删除
             result = messagebox.askyesno(
                 "确认删除",
@@ -597,18 +1007,26 @@ class FileDeduplicator:
             deleted_count = 0
             failed_count = 0
             failed_files = []
+            deleted_files = []
 
             for file_path in selected_files:
                 try:
-                    if os.path.exists(file_path):
+                    if os.path.isdir(file_path):
+                        # 重复文件夹组整体删除
+                        shutil.rmtree(file_path)
+                        deleted_count += 1
+                        deleted_files.append(file_path)
+                    elif os.path.exists(file_path):
                         os.remove(file_path)
                         deleted_count += 1
+                        deleted_files.append(file_path)
                     else:
                         failed_count += 1
                         failed_files.append(file_path)
                 except Exception as e:
                     failed_count += 1
                     failed_files.append(f"{file_path} ({str(e)})")
+            self.forget_removed_files(deleted_files)
 
             # 在主线程中更新UI
             if failed_count == 0:
@@ -640,11 +1058,100 @@ class FileDeduplicator:
         finally:
             self.root.after(0, lambda: self.delete_button.config(state=tk.NORMAL, text="🗑️ 删除选中文件"))
 
+    def verify_selected_files(self, selected_files):
+        """对抽样匹配的组做完整校验，返回 (通过校验的文件, 未通过的文件)"""
+        file_groups = {file_path: md5_hash for md5_hash, file_path, group_index in self.duplicate_items}
+        selected_by_group = {}
+        for file_path in selected_files:
+            selected_by_group.setdefault(file_groups.get(file_path), []).append(file_path)
+
+        verified_files = []
+        unverified_files = []
+        for group_key, paths in selected_by_group.items():
+            if self.group_confidence.get(group_key, CONFIDENCE_EXACT) == CONFIDENCE_EXACT:
+                verified_files.extend(paths)
+                continue
+            matched = verify_duplicate_group(self.keep_files[group_key], paths, throttle=self.throttle)
+            verified_files.extend(matched)
+            unverified_files.extend(p for p in paths if p not in matched)
+        return verified_files, unverified_files
+
+    def quarantine_selected(self, selected_files):
+        """把选中的文件移入隔离区（在delete_files的后台线程中执行）"""
+        self.update_status(f"正在将 {len(selected_files)} 个文件移入隔离区...", "blue")
+        try:
+            batch_id, moved, failed = quarantine_files(selected_files)
+        except PermissionError as e:
+            # 找不到可写的隔离目录时一个文件都不移动，整体提示一次
+            self.root.after(0, lambda: self.update_status("隔离失败：没有可写的隔离目录", "red"))
+            self.root.after(0, lambda: messagebox.showerror(
+                "隔离失败", f"{e}\n\n未移动任何文件。可以关闭“移入隔离区（可撤销）”后直接删除。"
+            ))
+            return
+
+        self.forget_removed_files(moved)
+        if not failed:
+            self.root.after(0, lambda: self.update_status(
+                f"已将 {len(moved)} 个文件移入隔离区，{QUARANTINE_RETENTION_DAYS} 天后自动清除，可随时撤销", "green"
+            ))
+        else:
+            self.root.after(0, lambda: self.update_status(
+                f"隔离完成！成功 {len(moved)} 个，失败 {len(failed)} 个", "red"
+            ))
+            failed_msg = "\n".join(f"{path} ({error})" for path, error in failed[:10])
+            if len(failed) > 10:
+                failed_msg += f"\n... 还有 {len(failed) - 10} 个文件隔离失败"
+            self.root.after(0, lambda: messagebox.showwarning(
+                "部分失败",
+                f"隔离完成！\n\n成功隔离 {len(moved)} 个文件\n失败 {len(failed)} 个文件：\n{failed_msg}"
+            ))
+
+        self.root.after(0, self.refresh_after_delete)
+
+    def restore_last_quarantine(self):
+        """撤销最近一次隔离：整批恢复到原位置"""
+        batches = load_quarantine_batches()
+        if not batches:
+            messagebox.showinfo("提示", "隔离区中没有可恢复的文件")
+            return
+
+        batch = batches[-1]
+        result = messagebox.askyesno(
+            "确认恢复",
+            f"确定要把最近一次隔离的 {len(batch['moves'])} 个文件恢复到原位置吗？"
+        )
+        if not result:
+            return
+
+        restored, failed = restore_batch(batch['batch'])
+        if failed:
+            failed_msg = "\n".join(f"{path} ({error})" for path, error in failed[:10])
+            messagebox.showwarning(
+                "部分失败",
+                f"已恢复 {len(restored)} 个文件\n失败 {len(failed)} 个文件：\n{failed_msg}"
+            )
+        else:
+            self.update_status(f"已恢复 {len(restored)} 个文件，重新扫描可刷新列表", "green")
+
+    def purge_expired_quarantine(self):
+        """清除超过保留期的隔离批次（在后台线程中执行）"""
+        try:
+            purged_batches, freed_size = purge_quarantine()
+        except Exception:
+            return
+        if purged_batches:
+            self.root.after(0, lambda: self.update_status(
+                f"已清除 {purged_batches} 批过期隔离文件，释放 {self.format_file_size(freed_size)}", "green"
+            ))
+
     def refresh_after_delete(self):
         """删除后刷新列表"""
         # 移除已删除的文件
         new_duplicates = {}
         for md5_hash, file_paths in self.duplicates.items():
+            # 参照比对模式下参照文件已不存在时，该组不再可信
+            if self.reference_mode and not os.path.exists(file_paths[0]):
+                continue
             existing_paths = [path for path in file_paths if os.path.exists(path)]
             if len(existing_paths) > 1:  # 如果还有重复的
                 new_duplicates[md5_hash] = existing_paths